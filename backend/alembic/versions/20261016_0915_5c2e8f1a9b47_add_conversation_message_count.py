@@ -0,0 +1,36 @@
+"""add conversation message_count
+
+Revision ID: 5c2e8f1a9b47
+Revises: 0a703fd43a33
+Create Date: 2026-10-16 09:15:42.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8f1a9b47'
+down_revision: Union[str, None] = '0a703fd43a33'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations',
+    sa.Column('message_count', sa.Integer(), server_default='0', nullable=False)
+    )
+    # Backfill from the highest existing sequence so the next reserved
+    # sequence never collides with a message already stored
+    op.execute(
+        "UPDATE conversations SET message_count = COALESCE("
+        "(SELECT MAX(messages.sequence) FROM messages "
+        "WHERE messages.conversation_id = conversations.id), 0)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.drop_column('message_count')
@@ -0,0 +1,40 @@
+"""add hot path indexes
+
+Revision ID: b81d3f6e2c05
+Revises: 5c2e8f1a9b47
+Create Date: 2026-10-16 11:40:07.562931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81d3f6e2c05'
+down_revision: Union[str, None] = '5c2e8f1a9b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - kept in sync with the models' __table_args__
+INDEXES = [
+    ('ix_messages_conversation_id_sequence', 'messages', ['conversation_id', 'sequence']),
+    ('ix_conversations_user_id_updated_at', 'conversations', ['user_id', 'updated_at', 'id']),
+    ('ix_progress_user_id_metric_name_recorded_at', 'progress', ['user_id', 'metric_name', 'recorded_at']),
+    ('ix_progress_user_id_recorded_at', 'progress', ['user_id', 'recorded_at']),
+    ('ix_documents_user_id_created_at', 'documents', ['user_id', 'created_at']),
+    ('ix_reports_user_id_created_at', 'reports', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    # init_db's create_all may already have built these on fresh databases
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,32 @@
+"""add document content_hash and chunk_doc_id
+
+Revision ID: 0bb4215832d9
+Revises: b81d3f6e2c05
+Create Date: 2026-10-16 14:30:26.481903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0bb4215832d9'
+down_revision: Union[str, None] = 'b81d3f6e2c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('chunk_doc_id', sa.String(), nullable=True))
+    op.create_index('ix_documents_user_id_content_hash', 'documents', ['user_id', 'content_hash'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_user_id_content_hash', table_name='documents', if_exists=True)
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('chunk_doc_id')
+        batch_op.drop_column('content_hash')
@@ -3,12 +3,19 @@ Chat API Endpoints
 Uses PostgreSQL via SQLAlchemy to persist conversations and messages.
 Integrates document RAG for context-aware responses.
 """
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List, Optional
+import asyncio
+import base64
+import json
+import time
 import uuid
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, update, func, and_, or_
 
 from app.schemas.chat import (
     ChatRequest,
@@ -20,103 +27,147 @@ from app.schemas.chat import (
 )
 from app.models.user import User
 from app.models.conversation import Conversation, Message
-from app.services.llm_service import LLMService
+from app.services.llm_service import get_llm_service
 from app.services.document_service import get_document_service
-from app.db.session import get_db
+from app.db.session import get_db, async_session_maker
+import structlog
 
+logger = structlog.get_logger()
 router = APIRouter(prefix="/chat")
-llm_service = LLMService()
 
 
-@router.post("/message", response_model=ChatResponse)
-@router.post("/send", response_model=ChatResponse)
-async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+@dataclass
+class ChatTurn:
+    """Everything send_message/stream_message need once the user turn is persisted."""
+    conversation: Conversation
+    user_context: Optional[dict]
+    conversation_history: List[ChatMessage]
+    rag_context: str
+    rag_sources: List[dict]
+    rag_chunk_ids: List[str]
+    timings: dict = field(default_factory=dict)  # Stage name -> ms
+
+    @property
+    def conversation_id(self) -> str:
+        return self.conversation.id
+
+
+async def _next_sequence(db: AsyncSession, conversation_id: str) -> int:
     """
-    Send a message to the chatbot and get a response.
-    Persists messages to PostgreSQL.
-    Retrieves relevant document chunks (RAG) for context.
+    Atomically reserve the next Message.sequence for a conversation.
+    The row lock taken by the UPDATE serializes concurrent sends, so two
+    messages can never get the same sequence.
+    """
+    result = await db.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(message_count=Conversation.message_count + 1)
+        .returning(Conversation.message_count)
+    )
+    return result.scalar_one()
+
+
+@contextmanager
+def _stage(timings: dict, name: str):
+    """Record the wall time of one turn stage, in ms, under timings[name]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def _persist_user_turn(request: ChatRequest, db: AsyncSession, timings: dict):
+    """
+    DB side of a turn: user profile, conversation, user message and history.
+    These share the request session, which cannot run statements concurrently,
+    so they stay sequential.
     """
     # Fetch user context from DB
     user_context = None
     if request.user_id:
-        try:
-            result = await db.execute(select(User).where(User.id == request.user_id))
-            user = result.scalar_one_or_none()
-            if user:
-                user_context = {
-                    "user_id": user.id,
-                    "name": user.name,
-                    "performance_data": user.performance_data or {}
-                }
-        except Exception as e:
-            print(f"Error fetching user profile: {e}")
+        with _stage(timings, "user_lookup"):
+            try:
+                result = await db.execute(select(User).where(User.id == request.user_id))
+                user = result.scalar_one_or_none()
+                if user:
+                    user_context = {
+                        "user_id": user.id,
+                        "name": user.name,
+                        "performance_data": user.performance_data or {}
+                    }
+            except Exception as e:
+                print(f"Error fetching user profile: {e}")
 
     # Get or create conversation in DB
-    conversation_id = request.conversation_id
-    is_new_conversation = False
-    if conversation_id:
-        result = await db.execute(
-            select(Conversation).where(Conversation.id == conversation_id)
-        )
-        conversation = result.scalar_one_or_none()
+    with _stage(timings, "conversation"):
+        conversation = None
+        if request.conversation_id:
+            result = await db.execute(
+                select(Conversation).where(Conversation.id == request.conversation_id)
+            )
+            conversation = result.scalar_one_or_none()
+
         if not conversation:
-            conversation_id = None
+            conversation = Conversation(
+                id=str(uuid.uuid4()),
+                user_id=request.user_id or "demo-user",
+                title=request.message[:50].strip(),  # Auto-title from first message
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow(),
+            )
+            db.add(conversation)
+            await db.flush()  # Get the ID without committing yet
+    conversation_id = conversation.id
 
-    if not conversation_id:
-        is_new_conversation = True
-        conversation = Conversation(
+    # Save user message to DB
+    with _stage(timings, "insert_message"):
+        user_msg_db = Message(
             id=str(uuid.uuid4()),
-            user_id=request.user_id or "demo-user",
-            title=request.message[:50].strip(),  # Auto-title from first message
+            conversation_id=conversation_id,
+            role="user",
+            content=request.message,
+            sequence=await _next_sequence(db, conversation_id),
             created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
         )
-        db.add(conversation)
-        await db.flush()  # Get the ID without committing yet
-        conversation_id = conversation.id
-
-    # Get current message count for sequence
-    count_result = await db.execute(
-        select(func.count(Message.id)).where(Message.conversation_id == conversation_id)
-    )
-    message_count = count_result.scalar() or 0
-
-    # Save user message to DB
-    user_msg_db = Message(
-        id=str(uuid.uuid4()),
-        conversation_id=conversation_id,
-        role="user",
-        content=request.message,
-        sequence=message_count + 1,
-        created_at=datetime.utcnow(),
-    )
-    db.add(user_msg_db)
-    await db.flush()
+        db.add(user_msg_db)
+        await db.flush()
 
     # Build history from DB for LLM context (last 10 messages)
-    history_result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation_id)
-        .order_by(Message.sequence.desc())
-        .limit(10)
-    )
-    history_db = history_result.scalars().all()
+    with _stage(timings, "history"):
+        history_result = await db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.sequence.desc())
+            .limit(10)
+        )
+        history_db = history_result.scalars().all()
     conversation_history = [
         ChatMessage(role=MessageRole(m.role), content=m.content, timestamp=m.created_at)
         for m in reversed(history_db)
     ]
 
-    # --- RAG: Search user's uploaded documents for relevant context ---
+    return user_context, conversation, conversation_history
+
+
+def _search_documents(message: str, user_id: str) -> List[dict]:
+    return get_document_service().search_user_documents(query=message, user_id=user_id, n_results=3)
+
+
+async def _retrieve_rag_context(request: ChatRequest, timings: dict):
+    """
+    Search the user's uploaded documents. Chroma's client is synchronous, so the
+    query runs in the default thread pool instead of on the event loop.
+    """
     rag_sources = []
+    rag_chunk_ids = []
     rag_context = ""
-    if request.user_id:
+    if not request.user_id:
+        return rag_context, rag_sources, rag_chunk_ids
+
+    with _stage(timings, "rag"):
         try:
-            doc_service = get_document_service()
-            chunks = doc_service.search_user_documents(
-                query=request.message,
-                user_id=request.user_id,
-                n_results=3,
-            )
+            chunks = await asyncio.to_thread(_search_documents, request.message, request.user_id)
             if chunks:
                 rag_parts = ["[Relevant context from your uploaded documents:]"]
                 for chunk in chunks:
@@ -125,6 +176,7 @@ async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db))
                         f"--- From '{meta.get('filename', 'document')}' (page {meta.get('page', '?')}) ---\n"
                         f"{chunk['text'][:500]}"
                     )
+                    rag_chunk_ids.append(chunk.get("chunk_id", ""))
                     rag_sources.append({
                         "filename": meta.get("filename", ""),
                         "page": meta.get("page", 1),
@@ -134,15 +186,64 @@ async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db))
         except Exception as e:
             print(f"RAG search error (non-fatal): {e}")
 
+    return rag_context, rag_sources, rag_chunk_ids
+
+
+async def _prepare_turn(request: ChatRequest, db: AsyncSession) -> ChatTurn:
+    """
+    Load the user profile, get or create the conversation, persist the user
+    message and load recent history, while RAG retrieval runs concurrently
+    (it only needs the request). Commits before returning so no DB connection
+    is held during the LLM call.
+    """
+    timings = {}
+    with _stage(timings, "prepare"):
+        (user_context, conversation, conversation_history), (rag_context, rag_sources, rag_chunk_ids) = (
+            await asyncio.gather(
+                _persist_user_turn(request, db, timings),
+                _retrieve_rag_context(request, timings),
+            )
+        )
+
+        # Commit the user turn before the LLM call so no DB connection or
+        # write lock is held for the full model latency
+        await db.commit()
+
+    return ChatTurn(
+        conversation=conversation,
+        user_context=user_context,
+        conversation_history=conversation_history,
+        rag_context=rag_context,
+        rag_sources=rag_sources,
+        rag_chunk_ids=rag_chunk_ids,
+        timings=timings,
+    )
+
+
+@router.post("/message", response_model=ChatResponse)
+@router.post("/send", response_model=ChatResponse)
+async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Send a message to the chatbot and get a response.
+    Persists messages to PostgreSQL.
+    Retrieves relevant document chunks (RAG) for context.
+    """
+    turn = await _prepare_turn(request, db)
+    conversation = turn.conversation
+    conversation_id = turn.conversation_id
+
     # Get LLM response
     try:
-        response = await llm_service.chat(
-            user_message=request.message,
-            conversation_history=conversation_history,
-            include_context=request.include_context,
-            user_context=user_context,
-            rag_context=rag_context,
-        )
+        with _stage(turn.timings, "llm"):
+            response = await get_llm_service().chat(
+                user_message=request.message,
+                conversation_history=turn.conversation_history,
+                include_context=request.include_context,
+                user_context=turn.user_context,
+                rag_context=turn.rag_context,
+                rag_chunk_ids=turn.rag_chunk_ids,
+                use_cache=not request.bypass_cache,
+            )
 
         message_content = response.get("response") or response.get("message", "")
 
@@ -152,7 +253,7 @@ async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db))
             conversation_id=conversation_id,
             role="assistant",
             content=message_content,
-            sequence=message_count + 2,
+            sequence=await _next_sequence(db, conversation_id),
             created_at=datetime.utcnow(),
         )
         db.add(assistant_msg_db)
@@ -161,6 +262,7 @@ async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db))
         conversation.updated_at = datetime.utcnow()
 
         await db.commit()
+        logger.info("chat_turn_timings", conversation_id=conversation_id, **turn.timings)
 
         return ChatResponse(
             message=message_content,
@@ -168,7 +270,7 @@ async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db))
             function_calls=response.get("function_calls"),
             citations=response.get("citations"),
             suggested_questions=response.get("suggestions") or response.get("suggested_questions", []),
-            rag_sources=rag_sources if rag_sources else None,
+            rag_sources=turn.rag_sources if turn.rag_sources else None,
         )
 
     except Exception as e:
@@ -176,46 +278,169 @@ async def send_message(request: ChatRequest, db: AsyncSession = Depends(get_db))
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/stream")
+async def stream_message(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Streaming variant of /send using server-sent events.
+    Emits `start` (conversation id), one `token` event per text delta, then `done`
+    with the same payload as /send (including rag_sources and suggestions) once the
+    assistant message has been persisted. Failures are reported as an `error` event
+    instead of `done`; `truncated` is true when some tokens were already sent, and
+    the partial reply is not saved.
+    """
+    turn = await _prepare_turn(request, db)
+
+    async def event_stream():
+        yield _sse("start", {"conversation_id": turn.conversation_id})
+
+        final = {}
+        partial = False  # Tokens were sent but the reply never completed
+        llm_start = time.perf_counter()
+        try:
+            async for event in get_llm_service().chat_stream(
+                user_message=request.message,
+                conversation_history=turn.conversation_history,
+                include_context=request.include_context,
+                user_context=turn.user_context,
+                rag_context=turn.rag_context,
+                rag_chunk_ids=turn.rag_chunk_ids,
+                use_cache=not request.bypass_cache,
+            ):
+                if event["event"] == "token":
+                    partial = True
+                    yield _sse("token", {"text": event["text"]})
+                else:
+                    final = event
+            partial = False
+            turn.timings["llm"] = round((time.perf_counter() - llm_start) * 1000, 1)
+
+            # The request-scoped session may already be closed once streaming
+            # starts, so persist with a session of our own
+            async with async_session_maker() as session:
+                session.add(Message(
+                    id=str(uuid.uuid4()),
+                    conversation_id=turn.conversation_id,
+                    role="assistant",
+                    content=final["message"],
+                    sequence=await _next_sequence(session, turn.conversation_id),
+                    created_at=datetime.utcnow(),
+                ))
+                await session.execute(
+                    update(Conversation)
+                    .where(Conversation.id == turn.conversation_id)
+                    .values(updated_at=datetime.utcnow())
+                )
+                await session.commit()
+            logger.info("chat_turn_timings", conversation_id=turn.conversation_id, **turn.timings)
+        except Exception as e:
+            yield _sse("error", {"detail": f"Error processing chat: {str(e)}", "truncated": partial})
+            return
+
+        done = ChatResponse(
+            message=final["message"],
+            conversation_id=turn.conversation_id,
+            suggested_questions=final.get("suggested_questions", []),
+            rag_sources=turn.rag_sources if turn.rag_sources else None,
+        )
+        yield _sse("done", done.model_dump(mode="json"))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters and size of the LLM response cache"""
+    cache = get_llm_service().response_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def _encode_cursor(updated_at: datetime, conversation_id: str) -> str:
+    """Opaque keyset cursor for (updated_at, id)."""
+    raw = f"{updated_at.isoformat()}|{conversation_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        updated_at, conversation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(updated_at), conversation_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @router.get("/conversations", response_model=list[ConversationSummary])
 async def get_conversations(
+    response: Response,
     user_id: Optional[str] = None,
-    limit: int = 10,
-    offset: int = 0,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get list of conversations from PostgreSQL"""
-    query = select(Conversation).order_by(Conversation.updated_at.desc()).offset(offset).limit(limit)
+    """
+    Get list of conversations from PostgreSQL, most recently updated first.
+    One query returns the summaries: the count comes from Conversation.message_count,
+    and since that is also the last sequence, the preview is a join on it.
+    Pass the X-Next-Cursor response header back as `cursor` for keyset
+    pagination; `offset` is still honoured when no cursor is given.
+    """
+    # Pick the page first so the preview join only touches `limit` rows
+    page = (
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.updated_at,
+            Conversation.message_count,
+        )
+        .order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+        .limit(limit)
+    )
     if user_id:
-        query = query.where(Conversation.user_id == user_id)
-
-    result = await db.execute(query)
-    conversations = result.scalars().all()
-
-    summaries = []
-    for conv in conversations:
-        # Get last message preview
-        last_msg_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conv.id)
-            .order_by(Message.sequence.desc())
-            .limit(1)
+        page = page.where(Conversation.user_id == user_id)
+    if cursor:
+        after_updated_at, after_id = _decode_cursor(cursor)
+        page = page.where(or_(
+            Conversation.updated_at < after_updated_at,
+            and_(Conversation.updated_at == after_updated_at, Conversation.id < after_id),
+        ))
+    elif offset:
+        page = page.offset(offset)
+    page = page.subquery()
+
+    query = (
+        select(page, func.substr(Message.content, 1, 50).label("preview"))
+        .outerjoin(
+            Message,
+            and_(Message.conversation_id == page.c.id, Message.sequence == page.c.message_count),
         )
-        last_msg = last_msg_result.scalar_one_or_none()
-
-        msg_count_result = await db.execute(
-            select(func.count(Message.id)).where(Message.conversation_id == conv.id)
+        .order_by(page.c.updated_at.desc(), page.c.id.desc())
+    )
+    rows = (await db.execute(query)).all()
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].updated_at, rows[-1].id)
+
+    return [
+        ConversationSummary(
+            conversation_id=row.id,
+            title=row.title,
+            started_at=row.created_at,
+            message_count=row.message_count,
+            last_message_preview=row.preview,
         )
-        msg_count = msg_count_result.scalar() or 0
-
-        summaries.append(ConversationSummary(
-            conversation_id=conv.id,
-            title=conv.title,
-            started_at=conv.created_at,
-            message_count=msg_count,
-            last_message_preview=last_msg.content[:50] if last_msg else None
-        ))
-
-    return summaries
+        for row in rows
+    ]
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationHistory)
@@ -17,15 +17,13 @@ from app.schemas.recommendation import (
     Difficulty,
     ProductType,
 )
-from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_base import get_knowledge_base
 from app.services.recommendation_engine import get_recommendation_engine
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/recommendations")
 
-kb_service = KnowledgeBaseService()
-
 
 @router.get("/care-programs", response_model=List[CareProgram])
 async def get_care_programs(
@@ -37,7 +35,7 @@ async def get_care_programs(
     Get personalized care program recommendations
     """
     focus_list = focus_areas.split(",") if focus_areas else None
-    programs = kb_service.search_care_programs(
+    programs = get_knowledge_base().search_care_programs(
         focus_areas=focus_list,
         intensity=intensity,
         limit=limit
@@ -54,7 +52,7 @@ async def get_exercises(
     """
     Get exercise recommendations (basic - no user context)
     """
-    exercises = kb_service.search_exercises(
+    exercises = get_knowledge_base().search_exercises(
         target_parameter=target_parameter,
         difficulty=difficulty,
         limit=limit
@@ -115,7 +113,7 @@ async def get_products(
     """
     Get product recommendations
     """
-    products = kb_service.search_products(
+    products = get_knowledge_base().search_products(
         condition=condition,
         product_type=product_type,
         limit=limit
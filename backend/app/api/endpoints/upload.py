@@ -3,9 +3,9 @@ File Upload Endpoints for Reports
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, select, or_
 from pathlib import Path
-import aiofiles
+from typing import List
 import uuid
 from datetime import datetime
 import structlog
@@ -15,6 +15,7 @@ from app.models.user import User
 from app.models.report import Report
 from app.core.config import settings
 from app.schemas.report import ReportUploadResponse
+from app.utils.uploads import UploadTooLarge, save_upload, user_upload_dir
 
 logger = structlog.get_logger()
 
@@ -53,29 +54,21 @@ async def upload_performance_report(
                 detail=f"File type {file_ext} not allowed. Allowed types: {', '.join(settings.ALLOWED_EXTENSIONS)}"
             )
         
-        # Check file size
-        content = await file.read()
-        if len(content) > settings.MAX_UPLOAD_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
-            )
-        
         # Generate unique filename
         file_id = str(uuid.uuid4())
         filename = f"{file_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}{file_ext}"
+        file_path = user_upload_dir(user_id) / filename
         
-        # Create user directory if it doesn't exist
-        user_dir = Path(settings.UPLOAD_DIR) / user_id
-        user_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = user_dir / filename
-        
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(content)
+        # Stream to disk, aborting once the size limit is exceeded
+        try:
+            stored = await save_upload(file, file_path)
+        except UploadTooLarge:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE / (1024*1024)}MB"
+            )
         
-        logger.info("file_uploaded", user_id=user_id, filename=filename, size=len(content))
+        logger.info("file_uploaded", user_id=user_id, filename=filename, size=stored.size, sha256=stored.sha256)
         
         # Create report record in database
         new_report = Report(
@@ -205,9 +198,11 @@ async def upload_document(
 ):
     """
     Upload a document (PDF, TXT, CSV) for RAG indexing.
-    The file is parsed into page-level chunks and indexed into ChromaDB.
+    The file is saved and queued for background parsing and indexing; the
+    response returns immediately with status="processing". Poll
+    GET /upload/document/{doc_id}/status for the result.
     """
-    from app.services.document_service import get_document_service
+    from app.services.ingestion_queue import IngestionJob, get_ingestion_queue
     from app.models.document import Document as DocumentModel
 
     try:
@@ -226,50 +221,80 @@ async def upload_document(
                 detail=f"Unsupported file type '{file_ext}'. Allowed: {', '.join(allowed)}",
             )
 
-        # Read and save file
-        content = await file.read()
-        if len(content) > settings.MAX_UPLOAD_SIZE:
+        # Stream file to disk
+        doc_id = str(uuid.uuid4())
+        file_path = user_upload_dir(user_id, "documents") / f"{doc_id}{file_ext}"
+        try:
+            stored = await save_upload(file, file_path)
+        except UploadTooLarge:
             raise HTTPException(status_code=413, detail="File too large (max 10 MB)")
+        logger.info("document_uploaded", user_id=user_id, doc_id=doc_id, size=stored.size, sha256=stored.sha256)
 
-        doc_id = str(uuid.uuid4())
-        user_dir = Path(settings.UPLOAD_DIR) / user_id / "documents"
-        user_dir.mkdir(parents=True, exist_ok=True)
-        file_path = user_dir / f"{doc_id}{file_ext}"
+        # Byte-identical to a document this user already indexed: reuse its
+        # chunks instead of parsing and embedding the file again
+        result = await db.execute(
+            select(DocumentModel)
+            .where(
+                DocumentModel.user_id == user_id,
+                DocumentModel.content_hash == stored.sha256,
+                DocumentModel.status == "indexed",
+            )
+            .limit(1)
+        )
+        original = result.scalar_one_or_none()
+        if original:
+            doc_record = DocumentModel(
+                id=doc_id,
+                user_id=user_id,
+                filename=file.filename,
+                file_type=file_ext.lstrip("."),
+                content_hash=stored.sha256,
+                chunk_doc_id=original.chunk_set_id,
+                page_count=original.page_count,
+                chunk_count=original.chunk_count,
+                status="indexed",
+            )
+            db.add(doc_record)
+            await db.commit()
+            stored.path.unlink(missing_ok=True)
+            logger.info("document_deduplicated", doc_id=doc_id, chunk_doc_id=original.chunk_set_id)
 
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
+            return {
+                "doc_id": doc_id,
+                "filename": file.filename,
+                "status": doc_record.status,
+                "page_count": doc_record.page_count,
+                "chunk_count": doc_record.chunk_count,
+                "deduplicated": True,
+            }
 
-        # Create DB record
+        # Create DB record; commit before queueing so the worker's update finds it
         doc_record = DocumentModel(
             id=doc_id,
             user_id=user_id,
             filename=file.filename,
             file_type=file_ext.lstrip("."),
+            content_hash=stored.sha256,
             status="processing",
         )
         db.add(doc_record)
-        await db.flush()
+        await db.commit()
 
-        # Ingest & index into ChromaDB
-        doc_service = get_document_service()
-        result_info = doc_service.ingest_file(
+        # Parse & index into ChromaDB in the background
+        await get_ingestion_queue().enqueue(IngestionJob(
+            doc_id=doc_id,
+            user_id=user_id,
             file_path=str(file_path),
             filename=file.filename,
-            user_id=user_id,
-            doc_id=doc_id,
-        )
-
-        doc_record.page_count = result_info.get("page_count", 0)
-        doc_record.chunk_count = result_info.get("chunk_count", 0)
-        doc_record.status = result_info.get("status", "failed")
-        await db.commit()
+        ))
 
         return {
             "doc_id": doc_id,
             "filename": file.filename,
-            "status": doc_record.status,
-            "page_count": doc_record.page_count,
-            "chunk_count": doc_record.chunk_count,
+            "status": "processing",
+            "page_count": 0,
+            "chunk_count": 0,
+            "deduplicated": False,
         }
 
     except HTTPException:
@@ -280,6 +305,150 @@ async def upload_document(
         raise HTTPException(status_code=500, detail="Failed to upload document")
 
 
+@router.post("/upload/documents/{user_id}/batch")
+async def upload_documents_batch(
+    user_id: str,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Upload several documents (PDF, TXT, CSV) for RAG indexing in one request.
+    The user is checked once, all Document rows are written in one commit and
+    the accepted files are queued as a single ingestion job that parses them
+    concurrently and upserts their chunks together. Each file gets its own
+    entry in `results`: "processing", "indexed" (identical to an indexed
+    document), "duplicate" (repeated in this request) or "rejected".
+    """
+    from app.services.ingestion_queue import IngestionJob, get_ingestion_queue
+    from app.models.document import Document as DocumentModel
+
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files ({len(files)}). Maximum per batch: {settings.UPLOAD_BATCH_MAX_FILES}",
+        )
+
+    try:
+        result = await db.execute(select(User.id).where(User.id == user_id))
+        if result.first() is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # Validate and stream every file to disk
+        allowed = [".pdf", ".txt", ".csv"]
+        upload_dir = user_upload_dir(user_id, "documents")
+        results = []
+        saved = []  # (result entry, stored upload, extension)
+        for file in files:
+            file_ext = Path(file.filename).suffix.lower()
+            if file_ext not in allowed:
+                results.append({
+                    "filename": file.filename,
+                    "status": "rejected",
+                    "error": f"Unsupported file type '{file_ext}'. Allowed: {', '.join(allowed)}",
+                })
+                continue
+            doc_id = str(uuid.uuid4())
+            try:
+                stored = await save_upload(file, upload_dir / f"{doc_id}{file_ext}")
+            except UploadTooLarge:
+                results.append({"filename": file.filename, "status": "rejected", "error": "File too large (max 10 MB)"})
+                continue
+            entry = {"doc_id": doc_id, "filename": file.filename}
+            results.append(entry)
+            saved.append((entry, stored, file_ext))
+
+        # One lookup for files identical to documents this user already indexed
+        hashes = {stored.sha256 for _, stored, _ in saved}
+        originals = {}
+        if hashes:
+            result = await db.execute(
+                select(DocumentModel).where(
+                    DocumentModel.user_id == user_id,
+                    DocumentModel.content_hash.in_(hashes),
+                    DocumentModel.status == "indexed",
+                )
+            )
+            for doc in result.scalars():
+                originals.setdefault(doc.content_hash, doc)
+
+        rows, jobs = [], []
+        first_in_batch = {}  # content hash -> doc_id of its first copy in this request
+        for entry, stored, file_ext in saved:
+            doc_id = entry["doc_id"]
+            if stored.sha256 in first_in_batch:
+                stored.path.unlink(missing_ok=True)
+                entry.update(doc_id=first_in_batch[stored.sha256], status="duplicate", deduplicated=True)
+                continue
+
+            first_in_batch[stored.sha256] = doc_id
+            original = originals.get(stored.sha256)
+            row = DocumentModel(
+                id=doc_id,
+                user_id=user_id,
+                filename=entry["filename"],
+                file_type=file_ext.lstrip("."),
+                content_hash=stored.sha256,
+                status="processing",
+            )
+            if original:
+                row.chunk_doc_id = original.chunk_set_id
+                row.page_count = original.page_count
+                row.chunk_count = original.chunk_count
+                row.status = "indexed"
+                stored.path.unlink(missing_ok=True)
+            else:
+                jobs.append(IngestionJob(
+                    doc_id=doc_id,
+                    user_id=user_id,
+                    file_path=str(stored.path),
+                    filename=entry["filename"],
+                ))
+            rows.append(row)
+            entry.update(status=row.status, deduplicated=original is not None)
+
+        # Commit every row before queueing so the worker's update finds them
+        db.add_all(rows)
+        await db.commit()
+        await get_ingestion_queue().enqueue_batch(jobs)
+        logger.info("document_batch_uploaded", user_id=user_id, files=len(files), queued=len(jobs),
+                    deduplicated=len(rows) - len(jobs))
+
+        return {
+            "user_id": user_id,
+            "total": len(files),
+            "queued": len(jobs),
+            "results": results,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("document_batch_upload_failed", error=str(e))
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to upload documents")
+
+
+@router.get("/upload/document/{doc_id}/status")
+async def get_document_status(doc_id: str, db: AsyncSession = Depends(get_db)):
+    """Poll the ingestion status of an uploaded document."""
+    from app.services.ingestion_queue import get_ingestion_queue
+    from app.models.document import Document as DocumentModel
+
+    result = await db.execute(select(DocumentModel).where(DocumentModel.id == doc_id))
+    doc = result.scalar_one_or_none()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    return {
+        "doc_id": doc.id,
+        "filename": doc.filename,
+        "status": doc.status,
+        "page_count": doc.page_count,
+        "chunk_count": doc.chunk_count,
+        "job": get_ingestion_queue().job_state(doc_id),
+    }
+
+
 @router.get("/upload/documents/{user_id}")
 async def get_user_documents(user_id: str, db: AsyncSession = Depends(get_db)):
     """Get all indexed documents for a user."""
@@ -316,10 +485,41 @@ async def delete_document(doc_id: str, db: AsyncSession = Depends(get_db)):
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # Remove chunks from ChromaDB
-    get_document_service().delete_document(doc_id)
+    # Remove chunks from ChromaDB unless another upload of the same file still uses them
+    chunk_set_id = doc.chunk_set_id
+    result = await db.execute(
+        select(DocumentModel.id)
+        .where(
+            or_(DocumentModel.id == chunk_set_id, DocumentModel.chunk_doc_id == chunk_set_id),
+            DocumentModel.id != doc_id,
+        )
+        .limit(1)
+    )
+    if result.first() is None:
+        get_document_service().delete_document(chunk_set_id, doc.user_id, doc.chunk_count)
 
     # Delete DB record
     await db.delete(doc)
     await db.commit()
     return {"status": "deleted", "doc_id": doc_id}
+
+
+@router.delete("/upload/documents/{user_id}")
+async def delete_user_documents(user_id: str, db: AsyncSession = Depends(get_db)):
+    """Delete all of a user's documents and their ChromaDB chunks."""
+    from app.services.document_service import get_document_service
+    from app.models.document import Document as DocumentModel
+
+    result = await db.execute(select(DocumentModel).where(DocumentModel.user_id == user_id))
+    docs = result.scalars().all()
+
+    # Deduplicated uploads share their original's chunk set; delete each set once
+    chunk_counts = {}
+    for doc in docs:
+        chunk_counts[doc.chunk_set_id] = max(chunk_counts.get(doc.chunk_set_id) or 0, doc.chunk_count or 0)
+    if chunk_counts:
+        get_document_service().delete_documents(user_id, chunk_counts)
+
+    await db.execute(delete(DocumentModel).where(DocumentModel.user_id == user_id))
+    await db.commit()
+    return {"status": "deleted", "user_id": user_id, "deleted": len(docs)}
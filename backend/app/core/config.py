@@ -39,14 +39,66 @@ class Settings(BaseSettings):
     # Groq API (Fast & Free!)
     GROQ_API_KEY: Optional[str] = None
     GROQ_MODEL: str = "llama-3.3-70b-versatile"  # Options: "llama-3.3-70b-versatile", "mixtral-8x7b-32768", "llama-3.1-8b-instant"
-    
+
+    # LLM provider HTTP pool & limits
+    GROQ_TIMEOUT_SECONDS: float = 30.0
+    CLAUDE_TIMEOUT_SECONDS: float = 60.0
+    POE_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONCURRENCY: int = 16  # In-flight LLM calls per provider
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 10
+
+    # LLM response cache
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_MAX_BYTES: int = 16 * 1024 * 1024  # 16MB
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    # Cosine threshold for near-duplicate hits; 0 (default) hits on exact normalized messages only.
+    # Bag-of-words embeddings can't tell "left knee" from "right knee" or "should" from "should not".
+    RESPONSE_CACHE_SIMILARITY: float = 0.0
+
+    # Startup warmup (see /ready)
+    WARMUP_RETRY_BACKOFF_SECONDS: float = 1.0  # Delay before re-running a failed required step; doubles each time
+    WARMUP_RETRY_MAX_BACKOFF_SECONDS: float = 30.0
+
+    # Background document ingestion
+    INGESTION_WORKERS: int = 2  # Files parsed/indexed concurrently
+    INGESTION_MAX_RETRIES: int = 2
+    INGESTION_RETRY_BACKOFF_SECONDS: float = 1.0  # Doubles on each retry
+    INGESTION_MAX_PENDING: int = 100  # Queued jobs before enqueue waits
+    INGESTION_BATCH_PARSE_WORKERS: int = 4  # Threads parsing the files of one batch upload
+
+    # Document indexing
+    DOCUMENT_INDEX_BATCH_SIZE: int = 500  # Chunks per Chroma upsert (capped at the client's max)
+    DOCUMENT_COLLECTION_PARTITIONS: int = 64  # User-hashed document collections (changing it needs a migration)
+    CSV_ROWS_PER_CHUNK: int = 20  # CSV rows packed into one chunk ("page")
+    CHUNK_MAX_TOKENS: int = 48  # Whitespace tokens per TXT/PDF chunk (~300 chars, inside the 500-char prompt excerpt)
+    CHUNK_OVERLAP_TOKENS: int = 8  # Trailing sentences (or the last one's tail) repeated at the start of the next chunk
+
+    # Document search (hybrid BM25 + vector)
+    HYBRID_SEARCH_ENABLED: bool = True
+    HYBRID_CANDIDATES: int = 20  # Chunks taken from each ranking before fusion
+    HYBRID_RRF_K: int = 60  # Reciprocal rank fusion constant
+    HYBRID_KEYWORD_MIN_RATIO: float = 0.25  # Keyword hits scoring below this fraction of the best are dropped
+    HYBRID_INDEX_MAX_USERS: int = 1000  # Users' keyword indexes kept in memory (LRU)
+
+    # PDF parsing
+    PDF_PARALLEL_MIN_PAGES: int = 40  # Smaller PDFs are parsed in-process
+    PDF_PARSE_WORKERS: int = 0  # Worker processes (0 = CPU count)
+
     # ChromaDB
     CHROMA_PERSIST_DIR: str = "./data/chromadb"
     CHROMA_COLLECTION_NAME: str = "msk_knowledge_base"
+
+    # Prebuilt knowledge base index (<path>.json + the <path>.<digest>.npy it names, built with
+    # `python -m app.services.kb_index_build`); rebuilt in memory when missing, stale or unreadable
+    KB_INDEX_PATH: str = "./data/kb_index"
     
     # File Upload
     UPLOAD_DIR: str = "./data/uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    UPLOAD_BATCH_MAX_FILES: int = 50  # Files per batch document upload
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024  # Bytes held in memory per upload while streaming to disk
     ALLOWED_EXTENSIONS: list = [".pdf", ".jpg", ".jpeg", ".png", ".txt", ".csv"]
     
     # Logging
@@ -2,6 +2,7 @@
 MSK Wellness AI Chatbot - Main FastAPI Application
 """
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -9,10 +10,11 @@ import structlog
 
 from app.core.config import settings
 from app.api.endpoints import chat, reports, users, recommendations
-from app.db.init_db import init_db
 from app.utils.logging import configure_logging
-from app.services.vector_store import get_vector_store
-from app.services.knowledge_base import get_all_exercises
+from app.services.warmup import build_app_warmup
+from app.services.llm_providers import close_http_client
+from app.services.ingestion_queue import shutdown_ingestion_queue
+from app.utils.pdf_parser import shutdown_pdf_pool
 
 # Configure logging
 logger = configure_logging()
@@ -28,32 +30,21 @@ async def lifespan(app: FastAPI):
     Path(settings.UPLOAD_DIR).mkdir(parents=True, exist_ok=True)
     Path(settings.CHROMA_PERSIST_DIR).mkdir(parents=True, exist_ok=True)
     
-    # Initialize database
-    try:
-        await init_db()
-        logger.info("database_initialized")
-    except Exception as e:
-        logger.error("database_initialization_failed", error=str(e))
+    # Live now; schema, pools, indexes and SDKs warm up in the background (see /ready)
+    warmup = build_app_warmup()
+    app.state.warmup = warmup
+    warmup.start()
     
-    # Initialize vector store and index exercises
-    try:
-        vector_store = get_vector_store()
-        exercises = get_all_exercises()
-        if exercises and vector_store.collection and vector_store.collection.count() == 0:
-            vector_store.index_exercises(exercises)
-            logger.info("vector_store_initialized", exercises_indexed=len(exercises))
-        elif not vector_store.collection:
-            logger.info("vector_store_disabled", reason="ChromaDB not available")
-    except Exception as e:
-        logger.warning("vector_store_initialization_failed", error=str(e))
-        logger.info("continuing_without_vector_store")
-    
-    logger.info("application_ready", app_name=settings.APP_NAME)
+    logger.info("application_live", app_name=settings.APP_NAME)
     
     yield
     
     # Shutdown
     logger.info("application_shutting_down", app_name=settings.APP_NAME)
+    await warmup.stop()
+    await shutdown_ingestion_queue()
+    shutdown_pdf_pool()
+    await close_http_client()
 
 
 # Create FastAPI app
@@ -71,6 +62,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Add error handling
@@ -125,5 +117,15 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: 200 once startup warmup has finished, 503 (with per-component status) until then"""
+    warmup = getattr(app.state, "warmup", None)
+    if warmup is None:
+        return JSONResponse(status_code=503, content={"ready": False, "components": {}})
+    report = warmup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
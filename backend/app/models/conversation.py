@@ -1,7 +1,7 @@
 """
 Conversation and Message models for chat history
 """
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -12,6 +12,10 @@ from app.db.base import Base
 class Conversation(Base):
     """Conversation model for tracking chat sessions"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Conversation list: filter by user, newest first, id as keyset tie-break
+        Index("ix_conversations_user_id_updated_at", "user_id", "updated_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -20,6 +24,10 @@ class Conversation(Base):
     
     title = Column(String, nullable=True)  # Optional conversation title
     
+    # Messages are append-only, so the count doubles as the last assigned
+    # Message.sequence; bumped atomically with UPDATE ... RETURNING
+    message_count = Column(Integer, default=0, server_default="0", nullable=False)
+    
     # Relationships
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan", order_by="Message.created_at")
@@ -31,6 +39,10 @@ class Conversation(Base):
 class Message(Base):
     """Message model for individual chat messages"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # History, last-message preview and transcript all read by sequence
+        Index("ix_messages_conversation_id_sequence", "conversation_id", "sequence"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
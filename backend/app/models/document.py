@@ -1,7 +1,7 @@
 """
 Document model for tracking uploaded documents and their indexing status.
 """
-from sqlalchemy import Column, String, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -12,6 +12,10 @@ from app.db.base import Base
 class Document(Base):
     """Tracks uploaded documents and their ChromaDB indexing status"""
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_user_id_created_at", "user_id", "created_at"),
+        Index("ix_documents_user_id_content_hash", "user_id", "content_hash"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -20,10 +24,19 @@ class Document(Base):
     page_count = Column(Integer, default=0)
     chunk_count = Column(Integer, default=0)
     status = Column(String, default="processing")  # processing, indexed, failed
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the uploaded bytes
+    # Document whose ChromaDB chunks this row uses; NULL means its own (id).
+    # Byte-identical re-uploads point at the first copy instead of re-indexing.
+    chunk_doc_id = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="documents")
 
+    @property
+    def chunk_set_id(self) -> str:
+        """The doc_id its chunks are stored under in ChromaDB."""
+        return self.chunk_doc_id or self.id
+
     def __repr__(self):
         return f"<Document(id={self.id}, filename={self.filename}, status={self.status})>"
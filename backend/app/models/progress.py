@@ -1,7 +1,7 @@
 """
 Progress tracking model
 """
-from sqlalchemy import Column, String, DateTime, JSON, Float, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, JSON, Float, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -12,6 +12,11 @@ from app.db.base import Base
 class Progress(Base):
     """Progress model for tracking user improvement over time"""
     __tablename__ = "progress"
+    __table_args__ = (
+        # Per-metric trends, plus the all-metrics history/summary windows
+        Index("ix_progress_user_id_metric_name_recorded_at", "user_id", "metric_name", "recorded_at"),
+        Index("ix_progress_user_id_recorded_at", "user_id", "recorded_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -1,7 +1,7 @@
 """
 Report model for storing user performance reports
 """
-from sqlalchemy import Column, String, DateTime, JSON, Float, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, JSON, Float, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -12,6 +12,9 @@ from app.db.base import Base
 class Report(Base):
     """Report model for game/sport performance assessments"""
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_user_id_created_at", "user_id", "created_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -25,6 +25,7 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     include_context: bool = True
     user_id: Optional[str] = None
+    bypass_cache: bool = False  # Skip the LLM response cache for this request
 
 
 class FunctionCall(BaseModel):
@@ -0,0 +1,230 @@
+"""
+BM25 Keyword Index - In-process inverted index with Okapi BM25 scoring.
+
+The hash embeddings count words without any IDF weighting, so "the" and
+"session" weigh as much as "hamstring". BM25 ranks by rare, matching terms and
+is fused with the vector ranking (reciprocal_rank_fusion) for hybrid search.
+
+Postings are stored per term as two compact arrays (slot numbers and term
+frequencies) instead of Python lists of tuples. Removing an entry only
+tombstones its slot; the index is compacted once tombstones outnumber live
+entries. Until then document frequencies still count removed entries, the
+same trade-off segment-based search engines make between merges.
+
+UserKeywordIndex keeps one BM25Index per user, built lazily from the user's
+stored chunks on first search and then maintained incrementally, with an
+LRU bound on how many users are held in memory. A user's index is published
+only once fully loaded: concurrent first searches wait for the one load,
+chunks added or removed meanwhile are replayed onto it, and a failed load
+leaves nothing cached, so the next search retries.
+"""
+import math
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens (punctuation stripped)."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """Inverted index over (id, text) entries, scored with Okapi BM25."""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}  # term -> (slots, term frequencies)
+        self._ids: List[Optional[str]] = []  # slot -> entry id (None once removed)
+        self._lengths = array("I")  # slot -> token count
+        self._slots: Dict[str, int] = {}  # entry id -> slot
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index entries; an id already present is replaced."""
+        for entry_id, text in zip(ids, texts):
+            if entry_id in self._slots:
+                self._tombstone(entry_id)
+            slot = len(self._ids)
+            tokens = tokenize(text)
+            self._ids.append(entry_id)
+            self._lengths.append(len(tokens))
+            self._slots[entry_id] = slot
+            self._total_length += len(tokens)
+
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("I"), array("H"))
+                postings[0].append(slot)
+                postings[1].append(min(tf, 0xFFFF))
+
+    def remove(self, ids: Iterable[str]) -> None:
+        for entry_id in ids:
+            if entry_id in self._slots:
+                self._tombstone(entry_id)
+        if len(self._ids) - len(self._slots) > max(64, len(self._slots)):
+            self._compact()
+
+    def search(self, query: str, n: int) -> List[Tuple[str, float]]:
+        """Top-n (id, score) entries for the query, best first."""
+        live = len(self._slots)
+        if not live or n <= 0:
+            return []
+        avg_length = self._total_length / live or 1.0
+        k1, b = self.K1, self.B
+        lengths, ids = self._lengths, self._ids
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            slots, freqs = postings
+            df = min(len(slots), live)
+            idf = math.log(1.0 + (live - df + 0.5) / (df + 0.5))
+            for slot, tf in zip(slots, freqs):
+                if ids[slot] is None:
+                    continue
+                norm = k1 * (1.0 - b + b * lengths[slot] / avg_length)
+                scores[slot] = scores.get(slot, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(ids[slot], score) for slot, score in best]
+
+    def _tombstone(self, entry_id: str) -> None:
+        slot = self._slots.pop(entry_id)
+        self._ids[slot] = None
+        self._total_length -= self._lengths[slot]
+
+    def _compact(self) -> None:
+        """Drop removed slots and renumber the survivors."""
+        remap = {}
+        ids: List[Optional[str]] = []
+        lengths = array("I")
+        for slot, entry_id in enumerate(self._ids):
+            if entry_id is not None:
+                remap[slot] = len(ids)
+                ids.append(entry_id)
+                lengths.append(self._lengths[slot])
+
+        postings: Dict[str, Tuple[array, array]] = {}
+        for term, (slots, freqs) in self._postings.items():
+            new_slots, new_freqs = array("I"), array("H")
+            for slot, tf in zip(slots, freqs):
+                if slot in remap:
+                    new_slots.append(remap[slot])
+                    new_freqs.append(tf)
+            if new_slots:
+                postings[term] = (new_slots, new_freqs)
+
+        self._ids, self._lengths, self._postings = ids, lengths, postings
+        self._slots = {entry_id: slot for slot, entry_id in enumerate(ids)}
+
+
+class _PendingLoad:
+    """A user's index being loaded: changes made meanwhile, and the outcome."""
+
+    def __init__(self):
+        self.changes: List[Tuple[str, tuple]] = []  # (BM25Index method, args) to replay
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class UserKeywordIndex:
+    """
+    One BM25Index per user, loaded on demand.
+
+    Args:
+        loader: returns (ids, texts) of all of a user's stored chunks
+        max_users: users kept in memory; the least recently searched are evicted
+    """
+
+    def __init__(self, loader: Callable[[str], Tuple[List[str], List[str]]], max_users: int = 1000):
+        self._loader = loader
+        self._max_users = max_users
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._loading: Dict[str, _PendingLoad] = {}
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """Index new chunks of a loaded user (unloaded users pick them up when loaded)."""
+        self._apply(user_id, "add", (list(ids), list(texts)))
+
+    def remove(self, user_id: str, ids: Iterable[str]) -> None:
+        self._apply(user_id, "remove", (list(ids),))
+
+    def search(self, user_id: str, query: str, n: int) -> List[Tuple[str, float]]:
+        index = self._get_or_load(user_id)
+        with self._lock:
+            return index.search(query, n)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def _apply(self, user_id: str, method: str, args: tuple) -> None:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                getattr(index, method)(*args)
+            elif user_id in self._loading:
+                self._loading[user_id].changes.append((method, args))
+
+    def _get_or_load(self, user_id: str) -> BM25Index:
+        """The user's index; the first caller loads it while concurrent callers wait."""
+        while True:
+            with self._lock:
+                index = self._indexes.get(user_id)
+                if index is not None:
+                    self._indexes.move_to_end(user_id)
+                    return index
+                load = self._loading.get(user_id)
+                if load is None:
+                    load = self._loading[user_id] = _PendingLoad()
+                    break
+            load.done.wait()
+            if load.error is not None:
+                raise load.error
+
+        try:
+            ids, texts = self._loader(user_id)
+            index = BM25Index()
+            index.add(ids, texts)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[user_id]
+            load.error = e
+            load.done.set()
+            raise
+
+        with self._lock:
+            for method, args in load.changes:
+                getattr(index, method)(*args)
+            del self._loading[user_id]
+            self._indexes[user_id] = index
+            while len(self._indexes) > self._max_users:
+                self._indexes.popitem(last=False)
+        load.done.set()
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several best-first id rankings: score(id) = sum of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, entry_id in enumerate(ranking, start=1):
+            scores[entry_id] = scores.get(entry_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
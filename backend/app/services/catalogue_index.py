@@ -0,0 +1,110 @@
+"""
+Catalogue Index - Id and facet lookups over a list of catalogue records.
+
+The knowledge base keeps exercises, care programs and products as lists of
+dicts. CatalogueIndex is built once per list at load time and holds:
+
+- an id -> record dict and id -> row position map,
+- facet postings (field value -> row positions) for exact filters such as
+  difficulty, intensity or type; list-valued fields (focus_areas, use_cases)
+  post every element,
+- a token vocabulary (whitespace token -> row positions) for substring
+  filters. A needle without whitespace occurs inside a value exactly when it
+  occurs inside one of the value's tokens, so matches come from scanning the
+  vocabulary, not the records. A needle with whitespace is looked up by its
+  longest piece and the candidates are verified with the substring test.
+
+Filters return sets of row positions; select() intersects them and returns
+the records in catalogue order, so results match a linear scan exactly.
+"""
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+def _values(record: Dict[str, Any], field: str) -> List[Any]:
+    value = record.get(field)
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+class CatalogueIndex:
+    """Hash-map lookups by id and inverted indexes by field over one record list."""
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        id_field: str,
+        facets: Sequence[str] = (),
+        text_fields: Sequence[str] = (),
+    ):
+        self.records = records
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.positions: Dict[str, int] = {}
+        self.facets: Dict[str, Dict[Any, Set[int]]] = {field: {} for field in facets}
+        self.tokens: Dict[str, Dict[str, Tuple[str, Set[int]]]] = {field: {} for field in text_fields}
+
+        for row, record in enumerate(records):
+            self.by_id[record[id_field]] = record
+            self.positions[record[id_field]] = row
+            for field, postings in self.facets.items():
+                for value in _values(record, field):
+                    postings.setdefault(value, set()).add(row)
+            for field, postings in self.tokens.items():
+                for value in _values(record, field):
+                    for token in str(value).split():
+                        postings.setdefault(token, (token.lower(), set()))[1].add(row)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(record_id)
+
+    def rows_for_ids(self, ids: Iterable[str]) -> Set[int]:
+        """Row positions of the given ids (unknown ids are ignored)."""
+        return {self.positions[i] for i in ids if i in self.positions}
+
+    def matching(self, field: str, values: Iterable[Any]) -> Set[int]:
+        """Rows whose field equals (or, for list fields, contains) any of values."""
+        postings = self.facets[field]
+        rows: Set[int] = set()
+        for value in values:
+            rows |= postings.get(value, set())
+        return rows
+
+    def containing(self, fields: Sequence[str], needle: str, case_sensitive: bool = True) -> Set[int]:
+        """Rows where needle is a substring of some value of any of fields."""
+        if not case_sensitive:
+            needle = needle.lower()
+        pieces = needle.split()
+        if not pieces:
+            candidates = set(range(len(self.records)))
+        else:
+            piece = max(pieces, key=len)
+            candidates: Set[int] = set()
+            for field in fields:
+                for token, (lowered, rows) in self.tokens[field].items():
+                    if piece in (token if case_sensitive else lowered):
+                        candidates |= rows
+            if pieces == [needle]:
+                return candidates
+
+        return {
+            row for row in candidates
+            if any(
+                needle in (str(value) if case_sensitive else str(value).lower())
+                for field in fields
+                for value in _values(self.records[row], field)
+            )
+        }
+
+    def select(self, *row_sets: Optional[Set[int]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Records in every given row set (None = no filter), in catalogue order."""
+        sets = sorted((s for s in row_sets if s is not None), key=len)
+        if sets:
+            rows = sets[0].intersection(*sets[1:])
+            rows = sorted(rows) if limit is None else heapq.nsmallest(limit, rows)
+        else:
+            rows = range(len(self.records))[:limit]
+        return [self.records[row] for row in rows]
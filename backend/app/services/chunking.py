@@ -0,0 +1,97 @@
+"""
+Text Chunking - Token-budgeted, sentence-aware chunks with overlap.
+
+Text is split into sentences, which are packed greedily into chunks of at most
+CHUNK_MAX_TOKENS whitespace tokens (the unit the hash embeddings count). Each
+new chunk repeats the trailing sentences of the previous one, up to
+CHUNK_OVERLAP_TOKENS, so a fact that straddles a boundary is still retrievable
+whole; when the last sentence is longer than that, its last
+CHUNK_OVERLAP_TOKENS tokens are repeated instead. A single sentence longer than the budget is cut into overlapping word
+windows. Small chunks keep hash-embedding similarity focused and fit the
+per-chunk excerpt the chat prompt includes.
+"""
+import re
+from typing import Iterator, List, Optional
+
+from app.core.config import settings
+
+# Sentence ends: terminal punctuation (optionally closed by a quote/bracket)
+# followed by whitespace, or a line break (bullets, table rows, headings).
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*")
+
+
+def _sentence_tokens(text: str) -> Iterator[List[str]]:
+    """Yield the whitespace tokens of each non-empty sentence."""
+    for sentence in _SENTENCE_BREAK.split(text):
+        tokens = sentence.split()
+        if tokens:
+            yield tokens
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into non-empty, whitespace-normalized sentences."""
+    return [" ".join(tokens) for tokens in _sentence_tokens(text)]
+
+
+def chunk_text(
+    text: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None,
+) -> Iterator[str]:
+    """Yield chunks of `text` of at most max_tokens tokens, overlapping by up to overlap_tokens."""
+    max_tokens = max_tokens or settings.CHUNK_MAX_TOKENS
+    overlap_tokens = settings.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+
+    window: List[List[str]] = []  # Sentences (as token lists) of the chunk being built
+    size = 0
+    fresh = False  # Whether the window holds anything not yet emitted
+
+    for tokens in _sentence_tokens(text):
+        if len(tokens) > max_tokens:
+            # Flush, then cut the long sentence into overlapping windows
+            if fresh:
+                yield _join(window)
+            for start in range(0, len(tokens) - overlap_tokens, max_tokens - overlap_tokens):
+                yield " ".join(tokens[start:start + max_tokens])
+            tail = tokens[-overlap_tokens:] if overlap_tokens else []
+            window, size, fresh = ([tail] if tail else []), len(tail), False
+            continue
+
+        if size + len(tokens) > max_tokens:
+            if fresh:
+                yield _join(window)
+                window = _overlap(window, overlap_tokens)
+                size = sum(map(len, window))
+            # Drop overlap that would leave no room for the new sentence
+            while window and size + len(tokens) > max_tokens:
+                size -= len(window.pop(0))
+
+        window.append(tokens)
+        size += len(tokens)
+        fresh = True
+
+    if fresh:
+        yield _join(window)
+
+
+def _join(window: List[List[str]]) -> str:
+    return " ".join(" ".join(tokens) for tokens in window)
+
+
+def _overlap(window: List[List[str]], overlap_tokens: int) -> List[List[str]]:
+    """Trailing whole sentences of the window that fit in the overlap budget.
+
+    When the last sentence alone is over the budget, its last overlap_tokens
+    tokens are carried instead, so neighbouring chunks still share context.
+    """
+    kept: List[List[str]] = []
+    size = 0
+    for tokens in reversed(window):
+        if size + len(tokens) > overlap_tokens:
+            break
+        kept.insert(0, tokens)
+        size += len(tokens)
+    if not kept and window and overlap_tokens:
+        kept = [window[-1][-overlap_tokens:]]
+    return kept
@@ -0,0 +1,39 @@
+"""
+Document Collection Migration - Move user document chunks into the
+user-hashed partition collections.
+
+Chunks indexed before partitioning live in the shared `user_documents`
+collection; changing DOCUMENT_COLLECTION_PARTITIONS leaves them in the old
+partitions. DocumentService keeps reading those until they are migrated, at
+the cost of an extra query per search. Run once after upgrading (safe to
+rerun; the API can stay up):
+
+    cd backend && python -m app.services.document_migration [--batch-size N]
+"""
+import argparse
+
+import structlog
+
+from app.services.document_service import get_document_service
+
+logger = structlog.get_logger()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move document chunks into partition collections")
+    parser.add_argument("--batch-size", type=int, default=None, help="Chunks moved per page")
+    args = parser.parse_args()
+
+    service = get_document_service()
+    if not service.is_available:
+        raise SystemExit("ChromaDB is not available")
+
+    moved = service.migrate_legacy_collections(batch_size=args.batch_size)
+    if not moved:
+        print("Nothing to migrate")
+    for name, count in moved.items():
+        print(f"{name}: moved {count} chunks into {service.partitions} partitions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,36 @@
 """
-Document Ingestion Service — Parse documents into page-level chunks and index into ChromaDB.
+Document Ingestion Service — Parse documents into chunks and index them into ChromaDB.
 Supports PDF, TXT, and CSV files.
 """
 import os
 import csv
-import uuid
 import hashlib
-import math
-from typing import List, Dict, Any, Optional
+import itertools
+import threading
+import uuid
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 import structlog
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-    CHROMADB_AVAILABLE = True
-except ImportError:
-    CHROMADB_AVAILABLE = False
-    chromadb = None
-
 from app.core.config import settings
+from app.services.bm25 import UserKeywordIndex, reciprocal_rank_fusion
+from app.services.embeddings import (
+    LEGACY_VERSION,
+    VERSION_METADATA_KEY,
+    HashEmbeddingFunction,
+    get_or_create_hash_collection,
+    open_persistent_client,
+)
+from app.services.chunking import chunk_text
+from app.services.registry import registry
+from app.utils.lazy_imports import optional_import
+from app.utils.pdf_parser import parse_pdf
 
 logger = structlog.get_logger()
 
-# ---------------------------------------------------------------------------
-# Embedding function (same hash-based approach as VectorStore)
-# ---------------------------------------------------------------------------
-
-class HashEmbeddingFunction:
-    """Bag-of-words embedding using hash buckets — no model download required."""
-
-    DIM = 512
-
-    def name(self) -> str:
-        return "hash_embedding_fn"
-
-    def __call__(self, input):
-        result = []
-        for text in input:
-            vec = [0.0] * self.DIM
-            words = text.lower().split()
-            for word in words:
-                h = int(hashlib.md5(word.encode()).hexdigest(), 16)
-                idx = h % self.DIM
-                vec[idx] += 1.0
-            norm = math.sqrt(sum(x * x for x in vec)) or 1.0
-            vec = [x / norm for x in vec]
-            result.append(vec)
-        return result
-
+T = TypeVar("T")
 
 # ---------------------------------------------------------------------------
 # Document Service
@@ -56,224 +39,641 @@ class HashEmbeddingFunction:
 class DocumentService:
     """
     Handles document parsing, chunking, and indexing into ChromaDB.
-    Each document is split into page-level chunks for fine-grained retrieval.
+    PDF pages and text files are split into token-budgeted, overlapping
+    chunks (see chunking.py); CSV rows are grouped CSV_ROWS_PER_CHUNK to a chunk.
+
+    Chunk ids are derived from the document id and chunk ordinal (chunk_id()),
+    so with a document's chunk count (from the Document row, or the registry
+    of documents indexed by this process) its chunks are fetched or deleted
+    by id instead of scanning every user's chunk metadata.
+
+    Users are spread over DOCUMENT_COLLECTION_PARTITIONS collections by a hash
+    of their id (partition_name()), so a search or lookup only touches the
+    chunks of the users sharing that partition. Collections left over from the
+    single shared collection (or a different partition count) are still read
+    and deleted from until migrate_legacy_collections() empties them; one
+    dropped by a migration in another process is forgotten on first miss.
+
+    Searches are hybrid: the vector ranking is fused with a BM25 keyword
+    ranking (bm25.py) by reciprocal rank, since the hash embeddings have no
+    IDF weighting. The keyword index is kept in step with every upsert and
+    delete made through this service.
     """
 
     COLLECTION_NAME = "user_documents"
-    CHUNK_SIZE = 1000  # chars per chunk for TXT files
 
     def __init__(self):
         self.client = None
-        self.collection = None
+        self.partitions = max(1, settings.DOCUMENT_COLLECTION_PARTITIONS)
+        self._collections: Dict[str, Any] = {}  # partition name -> collection, opened lazily
+        self._embedders: Dict[str, HashEmbeddingFunction] = {}  # collection name -> its embedder
+        self._legacy_collections: List[Any] = []
+        self._lock = threading.Lock()
+        self._chunk_counts: Dict[str, int] = {}  # doc_id -> chunks indexed by this process
+        self.keyword_index = UserKeywordIndex(self._load_user_chunks, max_users=settings.HYBRID_INDEX_MAX_USERS)
         self._init_collection()
 
     def _init_collection(self):
-        """Initialize a separate ChromaDB collection for user documents."""
-        if not CHROMADB_AVAILABLE:
+        """Open the ChromaDB client and find non-empty collections awaiting migration."""
+        chromadb = optional_import("chromadb")
+        if chromadb is None:
             logger.warning("ChromaDB not available — document indexing disabled")
             return
         try:
             os.makedirs(settings.CHROMA_PERSIST_DIR, exist_ok=True)
-            self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIR)
-            self.collection = self.client.get_or_create_collection(
-                name=self.COLLECTION_NAME,
-                embedding_function=HashEmbeddingFunction(),
-                metadata={"description": "User-uploaded documents for RAG"},
+            self.client = open_persistent_client(chromadb, settings.CHROMA_PERSIST_DIR)
+            for name in self._legacy_collection_names():
+                collection = self._open(name)
+                if collection.count():
+                    self._legacy_collections.append(collection)
+            logger.info(
+                "DocumentService ready",
+                partitions=self.partitions,
+                legacy_collections=[c.name for c in self._legacy_collections],
             )
-            logger.info("DocumentService collection ready", collection=self.COLLECTION_NAME)
         except Exception as e:
+            self.client = None
             logger.error("Failed to init document collection", error=str(e))
 
     @property
     def is_available(self) -> bool:
-        return self.collection is not None
+        return self.client is not None
+
+    def collection_for(self, user_id: str):
+        """The partition collection holding a user's chunks (created on first use)."""
+        return self._partition(partition_name(user_id, self.partitions, self.COLLECTION_NAME))
+
+    def _partition(self, name: str):
+        collection = self._collections.get(name)
+        if collection is None:
+            with self._lock:
+                collection = self._collections.get(name)
+                if collection is None:
+                    collection = self._collections[name] = self._open(name)
+        return collection
+
+    def _open(self, name: str):
+        collection = get_or_create_hash_collection(
+            self.client,
+            name,
+            metadata={"description": "User-uploaded documents for RAG"},
+        )
+        version = (collection.metadata or {}).get(VERSION_METADATA_KEY, LEGACY_VERSION)
+        self._embedders[name] = HashEmbeddingFunction(version=version)
+        return collection
+
+    def _embedder(self, collection) -> HashEmbeddingFunction:
+        return self._embedders[collection.name]
+
+    def _legacy_collection_names(self) -> List[str]:
+        """The shared collection and partitions of other partition counts."""
+        current = f"{self.COLLECTION_NAME}_p{self.partitions}_"
+        names = [getattr(c, "name", c) for c in self.client.list_collections()]
+        return sorted(
+            name for name in names
+            if name == self.COLLECTION_NAME
+            or (name.startswith(f"{self.COLLECTION_NAME}_p") and not name.startswith(current))
+        )
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
 
-    def ingest_file(self, file_path: str, filename: str, user_id: str, doc_id: str) -> Dict[str, Any]:
+    def ingest_file(
+        self,
+        file_path: str,
+        filename: str,
+        user_id: str,
+        doc_id: str,
+        on_progress: Optional[Callable[[int], None]] = None,
+    ) -> Dict[str, Any]:
         """
         Parse a file into chunks and index them into ChromaDB.
+        Parsers yield chunks lazily and they are upserted in batches of
+        DOCUMENT_INDEX_BATCH_SIZE, so memory stays flat however large the file.
+
+        Args:
+            on_progress: called with the running chunk count after each batch
 
         Returns:
-            dict with page_count, chunk_count, status
+            dict with page_count, chunk_count, status (plus error/retryable on failure)
         """
         ext = os.path.splitext(filename)[1].lower()
-        try:
-            if ext == ".pdf":
-                chunks = self._parse_pdf(file_path)
-            elif ext == ".txt":
-                chunks = self._parse_txt(file_path)
-            elif ext == ".csv":
-                chunks = self._parse_csv(file_path)
-            else:
-                return {"page_count": 0, "chunk_count": 0, "status": "failed", "error": f"Unsupported file type: {ext}"}
+        parsers = {".pdf": self._parse_pdf, ".txt": self._parse_txt, ".csv": self._parse_csv}
+        if ext not in parsers:
+            return {"page_count": 0, "chunk_count": 0, "status": "failed", "error": f"Unsupported file type: {ext}"}
 
-            if not chunks:
+        chunk_count = 0
+        page_count = 0
+        attempted = 0
+        try:
+            for batch in _batched(parsers[ext](file_path), self._batch_size()):
+                attempted += len(batch)
+                self._index_chunks(batch, doc_id=doc_id, user_id=user_id, filename=filename, start_index=chunk_count)
+                chunk_count += len(batch)
+                page_count = max(page_count, max(c.get("page", 1) for c in batch))
+                logger.info("Indexing progress", doc_id=doc_id, chunks_indexed=chunk_count)
+                if on_progress:
+                    on_progress(chunk_count)
+
+            if not chunk_count:
                 return {"page_count": 0, "chunk_count": 0, "status": "failed", "error": "No content extracted"}
+            self._chunk_counts[doc_id] = chunk_count
+            return {"page_count": page_count, "chunk_count": chunk_count, "status": "indexed"}
 
-            self._index_chunks(chunks, doc_id=doc_id, user_id=user_id, filename=filename)
+        except Exception as e:
+            logger.error("Document ingestion failed", error=str(e), filename=filename, chunks_indexed=chunk_count)
+            if attempted:
+                self.delete_document(doc_id, user_id, attempted)  # Don't leave a half-indexed document searchable
+            # Parse/index errors may be transient (locked file, Chroma busy); the
+            # ingestion queue retries these but not the deterministic failures above.
+            return {"page_count": 0, "chunk_count": 0, "status": "failed", "error": str(e), "retryable": True}
+
+    def ingest_files(
+        self,
+        files: List[Dict[str, str]],
+        user_id: str,
+        max_workers: Optional[int] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Parse several of one user's files concurrently and index them together.
+        Files are parsed on up to INGESTION_BATCH_PARSE_WORKERS threads and
+        their chunks pooled into shared upserts of DOCUMENT_INDEX_BATCH_SIZE, so
+        a batch of small reports costs a few Chroma round trips rather than one
+        or more per file. Each file's chunks are held in memory until upserted
+        (uploads are capped at MAX_UPLOAD_SIZE).
 
-            page_count = max(c.get("page", 1) for c in chunks)
-            return {"page_count": page_count, "chunk_count": len(chunks), "status": "indexed"}
+        Args:
+            files: dicts with doc_id, file_path and filename
+            on_progress: called with (doc_id, chunk count) once a file's chunks are upserted
 
-        except Exception as e:
-            logger.error("Document ingestion failed", error=str(e), filename=filename)
-            return {"page_count": 0, "chunk_count": 0, "status": "failed", "error": str(e)}
+        Returns:
+            doc_id -> result dict, as returned by ingest_file
+        """
+        parsers = {".pdf": self._parse_pdf, ".txt": self._parse_txt, ".csv": self._parse_csv}
+        results: Dict[str, Dict[str, Any]] = {}
+        counts: Dict[str, Dict[str, int]] = {}  # doc_id -> pages/chunks parsed
+        unflushed: Dict[str, int] = {}  # doc_id -> chunks still waiting in `pending`
+        pending: List[Dict[str, Any]] = []
+        batch_size = self._batch_size()
+
+        def fail(doc_id: str, error: str, retryable: bool = True):
+            results[doc_id] = {"page_count": 0, "chunk_count": 0, "status": "failed", "error": error}
+            if retryable:
+                results[doc_id]["retryable"] = True
+
+        def flush(batch: List[Dict[str, Any]]):
+            doc_ids = {r["metadata"]["doc_id"] for r in batch}
+            try:
+                self._upsert_records(batch, user_id)
+            except Exception as e:
+                logger.error("Batch indexing failed", error=str(e), documents=len(doc_ids))
+                for doc_id in doc_ids:
+                    fail(doc_id, str(e))
+                return
+            for record in batch:
+                unflushed[record["metadata"]["doc_id"]] -= 1
+            for doc_id in doc_ids:
+                if not unflushed[doc_id] and on_progress:
+                    on_progress(doc_id, counts[doc_id]["chunks"])
+
+        def parse(file: Dict[str, str]) -> List[Dict[str, Any]]:
+            ext = os.path.splitext(file["filename"])[1].lower()
+            return list(parsers[ext](file["file_path"]))
+
+        to_parse = []
+        for file in files:
+            ext = os.path.splitext(file["filename"])[1].lower()
+            if ext in parsers:
+                to_parse.append(file)
+            else:
+                fail(file["doc_id"], f"Unsupported file type: {ext}", retryable=False)
+
+        workers = max(1, min(max_workers or settings.INGESTION_BATCH_PARSE_WORKERS, len(to_parse) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="doc-parse") as pool:
+            futures = {pool.submit(parse, file): file for file in to_parse}
+            for future in as_completed(futures):
+                file = futures[future]
+                doc_id = file["doc_id"]
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    logger.error("Document parsing failed", error=str(e), filename=file["filename"])
+                    fail(doc_id, str(e))
+                    continue
+                if not chunks:
+                    fail(doc_id, "No content extracted", retryable=False)
+                    continue
+
+                counts[doc_id] = {"pages": max(c.get("page", 1) for c in chunks), "chunks": len(chunks)}
+                unflushed[doc_id] = len(chunks)
+                pending.extend(self._chunk_records(chunks, doc_id=doc_id, user_id=user_id, filename=file["filename"]))
+                while len(pending) >= batch_size:
+                    flush(pending[:batch_size])
+                    del pending[:batch_size]
+        if pending:
+            flush(pending)
+
+        for doc_id, count in counts.items():
+            if doc_id in results:
+                # Part of it may have been upserted before a failed batch
+                self.delete_document(doc_id, user_id, count["chunks"])
+            else:
+                self._chunk_counts[doc_id] = count["chunks"]
+                results[doc_id] = {"page_count": count["pages"], "chunk_count": count["chunks"], "status": "indexed"}
+        logger.info("Batch ingestion finished", files=len(files),
+                    indexed=sum(r["status"] == "indexed" for r in results.values()))
+        return results
 
     def search_user_documents(self, query: str, user_id: str, n_results: int = 3) -> List[Dict[str, Any]]:
-        """Semantic search across a user's uploaded documents."""
+        """
+        Hybrid search across a user's uploaded documents.
+        The top HYBRID_CANDIDATES chunks by vector distance and by BM25 are
+        fused with reciprocal rank fusion; each result carries its fused
+        `score` and its `distance` (None for chunks found only by keywords).
+        """
         if not self.is_available:
             return []
+        hybrid = settings.HYBRID_SEARCH_ENABLED
+        candidates = max(n_results, settings.HYBRID_CANDIDATES) if hybrid else n_results
         try:
-            total = self.collection.count()
-            if total == 0:
-                return []
-            n_results = min(n_results, total)
-
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where={"user_id": user_id},
-            )
-
             formatted = []
-            if results.get("ids") and results["ids"][0]:
-                for i, chunk_id in enumerate(results["ids"][0]):
-                    formatted.append({
-                        "chunk_id": chunk_id,
-                        "text": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "distance": results["distances"][0][i] if "distances" in results else None,
-                    })
-            return formatted
+            for results in self._over_collections(user_id, lambda c: self._query(c, query, user_id, candidates)):
+                formatted.extend(results)
+            if len(formatted) > candidates:  # Merge partition and not-yet-migrated results
+                formatted.sort(key=lambda r: r["distance"] if r["distance"] is not None else float("inf"))
+            formatted = formatted[:candidates]
+            if not hybrid:
+                return formatted
         except Exception as e:
             logger.error("Document search failed", error=str(e))
             return []
 
-    def get_document_chunks(self, doc_id: str) -> int:
-        """Return number of chunks for a given document."""
+        try:
+            keyword = self.keyword_index.search(user_id, query, candidates)
+            if keyword:
+                # Chunks matching only common query words would otherwise fill
+                # the keyword ranking and outvote a rare-term match in the fusion
+                floor = keyword[0][1] * settings.HYBRID_KEYWORD_MIN_RATIO
+                keyword = [(chunk_id, score) for chunk_id, score in keyword if score >= floor]
+            fused = reciprocal_rank_fusion(
+                [[r["chunk_id"] for r in formatted], [chunk_id for chunk_id, _ in keyword]],
+                k=settings.HYBRID_RRF_K,
+            )[:n_results]
+            by_id = {r["chunk_id"]: r for r in formatted}
+            by_id.update(self._fetch_chunks(user_id, [i for i, _ in fused if i not in by_id]))
+            return [{**by_id[i], "score": score} for i, score in fused if i in by_id]
+        except Exception as e:
+            logger.warning("Keyword search failed; using vector results", error=str(e))
+            return formatted[:n_results]
+
+    def get_document_chunks(self, doc_id: str, user_id: str, chunk_count: Optional[int] = None) -> int:
+        """
+        Return number of chunks stored for a given document.
+        With a known chunk count (argument or registry) this is an id lookup;
+        otherwise it falls back to a metadata scan of the user's partition.
+        """
         if not self.is_available:
             return 0
         try:
-            results = self.collection.get(where={"doc_id": doc_id})
-            return len(results.get("ids", []))
+            chunk_count = chunk_count or self._chunk_counts.get(doc_id)
+
+            def count(collection) -> int:
+                if chunk_count:
+                    results = collection.get(ids=chunk_ids(doc_id, chunk_count), include=[])
+                else:
+                    results = collection.get(where={"doc_id": doc_id}, include=[])
+                return len(results.get("ids", []))
+
+            return sum(self._over_collections(user_id, count))
         except Exception:
             return 0
 
-    def delete_document(self, doc_id: str) -> bool:
+    def delete_document(self, doc_id: str, user_id: str, chunk_count: Optional[int] = None) -> bool:
         """Remove all chunks for a document from ChromaDB."""
-        if not self.is_available:
+        return self.delete_documents(user_id, {doc_id: chunk_count})
+
+    def delete_documents(self, user_id: str, chunk_counts: Dict[str, Optional[int]]) -> bool:
+        """
+        Remove the chunks of several of a user's documents (e.g. all of them) from ChromaDB.
+
+        Args:
+            chunk_counts: doc_id -> chunk count from its Document row. Ids of
+                documents with a count (or in the registry) are derived; the
+                rest are found with one metadata query.
+        """
+        if not self.is_available or not chunk_counts:
             return False
         try:
-            results = self.collection.get(where={"doc_id": doc_id})
-            ids = results.get("ids", [])
-            if ids:
-                self.collection.delete(ids=ids)
-            logger.info("Document chunks deleted", doc_id=doc_id, count=len(ids))
+            derived: List[str] = []
+            unknown: List[str] = []
+            for doc_id, count in chunk_counts.items():
+                count = count or self._chunk_counts.get(doc_id)
+                if count:
+                    derived.extend(chunk_ids(doc_id, count))
+                else:
+                    unknown.append(doc_id)
+
+            def purge(collection) -> List[str]:
+                found: List[str] = []
+                if unknown:
+                    found = collection.get(where={"doc_id": {"$in": unknown}}, include=[]).get("ids", [])
+                for batch in _batched(derived + found, self._batch_size()):
+                    collection.delete(ids=batch)
+                return found
+
+            removed = set(derived)
+            for found in self._over_collections(user_id, purge):
+                removed.update(found)
+            self.keyword_index.remove(user_id, removed)
+            for doc_id in chunk_counts:
+                self._chunk_counts.pop(doc_id, None)
+            logger.info("Document chunks deleted", documents=len(chunk_counts), count=len(derived), scanned=len(unknown))
             return True
         except Exception as e:
             logger.error("Failed to delete document chunks", error=str(e))
             return False
 
+    def migrate_legacy_collections(self, batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Move chunks from the shared collection (and partitions of another
+        partition count) into the current partitions, then drop the emptied
+        sources. Each page is upserted into its targets before it is deleted
+        from the source, so an interrupted migration can simply be rerun.
+
+        Returns:
+            source collection name -> chunks moved
+        """
+        moved: Dict[str, int] = {}
+        batch_size = batch_size or self._batch_size()
+        for source in list(self._legacy_collections):
+            count, dropped = 0, False
+            while True:
+                try:
+                    page = source.get(limit=batch_size, include=["documents", "metadatas", "embeddings"])
+                except Exception as e:
+                    if count or not _is_missing_collection(e):
+                        raise
+                    dropped = True  # Already migrated by another process
+                    break
+                if not page["ids"]:
+                    break
+                by_partition: Dict[str, List[int]] = defaultdict(list)
+                for i, metadata in enumerate(page["metadatas"]):
+                    name = partition_name(metadata.get("user_id", ""), self.partitions, self.COLLECTION_NAME)
+                    by_partition[name].append(i)
+                for name, rows in by_partition.items():
+                    target = self._partition(name)
+                    documents = [page["documents"][i] for i in rows]
+                    if self._embedder(target).version == self._embedder(source).version:
+                        embeddings = [page["embeddings"][i] for i in rows]
+                    else:
+                        embeddings = self._embedder(target)(documents)
+                    target.upsert(
+                        ids=[page["ids"][i] for i in rows],
+                        documents=documents,
+                        metadatas=[page["metadatas"][i] for i in rows],
+                        embeddings=embeddings,
+                    )
+                source.delete(ids=page["ids"])
+                count += len(page["ids"])
+                logger.info("Migrating document chunks", source=source.name, moved=count)
+
+            if not dropped:
+                self.client.delete_collection(source.name)
+                moved[source.name] = count
+            self._forget_legacy(source)
+        return moved
+
     # ------------------------------------------------------------------
     # Parsers
     # ------------------------------------------------------------------
 
-    def _parse_pdf(self, path: str) -> List[Dict[str, Any]]:
-        """Extract text per page from a PDF."""
+    def _parse_pdf(self, path: str) -> Iterator[Dict[str, Any]]:
+        """Chunk the text of each page (pages are sharded across processes when large)."""
         try:
-            from PyPDF2 import PdfReader
+            import PyPDF2  # noqa: F401
         except ImportError:
             logger.error("PyPDF2 not installed — cannot parse PDF files")
-            return []
+            return
 
-        reader = PdfReader(path)
-        chunks = []
-        for page_num, page in enumerate(reader.pages, start=1):
-            text = page.extract_text()
-            if text and text.strip():
-                chunks.append({"text": text.strip(), "page": page_num})
-        return chunks
+        for page in parse_pdf(path):
+            for text in chunk_text(page["text"]):
+                yield {"text": text, "page": page["page"]}
 
-    def _parse_txt(self, path: str) -> List[Dict[str, Any]]:
-        """Split text file into fixed-size chunks."""
+    def _parse_txt(self, path: str) -> Iterator[Dict[str, Any]]:
+        """Chunk a text file; each chunk counts as one page."""
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             content = f.read()
 
-        if not content.strip():
-            return []
-
-        # Split by double newline first, then by chunk size
-        paragraphs = content.split("\n\n")
-        chunks = []
-        current_chunk = ""
-        page = 1
-
-        for para in paragraphs:
-            if len(current_chunk) + len(para) > self.CHUNK_SIZE and current_chunk:
-                chunks.append({"text": current_chunk.strip(), "page": page})
-                current_chunk = para
-                page += 1
-            else:
-                current_chunk += "\n\n" + para if current_chunk else para
-
-        if current_chunk.strip():
-            chunks.append({"text": current_chunk.strip(), "page": page})
+        for page, text in enumerate(chunk_text(content), start=1):
+            yield {"text": text, "page": page}
 
-        return chunks
-
-    def _parse_csv(self, path: str) -> List[Dict[str, Any]]:
-        """Each row becomes a chunk, grouped into logical pages of 20 rows."""
-        chunks = []
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+    def _parse_csv(self, path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Read rows lazily and pack each logical page of CSV_ROWS_PER_CHUNK rows
+        into one chunk, one "key: value" line per row.
+        """
+        rows_per_chunk = settings.CSV_ROWS_PER_CHUNK
+        with open(path, "r", encoding="utf-8", errors="ignore", newline="") as f:
             reader = csv.DictReader(f)
-            headers = reader.fieldnames or []
+            lines = []
+            page = 1
             for row_num, row in enumerate(reader, start=1):
                 text = ", ".join(f"{k}: {v}" for k, v in row.items() if v)
                 if text:
-                    chunks.append({"text": text, "page": (row_num - 1) // 20 + 1})
-        return chunks
+                    lines.append(text)
+                if row_num % rows_per_chunk == 0:
+                    if lines:
+                        yield {"text": "\n".join(lines), "page": page}
+                    lines = []
+                    page += 1
+            if lines:
+                yield {"text": "\n".join(lines), "page": page}
 
     # ------------------------------------------------------------------
     # Indexing
     # ------------------------------------------------------------------
 
-    def _index_chunks(self, chunks: List[Dict], doc_id: str, user_id: str, filename: str):
-        """Upsert document chunks into ChromaDB."""
-        if not self.is_available:
+    def _over_collections(self, user_id: str, operation: Callable[[Any], T]) -> List[T]:
+        """
+        operation(collection) on the user's partition and on each collection
+        not yet migrated. A legacy collection that no longer exists (dropped
+        by document_migration run from another process) is forgotten rather
+        than failing every call until restart.
+        """
+        results = [operation(self.collection_for(user_id))]
+        for collection in list(self._legacy_collections):
+            try:
+                results.append(operation(collection))
+            except Exception as e:
+                if not _is_missing_collection(e):
+                    raise
+                self._forget_legacy(collection)
+        return results
+
+    def _forget_legacy(self, collection) -> None:
+        with self._lock:
+            self._legacy_collections = [c for c in self._legacy_collections if c is not collection]
+        logger.info("Legacy document collection dropped", collection=collection.name)
+
+    def _fetch_chunks(self, user_id: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Text and metadata of chunks by id (for keyword-only hits)."""
+        found: Dict[str, Dict[str, Any]] = {}
+        if not ids:
+            return found
+        pages = self._over_collections(user_id, lambda c: c.get(ids=ids, include=["documents", "metadatas"]))
+        for results in pages:
+            for chunk_id, text, metadata in zip(results["ids"], results["documents"], results["metadatas"]):
+                if metadata.get("user_id") == user_id:
+                    found[chunk_id] = {"chunk_id": chunk_id, "text": text, "metadata": metadata, "distance": None}
+        return found
+
+    def _load_user_chunks(self, user_id: str) -> Tuple[List[str], List[str]]:
+        """All of a user's chunk ids and texts, to build their keyword index."""
+        ids: List[str] = []
+        texts: List[str] = []
+        for results in self._over_collections(user_id, lambda c: c.get(where={"user_id": user_id}, include=["documents"])):
+            ids.extend(results["ids"])
+            texts.extend(results["documents"])
+        return ids, texts
+
+    def _query(self, collection, query: str, user_id: str, n_results: int) -> List[Dict[str, Any]]:
+        total = collection.count()
+        if total == 0:
+            return []
+        results = collection.query(
+            query_texts=[query],
+            n_results=min(n_results, total),
+            where={"user_id": user_id},
+        )
+
+        formatted = []
+        if results.get("ids") and results["ids"][0]:
+            for i, chunk_id in enumerate(results["ids"][0]):
+                formatted.append({
+                    "chunk_id": chunk_id,
+                    "text": results["documents"][0][i],
+                    "metadata": results["metadatas"][0][i],
+                    "distance": results["distances"][0][i] if "distances" in results else None,
+                })
+        return formatted
+
+    def _index_chunks(self, chunks: List[Dict], doc_id: str, user_id: str, filename: str, start_index: int = 0):
+        """Upsert one document's chunks into ChromaDB."""
+        self._upsert_records(self._chunk_records(chunks, doc_id, user_id, filename, start_index), user_id)
+
+    def _chunk_records(
+        self, chunks: List[Dict], doc_id: str, user_id: str, filename: str, start_index: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Chroma id, text and metadata for each chunk of a document."""
+        return [
+            {
+                "id": chunk_id(doc_id, i),
+                "text": chunk["text"],
+                "metadata": {
+                    "doc_id": doc_id,
+                    "user_id": user_id,
+                    "filename": filename,
+                    "page": chunk.get("page", i + 1),
+                    "chunk_index": i,
+                    "chunk_hash": chunk_hash(chunk["text"]),
+                },
+            }
+            for i, chunk in enumerate(chunks, start=start_index)
+        ]
+
+    def _upsert_records(self, records: List[Dict[str, Any]], user_id: str):
+        """
+        Upsert chunk records (of one or more documents) into ChromaDB.
+        Each chunk carries a hash of its text; chunks this user has indexed
+        before (e.g. unchanged pages of an edited report) reuse the stored
+        embedding, so only new or changed text is embedded.
+        """
+        if not self.is_available or not records:
             return
 
-        ids = []
-        documents = []
-        metadatas = []
+        ids = [r["id"] for r in records]
+        documents = [r["text"] for r in records]
+        metadatas = [r["metadata"] for r in records]
+
+        collection = self.collection_for(user_id)
+        known = self._known_embeddings(collection, user_id, [m["chunk_hash"] for m in metadatas])
+        missing = [i for i, m in enumerate(metadatas) if m["chunk_hash"] not in known]
+        fresh = self._embedder(collection)([documents[i] for i in missing]) if missing else []
+        embeddings = [known.get(m["chunk_hash"]) for m in metadatas]
+        for i, vector in zip(missing, fresh):
+            embeddings[i] = vector
+
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        self.keyword_index.add(user_id, ids, documents)
+        logger.debug("Indexed document chunks", documents=len({m["doc_id"] for m in metadatas}),
+                     count=len(records), embedded=len(missing), reused=len(records) - len(missing))
+
+    def _batch_size(self) -> int:
+        """DOCUMENT_INDEX_BATCH_SIZE, capped at the Chroma client's max batch size."""
+        size = settings.DOCUMENT_INDEX_BATCH_SIZE
+        try:
+            size = min(size, self.client.get_max_batch_size())
+        except Exception:
+            pass
+        return max(1, size)
+
+    def _known_embeddings(self, collection, user_id: str, hashes: List[str]) -> Dict[str, Any]:
+        """Stored embeddings of this user's chunks with the given text hashes."""
+        try:
+            results = collection.get(
+                where={"$and": [{"user_id": user_id}, {"chunk_hash": {"$in": sorted(set(hashes))}}]},
+                include=["embeddings", "metadatas"],
+            )
+        except Exception as e:
+            logger.warning("Chunk embedding lookup failed", error=str(e))
+            return {}
+        metadatas = results.get("metadatas")
+        embeddings = results.get("embeddings")
+        if metadatas is None or embeddings is None:
+            return {}
+        return {meta["chunk_hash"]: embedding for meta, embedding in zip(metadatas, embeddings)}
+
+
+def _batched(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
 
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"doc_{doc_id}_chunk_{i}"
-            ids.append(chunk_id)
-            documents.append(chunk["text"])
-            metadatas.append({
-                "doc_id": doc_id,
-                "user_id": user_id,
-                "filename": filename,
-                "page": chunk.get("page", i + 1),
-                "chunk_index": i,
-            })
+def _is_missing_collection(error: Exception) -> bool:
+    """Whether a ChromaDB call failed because its collection was deleted."""
+    errors = optional_import("chromadb.errors")
+    return errors is not None and isinstance(error, getattr(errors, "NotFoundError", ()))
 
-        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
-        logger.info("Indexed document chunks", doc_id=doc_id, count=len(chunks))
+
+def partition_name(user_id: str, partitions: int, prefix: str = DocumentService.COLLECTION_NAME) -> str:
+    """Name of the collection partition a user's chunks live in."""
+    bucket = zlib.crc32(user_id.encode()) % partitions
+    return f"{prefix}_p{partitions}_{bucket:03d}"
+
+
+def chunk_id(doc_id: str, index: int) -> str:
+    """Chroma id of a document's index-th chunk."""
+    return f"doc_{doc_id}_chunk_{index}"
+
+
+def chunk_ids(doc_id: str, chunk_count: int) -> List[str]:
+    """Chroma ids of all chunks of a document with chunk_count chunks."""
+    return [chunk_id(doc_id, i) for i in range(chunk_count)]
+
+
+def chunk_hash(text: str) -> str:
+    """Stable hash of a chunk's text, used to find chunks that need no re-embedding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
 
 
 # ---------------------------------------------------------------------------
 # Singleton
 # ---------------------------------------------------------------------------
 
-_document_service: Optional[DocumentService] = None
-
-
 def get_document_service() -> DocumentService:
-    global _document_service
-    if _document_service is None:
-        _document_service = DocumentService()
-    return _document_service
+    return registry.get("document_service", DocumentService)
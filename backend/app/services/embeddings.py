@@ -0,0 +1,185 @@
+"""
+Hash Embeddings — Shared bag-of-words embedding engine for all ChromaDB collections.
+
+Both the MSK knowledge base (VectorStore) and user documents (DocumentService)
+embed text by hashing each lowercase word into one of DIM buckets, counting,
+and L2-normalizing. This module does that for a whole batch at once:
+words are hashed once per unique token (cached), counts are accumulated into
+a NumPy matrix with bincount, and the batch is normalized in one step.
+
+Versions:
+    md5-v1   — the original md5-bucket scheme; bit-compatible with collections
+               created before this module existed.
+    crc32-v2 — zlib.crc32 buckets; same shape, much cheaper per token.
+
+The version is stored in the collection metadata so an existing collection is
+always queried with the scheme it was indexed with.
+"""
+import hashlib
+import itertools
+import math
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import structlog
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+logger = structlog.get_logger()
+
+EMBEDDING_DIM = 512
+
+LEGACY_VERSION = "md5-v1"
+CURRENT_VERSION = "crc32-v2"
+VERSION_METADATA_KEY = "hash_embedding_version"
+
+# Unique-token → bucket caches, shared by every embedder of the same version.
+# Cleared wholesale when they grow past the cap to keep memory bounded.
+_BUCKET_CACHE_MAX = 1 << 18
+_bucket_caches: Dict[str, Dict[str, int]] = {}
+
+
+def _md5_bucket(word: str, dim: int) -> int:
+    # Same value as int(md5(word).hexdigest(), 16) % dim, without the hex round-trip
+    return int.from_bytes(hashlib.md5(word.encode()).digest(), "big") % dim
+
+
+def _crc32_bucket(word: str, dim: int) -> int:
+    return zlib.crc32(word.encode()) % dim
+
+
+_HASHERS = {
+    LEGACY_VERSION: _md5_bucket,
+    CURRENT_VERSION: _crc32_bucket,
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase whitespace tokenization used by every hash embedding."""
+    return text.lower().split()
+
+
+class HashEmbeddingFunction:
+    """Bag-of-words embedding using hash buckets — no model download required."""
+
+    DIM = EMBEDDING_DIM
+
+    def __init__(self, version: str = CURRENT_VERSION, dim: int = EMBEDDING_DIM):
+        if version not in _HASHERS:
+            raise ValueError(f"Unknown hash embedding version: {version}")
+        self.version = version
+        self.DIM = dim
+        self._hasher = _HASHERS[version]
+        self._cache = _bucket_caches.setdefault(f"{version}:{dim}", {})
+
+    def name(self) -> str:  # ChromaDB v1.x calls name() as a method
+        return "hash_embedding_fn"
+
+    def __call__(self, input: Sequence[str]) -> List[Any]:
+        if NUMPY_AVAILABLE:
+            return list(self.embed_matrix(input).astype(np.float32))
+        return self._embed_python(input)
+
+    # ChromaDB v1.x embeds queries and documents through these entry points
+    def embed_documents(self, input: Sequence[str]) -> List[Any]:
+        return self(input)
+
+    def embed_query(self, input: Sequence[str]) -> List[Any]:
+        return self(input)
+
+    def embed_matrix(self, texts: Sequence[str]) -> "np.ndarray":
+        """
+        Embed a batch of texts into an (n, DIM) float64 matrix of L2-normalized rows.
+        Rows for empty texts are all zeros.
+        """
+        n = len(texts)
+        tokenized = [tokenize(t) for t in texts]
+        lengths = np.fromiter(map(len, tokenized), dtype=np.int64, count=n)
+        total = int(lengths.sum())
+
+        flat = itertools.chain.from_iterable(tokenized)
+        buckets = np.fromiter(self._buckets(flat), dtype=np.int64, count=total)
+        rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+
+        counts = np.bincount(rows * self.DIM + buckets, minlength=n * self.DIM)
+        matrix = counts.reshape(n, self.DIM).astype(np.float64)
+
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+        norms[norms == 0] = 1.0
+        matrix /= norms[:, None]
+        return matrix
+
+    def bucket(self, word: str) -> int:
+        """Return the bucket index for a single (already lowercased) token."""
+        return next(self._buckets((word,)))
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _buckets(self, tokens):
+        """Yield the bucket of each token, hashing every distinct token once."""
+        cache = self._cache
+        if len(cache) > _BUCKET_CACHE_MAX:
+            cache.clear()
+        hasher, dim = self._hasher, self.DIM
+        for word in tokens:
+            idx = cache.get(word)
+            if idx is None:
+                idx = cache[word] = hasher(word, dim)
+            yield idx
+
+    def _embed_python(self, texts: Sequence[str]) -> List[List[float]]:
+        """Pure-Python fallback used when NumPy is not installed."""
+        result = []
+        for text in texts:
+            vec = [0.0] * self.DIM
+            for word in tokenize(text):
+                vec[self.bucket(word)] += 1.0
+            norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+            result.append([x / norm for x in vec])
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Collection helpers
+# ---------------------------------------------------------------------------
+
+_client_lock = threading.Lock()
+
+
+def open_persistent_client(chromadb, path: str):
+    """
+    chromadb.PersistentClient(path), one open at a time: the knowledge base and
+    document stores warm up concurrently, and simultaneous first opens of the
+    same directory race inside ChromaDB's shared system cache.
+    """
+    with _client_lock:
+        return chromadb.PersistentClient(path=path)
+
+
+def get_or_create_hash_collection(client, name: str, metadata: Optional[Dict[str, Any]] = None):
+    """
+    Open (or create) a ChromaDB collection with the hash embedding function.
+    Existing collections keep the version they were indexed with (untagged ones
+    are md5-v1); new collections are created with CURRENT_VERSION.
+    """
+    try:
+        existing = client.get_collection(name)
+        version = (existing.metadata or {}).get(VERSION_METADATA_KEY, LEGACY_VERSION)
+    except Exception:
+        version = CURRENT_VERSION
+
+    collection = client.get_or_create_collection(
+        name=name,
+        embedding_function=HashEmbeddingFunction(version=version),
+        metadata={**(metadata or {}), VERSION_METADATA_KEY: version},
+    )
+    logger.info("Hash collection ready", collection=name, embedding_version=version)
+    return collection
@@ -0,0 +1,358 @@
+"""
+Ingestion Queue - In-process background jobs for document parsing and indexing.
+
+Upload endpoints save the file, create a Document row with status="processing"
+and enqueue a job. A fixed pool of worker tasks runs DocumentService.ingest_file
+in the default thread pool (PDF parsing and Chroma upserts are synchronous), so
+neither the HTTP request nor the event loop waits on ingestion. Transient
+failures are retried with exponential backoff; the final result is written back
+to the Document row (page_count, chunk_count, status). If the document was
+deleted while it was processing, the chunks just indexed are removed again.
+
+A batch upload is queued as one item: its files are parsed concurrently and
+their chunks upserted in shared batches (DocumentService.ingest_files), and
+the results are written back with a single bulk UPDATE.
+
+The queue lives in memory, so jobs still queued at shutdown (or lost in a
+crash) would leave their rows "processing" forever; recover_interrupted_jobs()
+runs at startup (a warmup step) and re-queues them, or marks them failed when
+the uploaded file is gone.
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Union
+
+import structlog
+from sqlalchemy import update
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+_PROCESS_STARTED = datetime.utcnow()  # Rows older than this were queued by an earlier process
+
+
+@dataclass
+class IngestionJob:
+    """One file waiting to be parsed and indexed."""
+    doc_id: str
+    user_id: str
+    file_path: str
+    filename: str
+    attempts: int = 0
+    chunks_indexed: int = 0  # Progress of the current attempt
+
+
+class IngestionQueue:
+    """
+    Bounded-concurrency job queue for document ingestion.
+    Workers are started lazily on the first enqueue (or by start()) and must
+    be stopped with stop() on shutdown.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        max_retries: int = None,
+        retry_backoff: float = None,
+        max_pending: int = None,
+    ):
+        self.workers = workers or settings.INGESTION_WORKERS
+        self.max_retries = max_retries if max_retries is not None else settings.INGESTION_MAX_RETRIES
+        self.retry_backoff = retry_backoff if retry_backoff is not None else settings.INGESTION_RETRY_BACKOFF_SECONDS
+        self.max_pending = max_pending if max_pending is not None else settings.INGESTION_MAX_PENDING
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Dict[str, IngestionJob] = {}  # doc_id -> queued or running job
+
+    @property
+    def is_running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    def start(self) -> None:
+        """Spawn the worker tasks on the running event loop."""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("ingestion_queue_started", workers=self.workers)
+
+    async def stop(self) -> None:
+        """Cancel the workers. Jobs still queued keep status="processing" until recovered on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        if self._pending:
+            logger.warning("ingestion_queue_stopped_with_pending_jobs", pending=len(self._pending))
+        self._pending.clear()
+
+    async def enqueue(self, job: IngestionJob) -> None:
+        """Queue a job; waits for space when max_pending jobs are already queued."""
+        self.start()
+        self._pending[job.doc_id] = job
+        await self._queue.put(job)
+        logger.info("ingestion_job_queued", doc_id=job.doc_id, queued=self._queue.qsize())
+
+    async def enqueue_batch(self, jobs: List[IngestionJob]) -> None:
+        """Queue one user's files to be ingested together as a single item."""
+        if not jobs:
+            return
+        self.start()
+        for job in jobs:
+            self._pending[job.doc_id] = job
+        await self._queue.put(list(jobs))
+        logger.info("ingestion_batch_queued", files=len(jobs), queued=self._queue.qsize())
+
+    def job_state(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """In-memory state of a queued or running job, or None once it is done."""
+        job = self._pending.get(doc_id)
+        if job is None:
+            return None
+        return {
+            "attempts": job.attempts,
+            "chunks_indexed": job.chunks_indexed,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+        }
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished (used by tests and shutdown)."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            item: Union[IngestionJob, List[IngestionJob]] = await self._queue.get()
+            jobs = item if isinstance(item, list) else [item]
+            try:
+                if isinstance(item, list):
+                    await self._run_batch_with_retry(item)
+                else:
+                    result = await self._run_with_retry(item)
+                    if not await self._record_result(item.doc_id, result):
+                        await self._discard_chunks(item.user_id, {item.doc_id: result})
+            except Exception as e:
+                logger.error("ingestion_job_crashed", doc_ids=[j.doc_id for j in jobs], worker=worker_id,
+                             error=str(e))
+            finally:
+                for job in jobs:
+                    self._pending.pop(job.doc_id, None)
+                self._queue.task_done()
+
+    async def _run_with_retry(self, job: IngestionJob) -> Dict[str, Any]:
+        while True:
+            job.attempts += 1
+            job.chunks_indexed = 0
+            try:
+                result = await asyncio.to_thread(self._ingest, job)
+            except Exception as e:
+                result = {"page_count": 0, "chunk_count": 0, "status": "failed", "error": str(e), "retryable": True}
+
+            if result.get("status") != "failed" or not result.get("retryable") or job.attempts > self.max_retries:
+                logger.info(
+                    "ingestion_job_finished",
+                    doc_id=job.doc_id,
+                    status=result.get("status"),
+                    attempts=job.attempts,
+                    error=result.get("error"),
+                )
+                return result
+
+            delay = self.retry_backoff * (2 ** (job.attempts - 1))
+            logger.warning("ingestion_job_retrying", doc_id=job.doc_id, attempt=job.attempts, delay=delay,
+                           error=result.get("error"))
+            await asyncio.sleep(delay)
+
+    async def _run_batch_with_retry(self, jobs: List[IngestionJob]) -> None:
+        """Ingest a batch, recording finished files after each attempt and retrying the rest together."""
+        while jobs:
+            for job in jobs:
+                job.attempts += 1
+                job.chunks_indexed = 0
+            try:
+                results = await asyncio.to_thread(self._ingest_batch, jobs)
+                error = "No result returned"
+            except Exception as e:
+                results, error = {}, str(e)
+
+            finished, retry = {}, []
+            for job in jobs:
+                result = results.get(job.doc_id) or {
+                    "page_count": 0, "chunk_count": 0, "status": "failed", "error": error, "retryable": True,
+                }
+                if result.get("status") == "failed" and result.get("retryable") and job.attempts <= self.max_retries:
+                    retry.append(job)
+                else:
+                    finished[job.doc_id] = result
+                    logger.info(
+                        "ingestion_job_finished",
+                        doc_id=job.doc_id,
+                        status=result.get("status"),
+                        attempts=job.attempts,
+                        error=result.get("error"),
+                    )
+
+            if finished:
+                deleted = await self._record_results(finished)
+                if deleted:
+                    await self._discard_chunks(jobs[0].user_id, {doc_id: finished[doc_id] for doc_id in deleted})
+                for doc_id in finished:
+                    self._pending.pop(doc_id, None)
+            if not retry:
+                return
+
+            delay = self.retry_backoff * (2 ** (retry[0].attempts - 1))
+            logger.warning("ingestion_batch_retrying", files=len(retry), attempt=retry[0].attempts, delay=delay)
+            await asyncio.sleep(delay)
+            jobs = retry
+
+    def _ingest(self, job: IngestionJob) -> Dict[str, Any]:
+        from app.services.document_service import get_document_service
+
+        return get_document_service().ingest_file(
+            file_path=job.file_path,
+            filename=job.filename,
+            user_id=job.user_id,
+            doc_id=job.doc_id,
+            on_progress=lambda count: setattr(job, "chunks_indexed", count),
+        )
+
+    def _ingest_batch(self, jobs: List[IngestionJob]) -> Dict[str, Dict[str, Any]]:
+        from app.services.document_service import get_document_service
+
+        by_id = {job.doc_id: job for job in jobs}
+        return get_document_service().ingest_files(
+            [{"doc_id": job.doc_id, "file_path": job.file_path, "filename": job.filename} for job in jobs],
+            user_id=jobs[0].user_id,
+            on_progress=lambda doc_id, count: setattr(by_id[doc_id], "chunks_indexed", count),
+        )
+
+    async def _record_results(self, results: Dict[str, Dict[str, Any]]) -> Set[str]:
+        """
+        Write the outcomes of a batch with one bulk UPDATE by primary key.
+        Returns the ids whose row is gone (the document was deleted while it
+        was processing).
+        """
+        from sqlalchemy import select
+        from app.db.session import async_session_maker
+        from app.models.document import Document
+
+        async with async_session_maker() as session:
+            await session.execute(
+                update(Document),
+                [
+                    {
+                        "id": doc_id,
+                        "page_count": result.get("page_count", 0),
+                        "chunk_count": result.get("chunk_count", 0),
+                        "status": result.get("status", "failed"),
+                    }
+                    for doc_id, result in results.items()
+                ],
+            )
+            present = (await session.execute(select(Document.id).where(Document.id.in_(list(results))))).scalars().all()
+            await session.commit()
+        return set(results) - set(present)
+
+    async def _record_result(self, doc_id: str, result: Dict[str, Any]) -> bool:
+        """Write the outcome to the Document row on a session of its own; False if the row is gone."""
+        from app.db.session import async_session_maker
+        from app.models.document import Document
+
+        async with async_session_maker() as session:
+            updated = await session.execute(
+                update(Document)
+                .where(Document.id == doc_id)
+                .values(
+                    page_count=result.get("page_count", 0),
+                    chunk_count=result.get("chunk_count", 0),
+                    status=result.get("status", "failed"),
+                )
+            )
+            await session.commit()
+        return updated.rowcount > 0
+
+    async def _discard_chunks(self, user_id: str, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Remove the chunks just indexed for documents deleted while they were
+        processing: the delete endpoint ran before they existed, so nothing
+        else would remove them and search would keep returning them.
+        """
+        from app.services.document_service import get_document_service
+
+        logger.warning("ingestion_document_deleted", doc_ids=list(results))
+        await asyncio.to_thread(
+            get_document_service().delete_documents,
+            user_id,
+            {doc_id: result.get("chunk_count") for doc_id, result in results.items()},
+        )
+
+
+# ---------------------------------------------------------------------------
+# Singleton
+# ---------------------------------------------------------------------------
+
+_ingestion_queue: Optional[IngestionQueue] = None
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        _ingestion_queue = IngestionQueue()
+    return _ingestion_queue
+
+
+async def recover_interrupted_jobs(created_before: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Re-queue documents an earlier process left status="processing" (stopped
+    with jobs queued, or crashed); those whose upload is no longer on disk are
+    marked failed. Only rows created before this process started are touched.
+    With several workers sharing the database, a row another live process
+    still has queued may be ingested twice; ingestion is idempotent (chunk ids
+    derive from the document id), so that only costs time.
+    """
+    from sqlalchemy import select
+    from app.db.session import async_session_maker
+    from app.models.document import Document
+
+    created_before = created_before or _PROCESS_STARTED
+    async with async_session_maker() as session:
+        rows = (await session.execute(
+            select(Document.id, Document.user_id, Document.filename, Document.file_type)
+            .where(Document.status == "processing", Document.created_at < created_before)
+        )).all()
+
+    queue = get_ingestion_queue()
+    jobs: List[IngestionJob] = []
+    lost: Dict[str, Dict[str, Any]] = {}
+    for doc_id, user_id, filename, file_type in rows:
+        # Where the upload endpoints store documents: UPLOAD_DIR/<user_id>/documents/<doc_id>.<ext>
+        path = Path(settings.UPLOAD_DIR, user_id, "documents", f"{doc_id}.{file_type}")
+        if path.exists():
+            jobs.append(IngestionJob(doc_id=doc_id, user_id=user_id, file_path=str(path), filename=filename))
+        else:
+            lost[doc_id] = {"status": "failed"}
+
+    if lost:
+        await queue._record_results(lost)
+    for job in jobs:
+        await queue.enqueue(job)
+    if rows:
+        logger.warning("ingestion_jobs_recovered", requeued=len(jobs), failed=len(lost))
+    return {"requeued": len(jobs), "failed": len(lost)}
+
+
+async def shutdown_ingestion_queue() -> None:
+    """Stop the workers (called on application shutdown)."""
+    if _ingestion_queue is not None:
+        await _ingestion_queue.stop()
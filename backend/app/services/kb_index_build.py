@@ -0,0 +1,38 @@
+"""
+Knowledge Base Index Build - Write the prebuilt KB embedding artifact.
+
+KnowledgeBaseService reads `<KB_INDEX_PATH>.json` (ids, doc_type offsets,
+embedding version, the catalogue fingerprint and the matrix file name) and
+memory-maps the `<KB_INDEX_PATH>.<digest>.npy` embedding matrix it names
+instead of embedding the catalogue at startup. The
+artifact is ignored once the catalogue changes, so rebuild it whenever the
+exercise, care program or product data is edited (e.g. as a deploy step, and
+bundle it with serverless builds):
+
+    cd backend && python -m app.services.kb_index_build [--path PATH]
+"""
+import argparse
+
+from app.core.config import settings
+from app.services.knowledge_base import KnowledgeBaseService, catalogue_fingerprint
+from app.services.matrix_index import MatrixIndex
+
+
+def build_index_artifact(path: str) -> MatrixIndex:
+    documents = KnowledgeBaseService(build_indexes=False)._build_documents()
+    index = MatrixIndex.from_documents(documents)
+    index.save(path, catalogue_fingerprint(documents))
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the prebuilt knowledge base index artifact")
+    parser.add_argument("--path", default=settings.KB_INDEX_PATH, help="Artifact path prefix")
+    args = parser.parse_args()
+
+    index = build_index_artifact(args.path)
+    print(f"Wrote {args.path}.json and its matrix: {len(index)} documents, {index.matrix.shape[1]} dims")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,15 @@
 """
 Knowledge Base Service - Stores exercises, care programs, and products.
-Integrates with ChromaDB for true semantic (RAG) search.
-In-memory data is the source of truth; ChromaDB enables vector similarity search.
+In-memory data is the source of truth. Semantic search runs on an in-memory
+embedding matrix (MatrixIndex), memory-mapped from a prebuilt artifact when one
+matches the catalogue and embedded at startup otherwise; the data is also
+indexed into ChromaDB, which is used for search only when NumPy is unavailable.
 """
 from typing import List, Optional, Dict, Any
+import hashlib
 import json
 import os
+import threading
 
 from app.schemas.recommendation import (
     CareProgram,
@@ -15,46 +19,120 @@ from app.schemas.recommendation import (
     Difficulty,
     ProductType,
 )
+from app.core.config import settings
+from app.services.registry import registry
 
 
 class KnowledgeBaseService:
     """
     Knowledge base for MSK wellness data.
-    On init, auto-indexes all data into ChromaDB for semantic search.
-    Falls back to keyword filtering if ChromaDB is unavailable.
+    On init, builds an in-memory embedding matrix for semantic search.
+    index_vector_store() syncs all data into ChromaDB (run by the startup
+    warmup, or on first search when the matrix is unavailable).
+    Falls back to keyword filtering if neither is available, served by
+    per-collection id and facet indexes (CatalogueIndex).
     """
 
-    def __init__(self):
+    def __init__(self, build_indexes: bool = True):
+        """build_indexes=False only loads the catalogue (e.g. to build the index artifact)."""
         self.care_programs = self._load_care_programs()
         self.exercises = self._load_exercises()
         self.products = self._load_products()
+        self.matrix_index = None
+
+        if build_indexes:
+            # Id -> record maps and facet indexes: lookups and keyword filters cost O(matches)
+            self._build_catalogue_indexes()
+
+            # The corpus is tiny and static: search it with one matmul, no Chroma round trip
+            self._init_matrix_index()
+
+        # ChromaDB is opened and synced separately (True RAG setup)
+        self.vector_store = None
+        self._vector_store_indexed = False
+        self._vector_store_lock = threading.Lock()
+
+    def _build_catalogue_indexes(self):
+        from app.services.catalogue_index import CatalogueIndex
+        self.exercise_index = CatalogueIndex(
+            self.exercises, "exercise_id",
+            facets=("category", "difficulty", "target_parameters"),
+            text_fields=("category", "target_parameters"),
+        )
+        self.care_program_index = CatalogueIndex(
+            self.care_programs, "program_id",
+            facets=("focus_areas", "intensity"),
+        )
+        self.product_index = CatalogueIndex(
+            self.products, "product_id",
+            facets=("type", "category", "use_cases"),
+            text_fields=("use_cases", "description", "category"),
+        )
+
+    def get_exercise(self, exercise_id: str) -> Optional[Dict[str, Any]]:
+        return self.exercise_index.get(exercise_id)
+
+    def get_care_program(self, program_id: str) -> Optional[Dict[str, Any]]:
+        return self.care_program_index.get(program_id)
+
+    def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        return self.product_index.get(product_id)
+
+    def _init_matrix_index(self):
+        """Map the prebuilt index artifact if it matches the catalogue, else embed every document."""
+        try:
+            from app.services.matrix_index import MatrixIndex
+            documents = self._build_documents()
+            self.matrix_index = None
+            if settings.KB_INDEX_PATH:
+                try:
+                    self.matrix_index = MatrixIndex.load(settings.KB_INDEX_PATH, catalogue_fingerprint(documents))
+                except Exception as e:
+                    print(f"⚠️  KB index artifact failed to load: {e}")
+                if self.matrix_index is None and os.path.exists(f"{settings.KB_INDEX_PATH}.json"):
+                    print("⚠️  KB index artifact is stale or unreadable — embedding the catalogue "
+                          "(rebuild with kb_index_build)")
+            if self.matrix_index is None:
+                self.matrix_index = MatrixIndex.from_documents(documents)
+        except Exception as e:
+            print(f"⚠️  In-memory KB index unavailable: {e} — searching through ChromaDB")
+            self.matrix_index = None
 
-        # Initialize vector store and index data (True RAG setup)
-        self._init_vector_store()
+    def index_vector_store(self):
+        """Open ChromaDB and sync the catalogue into it, once; returns the vector store (or None)."""
+        with self._vector_store_lock:
+            if not self._vector_store_indexed:
+                self._init_vector_store()
+                self._vector_store_indexed = True
+        return self.vector_store
 
     def _init_vector_store(self):
-        """Initialize ChromaDB and index all documents if collection is empty."""
+        """Initialize ChromaDB and bring its index in line with the catalogue."""
         try:
             from app.services.vector_store import get_vector_store
             self.vector_store = get_vector_store()
 
             if self.vector_store.is_available:
-                count = self.vector_store.get_count()
-                if count == 0:
-                    print("🔄 ChromaDB is empty — indexing MSK knowledge base...")
-                    self._index_all_documents()
-                    print(f"✅ Indexed {self.vector_store.get_count()} documents into ChromaDB")
-                else:
-                    print(f"✅ ChromaDB ready with {count} indexed documents")
+                stats = self._index_all_documents()
+                if stats["indexed"] or stats["deleted"]:
+                    print(
+                        f"🔄 Reindexed MSK knowledge base: {stats['indexed']} documents embedded, "
+                        f"{stats['deleted']} removed, {stats['unchanged']} unchanged"
+                    )
+                print(f"✅ ChromaDB ready with {self.vector_store.get_count()} indexed documents")
             else:
                 print("⚠️  ChromaDB not available — using keyword search fallback")
         except Exception as e:
             print(f"⚠️  Vector store init failed: {e} — using keyword search fallback")
             self.vector_store = None
 
-    def _index_all_documents(self):
-        """Index all exercises, care programs, and products into ChromaDB."""
-        # --- Index exercises ---
+    def _index_all_documents(self) -> Dict[str, int]:
+        """Index new or edited exercises, care programs, and products into ChromaDB; drop removed ones."""
+        return self.vector_store.sync_documents(self._build_documents())
+
+    def _build_documents(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Searchable text and metadata of every document, by doc_type."""
+        # --- Exercises ---
         exercise_docs = []
         for ex in self.exercises:
             text = (
@@ -76,9 +154,8 @@ class KnowledgeBaseService:
                     "expected_timeline": ex.get("expected_timeline", ""),
                 }
             })
-        self.vector_store.index_documents(exercise_docs, doc_type="exercise")
 
-        # --- Index care programs ---
+        # --- Care programs ---
         program_docs = []
         for p in self.care_programs:
             text = (
@@ -101,9 +178,8 @@ class KnowledgeBaseService:
                     "focus_areas": json.dumps(p.get("focus_areas", [])),
                 }
             })
-        self.vector_store.index_documents(program_docs, doc_type="care_program")
 
-        # --- Index products ---
+        # --- Products ---
         product_docs = []
         for prod in self.products:
             text = (
@@ -125,7 +201,18 @@ class KnowledgeBaseService:
                     "use_cases": json.dumps(prod.get("use_cases", [])),
                 }
             })
-        self.vector_store.index_documents(product_docs, doc_type="product")
+
+        return {"exercise": exercise_docs, "care_program": program_docs, "product": product_docs}
+
+    def semantic_search(self, query: str, doc_type: str, limit: int) -> List[str]:
+        """Ids of the nearest documents of one type, best first ([] if no semantic backend)."""
+        if self.matrix_index is not None:
+            return [doc_id for doc_id, _ in self.matrix_index.search(query, doc_type=doc_type, n_results=limit)]
+        vector_store = self.index_vector_store()
+        if vector_store and vector_store.is_available:
+            results = vector_store.search_documents(query=query, doc_type=doc_type, n_results=limit)
+            return [r["id"].replace(f"{doc_type}_", "", 1) for r in results]
+        return []
 
     # ─────────────────────────────────────────────────────────────────────────
     # Public Search Methods (RAG-powered with keyword fallback)
@@ -149,33 +236,23 @@ class KnowledgeBaseService:
                 parts.append(f"intensity: {intensity.value if hasattr(intensity, 'value') else intensity}")
             query = " ".join(parts) if parts else "wellness care program"
 
-        # Try semantic search first
-        if self.vector_store and self.vector_store.is_available:
-            semantic_results = self.vector_store.search_documents(
-                query=query,
-                doc_type="care_program",
-                n_results=limit
-            )
-            if semantic_results:
-                matched_ids = {r["id"].replace("care_program_", "") for r in semantic_results}
-                results = [p for p in self.care_programs if p["program_id"] in matched_ids]
-                # Re-apply intensity filter (semantic search doesn't hard-filter)
-                if intensity:
-                    results = [p for p in results if p["intensity"] == (intensity.value if hasattr(intensity, "value") else intensity)]
-                return [
-                    CareProgram(**{**p, "intensity": Intensity(p["intensity"])})
-                    for p in results[:limit]
-                ]
-
-        # Keyword fallback
-        results = self.care_programs.copy()
-        if focus_areas:
-            results = [p for p in results if any(area in p["focus_areas"] for area in focus_areas)]
+        index = self.care_program_index
+        # Intensity is a hard filter (semantic search doesn't apply it)
+        intensity_rows = None
         if intensity:
-            results = [p for p in results if p["intensity"] == (intensity.value if hasattr(intensity, "value") else intensity)]
+            intensity_rows = index.matching("intensity", [intensity.value if hasattr(intensity, "value") else intensity])
+
+        # Try semantic search first
+        matched_ids = self.semantic_search(query, "care_program", limit)
+        if matched_ids:
+            results = index.select(index.rows_for_ids(matched_ids), intensity_rows, limit=limit)
+        else:
+            # Keyword fallback
+            area_rows = index.matching("focus_areas", focus_areas) if focus_areas else None
+            results = index.select(area_rows, intensity_rows, limit=limit)
         return [
             CareProgram(**{**p, "intensity": Intensity(p["intensity"])})
-            for p in results[:limit]
+            for p in results
         ]
 
     def search_exercises(
@@ -197,39 +274,24 @@ class KnowledgeBaseService:
                 parts.append(f"difficulty: {diff}")
             query = " ".join(parts) if parts else "exercise workout"
 
-        # Try semantic search first
-        if self.vector_store and self.vector_store.is_available:
-            semantic_results = self.vector_store.search_documents(
-                query=query,
-                doc_type="exercise",
-                n_results=limit
-            )
-            if semantic_results:
-                matched_ids = {r["id"].replace("exercise_", "") for r in semantic_results}
-                results = [e for e in self.exercises if e["exercise_id"] in matched_ids]
-                # Re-apply difficulty filter
-                if difficulty:
-                    diff_val = difficulty.value if hasattr(difficulty, "value") else difficulty
-                    results = [e for e in results if e["difficulty"] == diff_val]
-                return [
-                    Exercise(**{**e, "difficulty": Difficulty(e["difficulty"])})
-                    for e in results[:limit]
-                ]
-
-        # Keyword fallback
-        results = self.exercises.copy()
-        if target_parameter:
-            results = [
-                e for e in results
-                if target_parameter in e["category"] or
-                   any(target_parameter in p for p in e["target_parameters"])
-            ]
+        index = self.exercise_index
+        difficulty_rows = None
         if difficulty:
-            diff_val = difficulty.value if hasattr(difficulty, "value") else difficulty
-            results = [e for e in results if e["difficulty"] == diff_val]
+            difficulty_rows = index.matching("difficulty", [difficulty.value if hasattr(difficulty, "value") else difficulty])
+
+        # Try semantic search first
+        matched_ids = self.semantic_search(query, "exercise", limit)
+        if matched_ids:
+            results = index.select(index.rows_for_ids(matched_ids), difficulty_rows, limit=limit)
+        else:
+            # Keyword fallback: target_parameter is a substring of the category or a target parameter
+            target_rows = None
+            if target_parameter:
+                target_rows = index.containing(("category", "target_parameters"), target_parameter)
+            results = index.select(target_rows, difficulty_rows, limit=limit)
         return [
             Exercise(**{**e, "difficulty": Difficulty(e["difficulty"])})
-            for e in results[:limit]
+            for e in results
         ]
 
     def search_products(
@@ -251,40 +313,24 @@ class KnowledgeBaseService:
                 parts.append(f"type: {pt}")
             query = " ".join(parts) if parts else "wellness product"
 
-        # Try semantic search first
-        if self.vector_store and self.vector_store.is_available:
-            semantic_results = self.vector_store.search_documents(
-                query=query,
-                doc_type="product",
-                n_results=limit
-            )
-            if semantic_results:
-                matched_ids = {r["id"].replace("product_", "") for r in semantic_results}
-                results = [p for p in self.products if p["product_id"] in matched_ids]
-                if product_type:
-                    pt_val = product_type.value if hasattr(product_type, "value") else product_type
-                    results = [p for p in results if p["type"] == pt_val]
-                return [
-                    Product(**{**p, "type": ProductType(p["type"])})
-                    for p in results[:limit]
-                ]
-
-        # Keyword fallback
-        results = self.products.copy()
-        if condition:
-            condition_lower = condition.lower()
-            results = [
-                p for p in results
-                if any(condition_lower in uc.lower() for uc in p["use_cases"]) or
-                   condition_lower in p["description"].lower() or
-                   condition_lower in p["category"].lower()
-            ]
+        index = self.product_index
+        type_rows = None
         if product_type:
-            pt_val = product_type.value if hasattr(product_type, "value") else product_type
-            results = [p for p in results if p["type"] == pt_val]
+            type_rows = index.matching("type", [product_type.value if hasattr(product_type, "value") else product_type])
+
+        # Try semantic search first
+        matched_ids = self.semantic_search(query, "product", limit)
+        if matched_ids:
+            results = index.select(index.rows_for_ids(matched_ids), type_rows, limit=limit)
+        else:
+            # Keyword fallback: case-insensitive substring of a use case, the description or the category
+            condition_rows = None
+            if condition:
+                condition_rows = index.containing(("use_cases", "description", "category"), condition, case_sensitive=False)
+            results = index.select(condition_rows, type_rows, limit=limit)
         return [
             Product(**{**p, "type": ProductType(p["type"])})
-            for p in results[:limit]
+            for p in results
         ]
 
     # ─────────────────────────────────────────────────────────────────────────
@@ -615,15 +661,27 @@ class KnowledgeBaseService:
         ]
 
 
-# Singleton instance
-knowledge_base = KnowledgeBaseService()
+def catalogue_fingerprint(documents: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Hash of every document's id and content; identifies the catalogue an index artifact was built from."""
+    from app.services.vector_store import content_hash
+
+    digest = hashlib.sha256()
+    for doc_type in sorted(documents):
+        for doc in documents[doc_type]:
+            digest.update(f"{doc_type}\0{doc['id']}\0{content_hash(doc)}\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def get_knowledge_base() -> KnowledgeBaseService:
+    """Get or create the global KnowledgeBaseService instance"""
+    return registry.get("knowledge_base", KnowledgeBaseService)
 
 
 def get_all_exercises() -> List[Dict[str, Any]]:
     """
     Get all exercises as a flat list for external indexing.
     """
-    exercises = knowledge_base.exercises
+    exercises = get_knowledge_base().exercises
 
     formatted_exercises = []
     for ex in exercises:
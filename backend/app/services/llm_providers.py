@@ -0,0 +1,241 @@
+"""
+LLM Providers - Non-blocking clients for Groq, Claude and Poe.
+
+Every provider call is awaited on the event loop (no sync SDK calls), goes
+through a per-provider concurrency cap and timeout, and reuses pooled
+keep-alive HTTP connections for the life of the process. SDKs are imported
+on the first call, not when the provider is built, to keep them out of cold
+start; a missing SDK is still detected up front.
+"""
+import asyncio
+import importlib.util
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+# ---------------------------------------------------------------------------
+# Shared HTTP connection pool
+# ---------------------------------------------------------------------------
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the process-wide pooled AsyncClient used by provider SDKs."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared pool (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+class ProviderError(Exception):
+    """Raised when a provider returns an error or times out."""
+
+
+# ---------------------------------------------------------------------------
+# Providers
+# ---------------------------------------------------------------------------
+
+class LLMProvider(ABC):
+    """
+    Base class for async LLM providers.
+    Subclasses implement _create_client() and _complete(), and optionally
+    _stream(); a provider missing either fails when constructed. Callers use
+    complete()/stream(), which apply the concurrency cap and the provider timeout.
+    """
+
+    name = "base"
+    sdk: Optional[str] = None  # SDK module, imported on first use
+
+    def __init__(self, timeout: float, max_concurrency: int = None):
+        if self.sdk and importlib.util.find_spec(self.sdk) is None:
+            raise ImportError(f"No module named '{self.sdk}'")
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency or settings.LLM_MAX_CONCURRENCY)
+        self._client = None
+
+    @property
+    def client(self) -> Any:
+        """The SDK client, created on first use."""
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    @abstractmethod
+    def _create_client(self) -> Any:
+        """Build the SDK client (called once, on first use)."""
+
+    async def complete(self, messages: List[Any], **params) -> Any:
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(self._complete(messages, **params), self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning("llm_provider_timeout", provider=self.name, timeout=self.timeout)
+                raise ProviderError(f"{self.name} timed out after {self.timeout}s")
+
+    async def stream(self, messages: List[Any], **params) -> AsyncIterator[str]:
+        """Yield text deltas as they arrive; the timeout bounds the whole stream."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.timeout
+            chunks = self._stream(messages, **params)
+            try:
+                while True:
+                    remaining = deadline - loop.time()
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError
+                        text = await asyncio.wait_for(chunks.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        return
+                    except asyncio.TimeoutError:
+                        logger.warning("llm_provider_timeout", provider=self.name, timeout=self.timeout)
+                        raise ProviderError(f"{self.name} timed out after {self.timeout}s")
+                    if text:
+                        yield text
+            finally:
+                await chunks.aclose()
+
+    @abstractmethod
+    async def _complete(self, messages: List[Any], **params) -> Any:
+        """One full completion for the messages."""
+
+    async def _stream(self, messages: List[Any], **params) -> AsyncIterator[str]:
+        # Providers without native streaming yield the full completion once
+        yield await self._complete(messages, **params)
+
+
+class GroqProvider(LLMProvider):
+    """Groq chat completions (OpenAI-compatible) via AsyncGroq."""
+
+    name = "groq"
+    sdk = "groq"
+
+    def __init__(self, api_key: str):
+        super().__init__(settings.GROQ_TIMEOUT_SECONDS)
+        self.api_key = api_key
+        self.model = settings.GROQ_MODEL
+
+    def _create_client(self) -> Any:
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=self.api_key, timeout=self.timeout, http_client=get_http_client())
+
+    async def _complete(self, messages: List[Dict[str, str]], **params) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=False,
+            **params,
+        )
+        return response.choices[0].message.content
+
+    async def _stream(self, messages: List[Dict[str, str]], **params) -> AsyncIterator[str]:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params,
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class ClaudeProvider(LLMProvider):
+    """Anthropic Messages API via AsyncAnthropic. Returns the raw response for tool handling."""
+
+    name = "claude"
+    sdk = "anthropic"
+
+    def __init__(self, api_key: str):
+        super().__init__(settings.CLAUDE_TIMEOUT_SECONDS)
+        self.api_key = api_key
+        self.model = settings.CLAUDE_MODEL
+
+    def _create_client(self) -> Any:
+        import anthropic
+        # The SDK keeps its own pooled keep-alive client; one instance per process reuses it
+        return anthropic.AsyncAnthropic(api_key=self.api_key, timeout=self.timeout)
+
+    async def _complete(self, messages: List[Dict[str, Any]], **params) -> Any:
+        return await self.client.messages.create(model=self.model, messages=messages, **params)
+
+    async def _stream(self, messages: List[Dict[str, Any]], **params) -> AsyncIterator[str]:
+        async with self.client.messages.stream(model=self.model, messages=messages, **params) as response:
+            async for text in response.text_stream:
+                yield text
+
+
+class PoeProvider(LLMProvider):
+    """Poe bot responses via fastapi_poe; partial responses are streamed as they arrive."""
+
+    name = "poe"
+    sdk = "fastapi_poe"
+
+    def __init__(self, api_key: str):
+        super().__init__(settings.POE_TIMEOUT_SECONDS)
+        self.api_key = api_key
+        self.bot_name = settings.POE_BOT_NAME
+
+    @property
+    def fp(self) -> Any:
+        return self.client
+
+    def _create_client(self) -> Any:
+        import fastapi_poe
+        return fastapi_poe
+
+    async def _complete(self, messages: List[Any], **params) -> str:
+        return "".join([text async for text in self._stream(messages, **params)])
+
+    async def _stream(self, messages: List[Any], **params) -> AsyncIterator[str]:
+        async for partial in self.fp.get_bot_response(
+            messages=messages,
+            bot_name=self.bot_name,
+            api_key=self.api_key,
+            session=get_http_client(),
+        ):
+            if isinstance(partial, self.fp.MetaResponse):
+                continue
+            if isinstance(partial, self.fp.ErrorResponse):
+                raise ProviderError(f"Poe API error: {partial.text}")
+            yield partial.text
+
+
+def build_provider() -> Optional[LLMProvider]:
+    """Create the provider selected by AI_PROVIDER, or None if it can't be configured."""
+    provider = settings.AI_PROVIDER.lower()
+    try:
+        if provider == "groq" and settings.GROQ_API_KEY:
+            return GroqProvider(settings.GROQ_API_KEY)
+        if provider == "poe" and settings.POE_API_KEY:
+            return PoeProvider(settings.POE_API_KEY)
+        if provider not in ("groq", "poe") and settings.ANTHROPIC_API_KEY:
+            return ClaudeProvider(settings.ANTHROPIC_API_KEY)
+    except ImportError as e:
+        logger.warning("llm_provider_sdk_missing", provider=provider, error=str(e))
+    except Exception as e:
+        logger.error("llm_provider_init_failed", provider=provider, error=str(e))
+    return None
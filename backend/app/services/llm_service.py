@@ -1,11 +1,14 @@
 """
 LLM Service - Claude API Integration with Function Calling
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
 import os
 
 from app.core.config import settings
-from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_base import get_knowledge_base
+from app.services.llm_providers import LLMProvider, build_provider
+from app.services.registry import registry
+from app.services.response_cache import CacheKey, ResponseCache, get_response_cache
 
 
 class LLMService:
@@ -15,74 +18,23 @@ class LLMService:
     """
     
     def __init__(self):
-        self.knowledge_base = KnowledgeBaseService()
-        self.client = None
-        self.poe_client = None
-        self.groq_client = None
+        self.knowledge_base = get_knowledge_base()
+        self.provider: Optional[LLMProvider] = None
+        self.response_cache: Optional[ResponseCache] = get_response_cache()
         self._init_client()
     
     def _init_client(self):
-        """Initialize AI client based on provider setting"""
+        """Initialize the async AI provider based on provider setting"""
         print("\n" + "="*80)
         print("🔧 INITIALIZING LLM CLIENT")
         print("="*80)
+        print(f"   AI_PROVIDER from settings: '{settings.AI_PROVIDER.lower()}'")
         
-        provider = settings.AI_PROVIDER.lower()
-        print(f"   AI_PROVIDER from settings: '{provider}'")
-        
-        if provider == "groq":
-            print("   ✓ Provider is 'groq' - attempting to initialize Groq client...")
-            api_key = settings.GROQ_API_KEY
-            print(f"   GROQ_API_KEY exists: {api_key is not None}")
-            print(f"   GROQ_API_KEY length: {len(api_key) if api_key else 0}")
-            
-            if api_key:
-                try:
-                    from groq import Groq
-                    self.groq_client = Groq(api_key=api_key)
-                    print(f"   ✅ Groq client initialized with model: {settings.GROQ_MODEL}")
-                except ImportError as e:
-                    print(f"   ❌ Import error: {e}")
-                    print("   ❌ groq package not installed, using mock responses")
-                except Exception as e:
-                    print(f"   ❌ Unexpected error: {e}")
-            else:
-                print("   ❌ No API key found - GROQ_API_KEY is None or empty!")
-        
-        elif provider == "poe":
-            print("   ✓ Provider is 'poe' - attempting to initialize Poe client...")
-            # Initialize Poe client
-            api_key = settings.POE_API_KEY
-            print(f"   POE_API_KEY exists: {api_key is not None}")
-            print(f"   POE_API_KEY length: {len(api_key) if api_key else 0}")
-            
-            if api_key:
-                print("   ✓ API key found, importing fastapi_poe...")
-                try:
-                    import fastapi_poe as fp
-                    print("   ✓ fastapi_poe imported successfully")
-                    self.poe_client = fp.get_bot_response
-                    self.poe_api_key = api_key
-                    print(f"   ✅ Poe API initialized with bot: {settings.POE_BOT_NAME}")
-                    print(f"   ✅ self.poe_client = {self.poe_client}")
-                except ImportError as e:
-                    print(f"   ❌ Import error: {e}")
-                    print("   ❌ fastapi-poe package not installed, using mock responses")
-                except Exception as e:
-                    print(f"   ❌ Unexpected error: {e}")
-            else:
-                print("   ❌ No API key found - POE_API_KEY is None or empty!")
+        self.provider = build_provider()
+        if self.provider:
+            print(f"   ✅ {self.provider.name} provider initialized (timeout {self.provider.timeout}s)")
         else:
-            print(f"   Provider is '{provider}' - checking for Claude...")
-            # Initialize Anthropic client (default)
-            api_key = settings.ANTHROPIC_API_KEY
-            if api_key:
-                try:
-                    import anthropic
-                    self.client = anthropic.Anthropic(api_key=api_key)
-                    print(f"   ✅ Anthropic client initialized")
-                except ImportError:
-                    print("   ❌ anthropic package not installed, using mock responses")
+            print("   ❌ No provider available (missing API key or SDK) - using mock responses")
         
         print("="*80 + "\n")
     
@@ -93,18 +45,20 @@ class LLMService:
         include_context: bool = True,
         user_context: Dict = None,
         rag_context: str = "",
+        rag_chunk_ids: List[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Main chat method that orchestrates the conversation flow.
         rag_context: optional string of relevant document chunks from ChromaDB.
+        rag_chunk_ids: ids of the chunks in rag_context, part of the response cache key.
+        use_cache: set False to bypass the response cache for this call.
         """
         print("\n" + "="*80)
         print(f"🔵 CHAT METHOD CALLED")
         print(f"   Message: {user_message[:50]}...")
         print(f"   User context provided: {user_context is not None}")
-        print(f"   Groq client exists: {self.groq_client is not None}")
-        print(f"   Poe client exists: {self.poe_client is not None}")
-        print(f"   Claude client exists: {self.client is not None}")
+        print(f"   Provider: {self.provider.name if self.provider else None}")
         print("="*80)
         
         conversation_history = conversation_history or []
@@ -115,24 +69,161 @@ class LLMService:
         elif user_context is None:
             user_context = {}
         
+        provider = self.provider.name if self.provider else None
+        
+        # Mock responses are cheap, so only real provider answers go through the cache
+        cache_key = None
+        if provider and use_cache and self.response_cache is not None:
+            cache_key = self._cache_key(user_message, user_context, conversation_history, rag_chunk_ids)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                print("⚡ RESPONSE CACHE HIT")
+                return cached
+        
         # If we have Groq client, use it (fastest!)
-        if self.groq_client:
+        if provider == "groq":
             print("✅ USING GROQ API")
-            return await self._call_groq(user_message, user_context, conversation_history, rag_context)
+            response = await self._call_groq(user_message, user_context, conversation_history, rag_context)
         
         # If we have Poe client, use it
-        if self.poe_client:
+        elif provider == "poe":
             print("✅ USING POE API")
-            return await self._call_poe(user_message, user_context, conversation_history, rag_context)
+            response = await self._call_poe(user_message, user_context, conversation_history, rag_context)
         
         # If we have a real Claude client, use it
-        if self.client:
+        elif provider == "claude":
             print("✅ USING CLAUDE API")
-            return await self._call_claude(user_message, user_context, conversation_history, rag_context)
+            response = await self._call_claude(user_message, user_context, conversation_history, rag_context)
         
         # Otherwise, use intelligent mock responses
-        print("❌ USING MOCK RESPONSES - NO API AVAILABLE")
-        return self._generate_mock_response(user_message, user_context)
+        else:
+            print("❌ USING MOCK RESPONSES - NO API AVAILABLE")
+            return self._generate_mock_response(user_message, user_context)
+        
+        # Provider errors fall back to mock responses, which carry no provider metadata
+        if cache_key is not None and response.get("metadata", {}).get("provider"):
+            self.response_cache.put(cache_key, response)
+        return response
+    
+    async def chat_stream(
+        self,
+        user_message: str,
+        conversation_history: List[Dict] = None,
+        include_context: bool = True,
+        user_context: Dict = None,
+        rag_context: str = "",
+        rag_chunk_ids: List[str] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat().
+        Yields {"event": "token", "text": ...} as the provider produces text, then a
+        single {"event": "done", "message": ..., "suggested_questions": [...]}.
+        Falls back to the mock response if the provider fails before any text arrives;
+        a failure after that is re-raised, since the text already yielded is only part
+        of a reply. Cached answers are replayed as a single token.
+        """
+        conversation_history = conversation_history or []
+        
+        if user_context is None and include_context:
+            user_context = self._get_user_context()
+        elif user_context is None:
+            user_context = {}
+        
+        provider = self.provider.name if self.provider else None
+        
+        cache_key = None
+        if provider and use_cache and self.response_cache is not None:
+            cache_key = self._cache_key(user_message, user_context, conversation_history, rag_chunk_ids)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                message = cached.get("response") or cached.get("message", "")
+                yield {"event": "token", "text": message}
+                yield {
+                    "event": "done",
+                    "message": message,
+                    "suggested_questions": cached.get("suggestions") or cached.get("suggested_questions", []),
+                }
+                return
+        
+        parts = []
+        if provider:
+            try:
+                if provider == "groq":
+                    messages = self._build_groq_messages(user_message, user_context, conversation_history, rag_context)
+                    params = {"temperature": 0.7, "max_tokens": 2048, "top_p": 1}
+                elif provider == "poe":
+                    messages = self._build_poe_messages(user_message, user_context, conversation_history, rag_context)
+                    params = {}
+                else:
+                    messages = self._build_messages(user_message, user_context, conversation_history, rag_context)
+                    params = {"max_tokens": 4096, "system": self._build_system_prompt(), "temperature": 0.7}
+                
+                async for text in self.provider.stream(messages, **params):
+                    parts.append(text)
+                    yield {"event": "token", "text": text}
+            except Exception as e:
+                print(f"❌ {provider.upper()} STREAM ERROR: {e}")
+                if parts:
+                    raise
+        
+        if not parts:
+            # No provider, or it failed before producing anything
+            response = self._generate_mock_response(user_message, user_context)
+            message = response.get("response") or response.get("message", "")
+            yield {"event": "token", "text": message}
+            yield {
+                "event": "done",
+                "message": message,
+                "suggested_questions": response.get("suggestions") or response.get("suggested_questions", []),
+            }
+            return
+        
+        message = "".join(parts).strip()
+        suggested_questions = self._generate_suggestions(user_message)
+        if cache_key is not None:
+            self.response_cache.put(cache_key, {
+                "message": message,
+                "suggested_questions": suggested_questions,
+                "metadata": {"provider": provider},
+            })
+        
+        yield {
+            "event": "done",
+            "message": message,
+            "suggested_questions": suggested_questions,
+        }
+    
+    def _cache_key(
+        self,
+        user_message: str,
+        user_context: Dict,
+        conversation_history: List[Dict],
+        rag_chunk_ids: List[str] = None,
+    ) -> CacheKey:
+        """
+        Response cache key for a turn. Prior turns are part of the key because the
+        providers see them; the trailing copy of the current message is dropped.
+        """
+        prior_turns = []
+        for msg in conversation_history[-10:]:
+            if hasattr(msg, 'role'):
+                role = msg.role.value if hasattr(msg.role, 'value') else str(msg.role)
+                content = msg.content
+            else:
+                role = msg.get("role", "")
+                content = msg.get("content", "")
+            prior_turns.append((role, content))
+        if prior_turns and prior_turns[-1] == ("user", user_message):
+            prior_turns.pop()
+        
+        return self.response_cache.make_key(
+            user_message,
+            user_context=user_context,
+            rag_chunk_ids=rag_chunk_ids,
+            prior_turns=prior_turns,
+            provider=self.provider.name,
+        )
     
     async def _call_groq(
         self,
@@ -146,53 +237,17 @@ class LLMService:
         print(f"   Model: {settings.GROQ_MODEL}")
         
         try:
-            # Build system prompt
-            system_prompt = self._build_system_prompt()
-            
-            # Build messages with context
-            context_str = self._format_user_context(user_context)
-            
-            if context_str:
-                full_message = f"{context_str}\n\n"
-            else:
-                full_message = ""
-
-            if rag_context:
-                full_message += f"{rag_context}\n\n"
-
-            full_message += f"Based on all context above, please answer: {user_message}" if (context_str or rag_context) else user_message
-
-            if context_str or rag_context:
-                full_message += "\n\nRemember: Use the specific name and metrics provided above in your response. If document context is provided, reference it."
-            
-            # Convert conversation history to Groq format
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            for msg in conversation_history[-10:]:
-                if hasattr(msg, 'role'):
-                    role = "user" if str(msg.role).lower() == "user" else "assistant"
-                    content = msg.content
-                else:
-                    role = "user" if msg.get("role") == "user" else "assistant"
-                    content = msg.get("content", "")
-                messages.append({"role": role, "content": content})
-            
-            # Add current message
-            messages.append({"role": "user", "content": full_message})
+            messages = self._build_groq_messages(user_message, user_context, conversation_history, rag_context)
             
             print(f"   📤 Calling Groq API with {len(messages)} messages...")
             
-            # Call Groq API (OpenAI-compatible)
-            response = self.groq_client.chat.completions.create(
-                model=settings.GROQ_MODEL,
-                messages=messages,
+            # Call Groq API (OpenAI-compatible), awaited so the event loop keeps serving
+            response_text = await self.provider.complete(
+                messages,
                 temperature=0.7,
                 max_tokens=2048,
                 top_p=1,
-                stream=False
             )
-            
-            response_text = response.choices[0].message.content
             print(f"   📥 Received {len(response_text)} characters from Groq API")
             print(f"   ✅ GROQ API CALL SUCCESSFUL")
             
@@ -234,11 +289,10 @@ class LLMService:
         tools = self._get_tools()
         
         try:
-            response = self.client.messages.create(
-                model=settings.CLAUDE_MODEL,
+            response = await self.provider.complete(
+                messages,
                 max_tokens=4096,
                 system=system_prompt,
-                messages=messages,
                 tools=tools,
                 temperature=0.7
             )
@@ -259,49 +313,13 @@ class LLMService:
         """Call Poe API"""
         print("\n🟢 _call_poe() STARTED")
         print(f"   Bot: {settings.POE_BOT_NAME}")
-        print(f"   API Key length: {len(self.poe_api_key)}")
         try:
-            import fastapi_poe as fp
-            print("   ✓ fastapi_poe imported")
-            
-            # Build context-aware message
-            context_message = self._build_context_message(user_message, user_context)
-            if rag_context:
-                context_message = f"{rag_context}\n\n{context_message}"
-            print(f"   📝 Context message preview (first 500 chars):")
-            print(f"   {context_message[:500]}")
+            messages = self._build_poe_messages(user_message, user_context, conversation_history, rag_context)
             print(f"   User context keys: {list(user_context.keys()) if user_context else 'None'}")
             
-            # Convert conversation history to Poe format
-            messages = []
-            for msg in conversation_history[-10:]:  # Last 10 messages for context
-                # Handle both dict and object formats
-                if hasattr(msg, 'role'):
-                    role = "user" if str(msg.role).lower() == "user" else "bot"
-                    content = msg.content
-                else:
-                    role = "user" if msg.get("role") == "user" else "bot"
-                    content = msg.get("content", "")
-                messages.append(fp.ProtocolMessage(role=role, content=content))
-            
-            # Add current message
-            messages.append(fp.ProtocolMessage(role="user", content=context_message))
-            
             # Call Poe API
             print(f"   📤 Calling Poe API with {len(messages)} messages...")
-            response_text = ""
-            async for partial in self.poe_client(
-                messages=messages,
-                bot_name=settings.POE_BOT_NAME,
-                api_key=self.poe_api_key
-            ):
-                if isinstance(partial, fp.MetaResponse):
-                    continue
-                elif isinstance(partial, fp.ErrorResponse):
-                    print(f"Poe API error: {partial.text}")
-                    return self._generate_mock_response(user_message, user_context)
-                else:
-                    response_text += partial.text
+            response_text = await self.provider.complete(messages)
             
             print(f"   📥 Received {len(response_text)} characters from Poe API")
             print(f"   ✅ POE API CALL SUCCESSFUL")
@@ -323,6 +341,79 @@ class LLMService:
             print("   Falling back to mock response")
             return self._generate_mock_response(user_message, user_context)
     
+    def _build_groq_messages(
+        self,
+        user_message: str,
+        user_context: Dict,
+        conversation_history: List[Dict],
+        rag_context: str = "",
+    ) -> List[Dict]:
+        """Build OpenAI-format messages (system prompt, history, contextual question) for Groq"""
+        system_prompt = self._build_system_prompt()
+        
+        # Build messages with context
+        context_str = self._format_user_context(user_context)
+        
+        if context_str:
+            full_message = f"{context_str}\n\n"
+        else:
+            full_message = ""
+
+        if rag_context:
+            full_message += f"{rag_context}\n\n"
+
+        full_message += f"Based on all context above, please answer: {user_message}" if (context_str or rag_context) else user_message
+
+        if context_str or rag_context:
+            full_message += "\n\nRemember: Use the specific name and metrics provided above in your response. If document context is provided, reference it."
+        
+        # Convert conversation history to Groq format
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        for msg in conversation_history[-10:]:
+            if hasattr(msg, 'role'):
+                role = "user" if str(msg.role).lower() == "user" else "assistant"
+                content = msg.content
+            else:
+                role = "user" if msg.get("role") == "user" else "assistant"
+                content = msg.get("content", "")
+            messages.append({"role": role, "content": content})
+        
+        # Add current message
+        messages.append({"role": "user", "content": full_message})
+        return messages
+    
+    def _build_poe_messages(
+        self,
+        user_message: str,
+        user_context: Dict,
+        conversation_history: List[Dict],
+        rag_context: str = "",
+    ) -> List[Any]:
+        """Build Poe ProtocolMessages (history plus context-aware question)"""
+        import fastapi_poe as fp
+        
+        # Build context-aware message
+        context_message = self._build_context_message(user_message, user_context)
+        if rag_context:
+            context_message = f"{rag_context}\n\n{context_message}"
+        
+        # Convert conversation history to Poe format
+        messages = []
+        for msg in conversation_history[-10:]:  # Last 10 messages for context
+            # Handle both dict and object formats
+            if hasattr(msg, 'role'):
+                role = "user" if str(msg.role).lower() == "user" else "bot"
+                content = msg.content
+            else:
+                role = "user" if msg.get("role") == "user" else "bot"
+                content = msg.get("content", "")
+            messages.append(fp.ProtocolMessage(role=role, content=content))
+        
+        # Add current message
+        messages.append(fp.ProtocolMessage(role="user", content=context_message))
+        return messages
+    
     def _build_context_message(self, user_message: str, user_context: Dict) -> str:
         """Build a context-aware message for Poe API"""
         if not user_context or not user_context.get("name"):
@@ -575,6 +666,7 @@ Key Parameters:"""
         
         # Extract suggested questions from response
         result["suggested_questions"] = self._extract_suggested_questions(result["message"])
+        result["metadata"] = {"provider": "claude", "model": settings.CLAUDE_MODEL}
         
         return result
     
@@ -1130,3 +1222,8 @@ What would you like to explore first?""",
             "What exercises should I do?",
             "Show me care programs"
         ]
+
+
+def get_llm_service() -> LLMService:
+    """Get or create the global LLMService instance"""
+    return registry.get("llm_service", LLMService)
@@ -0,0 +1,153 @@
+"""
+Matrix Index - Exact in-memory vector search for small, static corpora.
+
+The MSK knowledge base is a few dozen entries that never change at runtime, so
+a Chroma query (client round trip, count() call, metadata filter) costs far
+more than the search itself. MatrixIndex keeps the L2-normalized hash
+embeddings of every entry in one float32 matrix with the rows of each
+doc_type stored contiguously: a query is one matrix-vector product over the
+doc_type's row range (its offsets) plus argpartition. Distances use Chroma's
+default squared-L2 metric (2 - 2·cosine for unit vectors) so results are
+interchangeable.
+
+An index can be saved as a prebuilt artifact and loaded with a memory-mapped
+matrix, so startup does no embedding at all. `<path>.json` holds ids,
+offsets, embedding version, a caller supplied fingerprint and the name of
+the matrix file, `<path>.<digest>.npy`, named by a digest of its contents.
+The matrix is written first and the json replaced last, so a reader always
+gets a matrix and metadata from the same save; an unreadable or incomplete
+artifact loads as None, never as an error.
+
+Requires NumPy; callers fall back to Chroma when it is missing.
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+from app.services.embeddings import HashEmbeddingFunction
+
+ARTIFACT_FORMAT = 2
+
+
+class MatrixIndex:
+    """Brute-force cosine search over a fixed set of (id, doc_type) rows."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        doc_types: Sequence[str],
+        matrix: "np.ndarray",
+        embedder: Optional[HashEmbeddingFunction] = None,
+    ):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("MatrixIndex requires NumPy")
+        if len(ids) != len(doc_types) or len(ids) != matrix.shape[0]:
+            raise ValueError("ids, doc_types and matrix rows must line up")
+        self.ids = list(ids)
+        self.embedder = embedder or HashEmbeddingFunction()
+        self.matrix = matrix
+        self.offsets: Dict[str, Tuple[int, int]] = {}  # doc_type -> (first row, end row)
+        for row, doc_type in enumerate(doc_types):
+            start, _ = self.offsets.get(doc_type, (row, row))
+            if start != row and self.offsets[doc_type][1] != row:
+                raise ValueError(f"Rows of doc_type {doc_type!r} are not contiguous")
+            self.offsets[doc_type] = (start, row + 1)
+
+    @classmethod
+    def from_documents(cls, documents: Dict[str, List[Dict]], **kwargs) -> "MatrixIndex":
+        """Embed {doc_type: [{"id", "text", ...}]} as produced for Chroma indexing."""
+        ids, texts, doc_types = [], [], []
+        for doc_type, docs in documents.items():
+            for doc in docs:
+                ids.append(doc["id"])
+                texts.append(doc["text"])
+                doc_types.append(doc_type)
+        embedder = kwargs.pop("embedder", None) or HashEmbeddingFunction()
+        matrix = np.ascontiguousarray(embedder.embed_matrix(texts), dtype=np.float32)
+        return cls(ids, doc_types, matrix, embedder=embedder, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, doc_type: Optional[str] = None, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Top n (id, distance) pairs, nearest first, optionally limited to one doc_type."""
+        start, end = (0, len(self.ids)) if doc_type is None else self.offsets.get(doc_type, (0, 0))
+        n = min(n_results, end - start)
+        if n <= 0:
+            return []
+
+        query_vector = self.embedder.embed_matrix([query])[0].astype(np.float32)
+        scores = self.matrix[start:end] @ query_vector
+
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.lexsort((top, -scores[top]))]  # Best first; ties in row order
+        return [(self.ids[start + i], float(2.0 - 2.0 * scores[i])) for i in top]
+
+    # ------------------------------------------------------------------
+    # Prebuilt artifact
+    # ------------------------------------------------------------------
+
+    def save(self, path: str, fingerprint: str) -> None:
+        """Write the matrix file, then atomically replace `<path>.json` pointing at it."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        matrix = np.ascontiguousarray(self.matrix, dtype=np.float32)
+        matrix_path = f"{path}.{hashlib.sha256(matrix.tobytes()).hexdigest()[:16]}.npy"
+        with open(f"{matrix_path}.tmp", "wb") as f:
+            np.save(f, matrix)
+        os.replace(f"{matrix_path}.tmp", matrix_path)
+
+        meta = {
+            "format": ARTIFACT_FORMAT,
+            "fingerprint": fingerprint,
+            "embedding_version": self.embedder.version,
+            "dim": int(matrix.shape[1]),
+            "matrix": os.path.basename(matrix_path),
+            "ids": self.ids,
+            "offsets": self.offsets,
+        }
+        with open(f"{path}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+        # Matrices of earlier saves (readers that already mapped one keep it open)
+        for stale in glob.glob(f"{glob.escape(path)}.*.npy"):
+            if stale != matrix_path:
+                os.remove(stale)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: Optional[str] = None) -> Optional["MatrixIndex"]:
+        """
+        Open an artifact written by save(), memory-mapping the matrix.
+        Returns None if it is missing, unreadable or incomplete, of another
+        format, or (when given) built from a different fingerprint.
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("MatrixIndex requires NumPy")
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("format") != ARTIFACT_FORMAT:
+                return None
+            if fingerprint is not None and meta.get("fingerprint") != fingerprint:
+                return None
+
+            matrix_path = os.path.join(os.path.dirname(path), os.path.basename(meta["matrix"]))
+            matrix = np.load(matrix_path, mmap_mode="r")
+            doc_types = [None] * len(meta["ids"])
+            for doc_type, (start, end) in meta["offsets"].items():
+                doc_types[start:end] = [doc_type] * (end - start)
+            if matrix.dtype != np.float32 or matrix.shape != (len(meta["ids"]), meta["dim"]) or None in doc_types:
+                return None
+            embedder = HashEmbeddingFunction(version=meta["embedding_version"], dim=meta["dim"])
+            return cls(meta["ids"], doc_types, matrix, embedder=embedder)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
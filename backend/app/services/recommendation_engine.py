@@ -4,8 +4,8 @@ Enhanced Recommendation Engine using User Performance Data and Vector Search
 from typing import List, Dict, Any, Optional
 import structlog
 
-from app.services.vector_store import get_vector_store
-from app.services.knowledge_base import knowledge_base
+from app.services.knowledge_base import get_knowledge_base
+from app.services.registry import registry
 
 logger = structlog.get_logger()
 
@@ -17,11 +17,7 @@ class RecommendationEngine:
     """
     
     def __init__(self):
-        try:
-            self.vector_store = get_vector_store()
-        except:
-            self.vector_store = None
-        self.kb = knowledge_base
+        self.kb = get_knowledge_base()
     
     def generate_recommendations(
         self,
@@ -49,21 +45,17 @@ class RecommendationEngine:
                        query=search_query, 
                        focus_areas=analysis['focus_areas'])
             
-            # Use vector search to find relevant exercises (RAG)
-            if self.vector_store and self.vector_store.is_available:
-                raw_results = self.vector_store.search_documents(
-                    query=search_query,
-                    doc_type="exercise",
-                    n_results=limit * 2  # Get more to filter
-                )
-                # Strip the "exercise_" prefix added during indexing
-                exercises = [
-                    {'id': r["id"].replace("exercise_", ""), 'metadata': r.get("metadata", {})}
-                    for r in raw_results
-                ]
+            # Use semantic search to find relevant exercises (RAG)
+            matched_ids = self.kb.semantic_search(
+                search_query,
+                doc_type="exercise",
+                limit=limit * 2  # Get more to filter
+            )
+            if matched_ids:
+                exercises = [{'id': exercise_id, 'metadata': {}} for exercise_id in matched_ids]
             else:
-                # Fallback to basic filtering if vector store not available
-                logger.info("using_fallback_no_vector_store")
+                # Fallback to basic filtering if semantic search not available
+                logger.info("using_fallback_no_semantic_search")
                 exercises = [{'id': ex.get('exercise_id', ''), 'metadata': {}}
                            for ex in self.kb.exercises[:limit * 2]]
 
@@ -181,10 +173,8 @@ class RecommendationEngine:
     
     def _get_exercise_details(self, exercise_id: str) -> Optional[Dict[str, Any]]:
         """Get full exercise details from knowledge base"""
-        for exercise in self.kb.exercises:
-            if exercise.get('exercise_id') == exercise_id:
-                return exercise.copy()
-        return None
+        exercise = self.kb.get_exercise(exercise_id)
+        return exercise.copy() if exercise else None
     
     def _generate_reason(self, exercise: Dict[str, Any], analysis: Dict[str, Any]) -> str:
         """Generate personalized reason for recommending this exercise"""
@@ -258,7 +248,11 @@ class RecommendationEngine:
             # Find matching care programs
             matching_programs = []
             
-            for program in self.kb.care_programs:
+            # Only programs sharing a focus area can score above zero
+            candidates = self.kb.care_program_index.select(
+                self.kb.care_program_index.matching('focus_areas', focus_areas)
+            )
+            for program in candidates:
                 program_areas = program.get('focus_areas', [])
                 
                 # Calculate match score
@@ -280,13 +274,6 @@ class RecommendationEngine:
             return self.kb.care_programs[:limit]
 
 
-# Global instance
-_recommendation_engine: Optional[RecommendationEngine] = None
-
-
 def get_recommendation_engine() -> RecommendationEngine:
     """Get or create the global RecommendationEngine instance"""
-    global _recommendation_engine
-    if _recommendation_engine is None:
-        _recommendation_engine = RecommendationEngine()
-    return _recommendation_engine
+    return registry.get("recommendation_engine", RecommendationEngine)
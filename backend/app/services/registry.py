@@ -0,0 +1,63 @@
+"""
+Service Registry - Process-wide service instances, built lazily and once.
+
+Services such as the knowledge base, vector store and LLM service are costly
+to construct (catalogue loading, ChromaDB clients, index syncs), so each is
+built on first use rather than at import, and concurrent first callers
+(threadpool endpoints, ingestion workers) wait for a single construction
+instead of racing to build duplicates. Every service exposes a `get_x()`
+accessor backed by this registry. How long each construction took is kept
+in `init_times` (see app.utils.startup_profile).
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import structlog
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+
+class ServiceRegistry:
+    """Named singletons with double-checked, per-name locking."""
+
+    def __init__(self):
+        self._instances: Dict[str, Any] = {}
+        self.init_times: Dict[str, float] = {}  # name -> seconds its factory took
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, name: str, factory: Callable[[], T]) -> T:
+        """Return the instance registered under name, building it with factory on first use."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        # One lock per name: building one service may build (get) another
+        with lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._instances[name] = factory()
+                self.init_times[name] = time.perf_counter() - start
+                logger.info("service_initialized", service=name, ms=round(self.init_times[name] * 1000, 1))
+            return instance
+
+    def peek(self, name: str) -> Optional[Any]:
+        """The instance if already built, without building it."""
+        return self._instances.get(name)
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Forget one instance (or all); the next get() rebuilds it."""
+        with self._guard:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+
+registry = ServiceRegistry()
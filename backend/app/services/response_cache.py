@@ -0,0 +1,210 @@
+"""
+Response Cache - LRU + TTL cache for LLM chat responses.
+
+Entries are keyed on a *scope* (fingerprints of the user context, the RAG chunk
+ids and the prior conversation turns) plus the normalized user message. By
+default only an identical normalized message hits. Near-duplicate matching
+(cosine similarity of the shared hash embeddings, RESPONSE_CACHE_SIMILARITY)
+is opt-in: bag-of-words vectors barely move when one word changes, so
+"left knee" vs. "right knee" or "should" vs. "should not" would share an
+answer. The cache is bounded by entry count and by an
+approximate byte budget; least-recently-used entries are evicted first.
+"""
+import copy
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.services.embeddings import NUMPY_AVAILABLE, HashEmbeddingFunction
+
+logger = structlog.get_logger()
+
+CacheKey = Tuple[str, str]  # (scope fingerprint, normalized message)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", message.lower())).strip()
+
+
+def fingerprint(value: Any) -> str:
+    """Stable short hash of any JSON-serializable value."""
+    blob = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache for chat responses with optional near-duplicate matching.
+    Stored and returned responses are deep copies, so callers may mutate them.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = None,
+        max_bytes: int = None,
+        max_entries: int = None,
+        similarity_threshold: float = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.RESPONSE_CACHE_TTL_SECONDS
+        self.max_bytes = max_bytes if max_bytes is not None else settings.RESPONSE_CACHE_MAX_BYTES
+        self.max_entries = max_entries if max_entries is not None else settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else settings.RESPONSE_CACHE_SIMILARITY
+        )
+        self._clock = clock
+        self._embedder = HashEmbeddingFunction() if NUMPY_AVAILABLE else None
+
+        # key -> (expires_at, size_bytes, response, vector)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, Dict[str, Any], Any]]" = OrderedDict()
+        self._scopes: Dict[str, Dict[str, Any]] = {}  # scope -> {normalized message: vector}
+        self.current_bytes = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    def make_key(
+        self,
+        user_message: str,
+        user_context: Optional[Dict[str, Any]] = None,
+        rag_chunk_ids: Optional[List[str]] = None,
+        prior_turns: Optional[List[Tuple[str, str]]] = None,
+        provider: str = "",
+    ) -> CacheKey:
+        """
+        Build the cache key for a chat turn.
+        user_id is left out of the context fingerprint on purpose: two users with
+        the same name and metrics get the same prompt, so they share answers.
+        """
+        context = {k: v for k, v in (user_context or {}).items() if k != "user_id"}
+        scope = fingerprint([provider, context, sorted(rag_chunk_ids or []), prior_turns or []])
+        return scope, normalize_message(user_message)
+
+    # ------------------------------------------------------------------
+    # Lookup / store
+    # ------------------------------------------------------------------
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Return a cached response for the key (or a near-duplicate in its scope)."""
+        entry = self._live_entry(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[2])
+
+        near_key = self._nearest(key)
+        if near_key is not None:
+            self.near_hits += 1
+            self._entries.move_to_end(near_key)
+            return copy.deepcopy(self._entries[near_key][2])
+
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, response: Dict[str, Any]) -> None:
+        """Store a response, evicting least-recently-used entries to stay in budget."""
+        vector = self._embed(key[1])
+        size = len(json.dumps(response, default=str)) + len(key[1]) + (vector.nbytes if vector is not None else 0)
+        if size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (self._clock() + self.ttl_seconds, size, copy.deepcopy(response), vector)
+        if vector is not None:
+            self._scopes.setdefault(key[0], {})[key[1]] = vector
+        self.current_bytes += size
+
+        while self._entries and (self.current_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._scopes.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _live_entry(self, key: CacheKey):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            self._remove(key)
+            return None
+        return entry
+
+    def _nearest(self, key: CacheKey) -> Optional[CacheKey]:
+        if self._embedder is None or not self.similarity_threshold:
+            return None
+        candidates = self._scopes.get(key[0])
+        if not candidates:
+            return None
+        query = self._embed(key[1])
+        best_key, best_score = None, self.similarity_threshold
+        for message, vector in list(candidates.items()):
+            score = float(query @ vector)
+            if score >= best_score and self._live_entry((key[0], message)) is not None:
+                best_key, best_score = (key[0], message), score
+        return best_key
+
+    def _embed(self, normalized: str):
+        if self._embedder is None or not self.similarity_threshold:
+            return None
+        return self._embedder.embed_matrix([normalized])[0].astype("float32")
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.current_bytes -= entry[1]
+        scope = self._scopes.get(key[0])
+        if scope is not None:
+            scope.pop(key[1], None)
+            if not scope:
+                del self._scopes[key[0]]
+
+
+# Global singleton
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get or create the global ResponseCache, or None when caching is disabled"""
+    global _response_cache
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
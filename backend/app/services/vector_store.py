@@ -1,19 +1,15 @@
 """
 Vector store service using ChromaDB for semantic search (True RAG)
 """
-try:
-    import chromadb
-    from chromadb.config import Settings
-    CHROMADB_AVAILABLE = True
-except ImportError:
-    CHROMADB_AVAILABLE = False
-    chromadb = None
-    Settings = None
-
 from typing import List, Dict, Any, Optional
+import hashlib
+import json
 import structlog
 
 from app.core.config import settings
+from app.services.embeddings import get_or_create_hash_collection, open_persistent_client
+from app.services.registry import registry
+from app.utils.lazy_imports import optional_import
 
 logger = structlog.get_logger()
 
@@ -24,46 +20,13 @@ class VectorStore:
     Supports exercises, care programs, and products.
     """
 
-
-    def _make_embedding_function(self):
-        """
-        Lightweight hash-based embedding function — zero downloads, instant startup.
-        Uses bag-of-words hashing for document similarity search.
-        Suitable for MSK wellness knowledge base keyword/phrase matching.
-        """
-        import hashlib
-        import math
-
-        class HashEmbeddingFunction:
-            """Bag-of-words embedding using hash buckets, no model download required."""
-
-            def name(self) -> str:  # ChromaDB v1.x calls name() as a method
-                return "hash_embedding_fn"
-
-            DIM = 512
-
-
-            def __call__(self, input):
-                result = []
-                for text in input:
-                    vec = [0.0] * self.DIM
-                    words = text.lower().split()
-                    for word in words:
-                        h = int(hashlib.md5(word.encode()).hexdigest(), 16)
-                        idx = h % self.DIM
-                        vec[idx] += 1.0
-                    # L2 normalize
-                    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
-                    vec = [x / norm for x in vec]
-                    result.append(vec)
-                return result
-
-        return HashEmbeddingFunction()
-
+    # Metadata key holding each document's content fingerprint (see sync_documents)
+    CONTENT_HASH_KEY = "content_hash"
 
     def __init__(self):
         """Initialize ChromaDB client with a persistent collection"""
-        if not CHROMADB_AVAILABLE:
+        chromadb = optional_import("chromadb")
+        if chromadb is None:
             logger.warning("ChromaDB not available, vector store disabled - falling back to keyword search")
             self.client = None
             self.collection = None
@@ -73,16 +36,12 @@ class VectorStore:
             import os
             os.makedirs(settings.CHROMA_PERSIST_DIR, exist_ok=True)
 
-            self.client = chromadb.PersistentClient(
-                path=settings.CHROMA_PERSIST_DIR,
-            )
-
-            embedding_fn = self._make_embedding_function()
+            self.client = open_persistent_client(chromadb, settings.CHROMA_PERSIST_DIR)
 
             # Get or create a single unified collection for all MSK knowledge
-            self.collection = self.client.get_or_create_collection(
-                name=settings.CHROMA_COLLECTION_NAME,
-                embedding_function=embedding_fn,
+            self.collection = get_or_create_hash_collection(
+                self.client,
+                settings.CHROMA_COLLECTION_NAME,
                 metadata={"description": "MSK Wellness knowledge base: exercises, care programs, and products"}
             )
 
@@ -129,7 +88,11 @@ class VectorStore:
             for doc in documents:
                 doc_texts.append(doc["text"])
                 # Always inject doc_type into metadata so we can filter later
-                meta = {**doc.get("metadata", {}), "doc_type": doc_type}
+                meta = {
+                    **doc.get("metadata", {}),
+                    "doc_type": doc_type,
+                    self.CONTENT_HASH_KEY: content_hash(doc),
+                }
                 metadatas.append(meta)
                 ids.append(f"{doc_type}_{doc['id']}")
 
@@ -148,6 +111,57 @@ class VectorStore:
         except Exception as e:
             logger.error("Error indexing documents", doc_type=doc_type, error=str(e))
 
+    def sync_documents(self, documents: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+        """
+        Make the collection hold exactly these documents, re-embedding only what changed.
+
+        Stored content hashes are compared with the hashes of the given
+        documents: new or edited documents are upserted, documents no longer
+        in the catalogue are deleted, and the rest are left alone. Costs one
+        metadata scan when nothing changed.
+
+        Args:
+            documents: {doc_type: [{'id', 'text', 'metadata'}]}, as for index_documents.
+
+        Returns:
+            Counts of 'indexed', 'deleted' and 'unchanged' documents.
+        """
+        stats = {"indexed": 0, "deleted": 0, "unchanged": 0}
+        if not self.is_available:
+            return stats
+
+        stored = self.get_content_hashes()
+        current = set()
+        for doc_type, docs in documents.items():
+            changed = []
+            for doc in docs:
+                doc_id = f"{doc_type}_{doc['id']}"
+                current.add(doc_id)
+                if stored.get(doc_id) == content_hash(doc):
+                    stats["unchanged"] += 1
+                else:
+                    changed.append(doc)
+            self.index_documents(changed, doc_type=doc_type)
+            stats["indexed"] += len(changed)
+
+        removed = [doc_id for doc_id in stored if doc_id not in current]
+        if removed:
+            self.collection.delete(ids=removed)
+            stats["deleted"] = len(removed)
+
+        logger.info("Knowledge base synced", **stats)
+        return stats
+
+    def get_content_hashes(self) -> Dict[str, Optional[str]]:
+        """Map every stored document id to its content hash (None if indexed without one)."""
+        if not self.is_available:
+            return {}
+        stored = self.collection.get(include=["metadatas"])
+        return {
+            doc_id: (meta or {}).get(self.CONTENT_HASH_KEY)
+            for doc_id, meta in zip(stored["ids"], stored["metadatas"])
+        }
+
     def search_documents(
         self,
         query: str,
@@ -212,8 +226,9 @@ class VectorStore:
             return
         try:
             self.client.delete_collection(settings.CHROMA_COLLECTION_NAME)
-            self.collection = self.client.get_or_create_collection(
-                name=settings.CHROMA_COLLECTION_NAME,
+            self.collection = get_or_create_hash_collection(
+                self.client,
+                settings.CHROMA_COLLECTION_NAME,
                 metadata={"description": "MSK Wellness knowledge base: exercises, care programs, and products"}
             )
             logger.info("Collection cleared and recreated")
@@ -241,13 +256,12 @@ class VectorStore:
             return {}
 
 
-# Global singleton
-_vector_store: Optional[VectorStore] = None
+def content_hash(document: Dict[str, Any]) -> str:
+    """Fingerprint of a document's searchable text and metadata."""
+    payload = json.dumps([document["text"], document.get("metadata", {})], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
 
 
 def get_vector_store() -> VectorStore:
     """Get or create the global VectorStore instance"""
-    global _vector_store
-    if _vector_store is None:
-        _vector_store = VectorStore()
-    return _vector_store
+    return registry.get("vector_store", VectorStore)
@@ -0,0 +1,222 @@
+"""
+Startup Warmup - Background warm-up of slow startup work, with per-component status.
+
+The application goes live (serves /health) as soon as it is imported; schema
+creation, database pool pre-connect, knowledge base and embedding matrix
+build, ChromaDB sync, provider SDK loading and recovery of interrupted
+document ingestion then run concurrently in the background. /ready reports each component and returns 200 only once every
+step has finished and no required step has failed, so a load balancer can
+hold traffic until the process is actually hot. A failed required step (e.g.
+Postgres briefly unreachable at boot) is re-run with exponential backoff
+until it succeeds, so the process becomes ready once its dependency is back;
+optional steps are tried once. A step can be declared to run after others
+(e.g. ingestion recovery after the schema exists).
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+@dataclass
+class WarmupStep:
+    """One warm-up component: an async callable and its outcome."""
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    required: bool = True
+    status: str = PENDING
+    error: Optional[str] = None
+    seconds: Optional[float] = None
+    attempts: int = 0
+    after: Tuple[str, ...] = ()  # Steps that must be ready before this one runs
+    finished: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def report(self) -> Dict[str, Any]:
+        report: Dict[str, Any] = {"status": self.status, "required": self.required}
+        if self.seconds is not None:
+            report["ms"] = round(self.seconds * 1000, 1)
+        if self.attempts > 1:
+            report["attempts"] = self.attempts
+        if self.error:
+            report["error"] = self.error
+        return report
+
+
+class Warmup:
+    """Runs warm-up steps concurrently in the background and tracks their state."""
+
+    def __init__(self, retry_backoff: Optional[float] = None, max_retry_backoff: Optional[float] = None):
+        self.steps: Dict[str, WarmupStep] = {}
+        self.retry_backoff = settings.WARMUP_RETRY_BACKOFF_SECONDS if retry_backoff is None else retry_backoff
+        self.max_retry_backoff = (
+            settings.WARMUP_RETRY_MAX_BACKOFF_SECONDS if max_retry_backoff is None else max_retry_backoff
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    def add(
+        self,
+        name: str,
+        run: Callable[[], Awaitable[Any]],
+        required: bool = True,
+        after: Sequence[str] = (),
+    ) -> None:
+        self.steps[name] = WarmupStep(name, run, required, after=tuple(after))
+
+    def start(self) -> asyncio.Task:
+        """Start every step on the running loop; returns the task gathering them."""
+        self._task = asyncio.create_task(self._run_all())
+        return self._task
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await self._task
+
+    async def stop(self) -> None:
+        """Cancel steps still running (on shutdown)."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    @property
+    def is_ready(self) -> bool:
+        return all(
+            step.status == READY or (step.status == FAILED and not step.required)
+            for step in self.steps.values()
+        )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready,
+            "components": {name: step.report() for name, step in self.steps.items()},
+        }
+
+    async def _run_all(self) -> None:
+        start = time.perf_counter()
+        await asyncio.gather(*(self._run(step) for step in self.steps.values()))
+        logger.info("warmup_finished", ready=self.is_ready, ms=round((time.perf_counter() - start) * 1000, 1))
+
+    async def _run(self, step: WarmupStep) -> None:
+        """Run a step; a required step is retried with backoff until it succeeds (or is cancelled)."""
+        try:
+            for name in step.after:
+                dependency = self.steps[name]
+                await dependency.finished.wait()
+                if dependency.status != READY:
+                    step.status = FAILED
+                    step.error = f"{name} failed"
+                    return
+            while True:
+                await self._attempt(step)
+                if step.status == READY or not step.required:
+                    return
+                delay = min(self.retry_backoff * 2 ** (step.attempts - 1), self.max_retry_backoff)
+                logger.warning("warmup_step_retrying", step=step.name, attempt=step.attempts, delay_s=delay)
+                await asyncio.sleep(delay)
+        finally:
+            step.finished.set()
+
+    async def _attempt(self, step: WarmupStep) -> None:
+        step.status = RUNNING
+        step.attempts += 1
+        start = time.perf_counter()
+        try:
+            await step.run()
+            step.status = READY
+            step.error = None
+        except asyncio.CancelledError:
+            step.status = FAILED
+            step.error = "cancelled"
+            raise
+        except Exception as e:
+            step.status = FAILED
+            step.error = str(e)
+            log = logger.error if step.required else logger.warning
+            log("warmup_step_failed", step=step.name, error=str(e))
+        finally:
+            step.seconds = time.perf_counter() - start
+        logger.info("warmup_step_finished", step=step.name, status=step.status, ms=round(step.seconds * 1000, 1))
+
+
+# ---------------------------------------------------------------------------
+# Application warm-up steps
+# ---------------------------------------------------------------------------
+
+async def _init_database() -> None:
+    from app.db.init_db import init_db
+    await init_db()
+
+
+async def _preconnect_pool() -> None:
+    """Open the pool's connections up front so first requests skip the connect/TLS handshake."""
+    from sqlalchemy import text
+    from app.db.session import engine
+
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(max(1, size))))
+
+
+async def _build_knowledge_base() -> None:
+    """Load the catalogue and build its embedding matrix."""
+    from app.services.knowledge_base import get_knowledge_base
+    await asyncio.to_thread(get_knowledge_base)
+
+
+async def _index_vector_store() -> None:
+    from app.services.knowledge_base import get_knowledge_base
+
+    def index():
+        vector_store = get_knowledge_base().index_vector_store()
+        if not (vector_store and vector_store.is_available):
+            raise RuntimeError("ChromaDB not available")
+
+    await asyncio.to_thread(index)
+
+
+async def _open_document_store() -> None:
+    from app.services.document_service import get_document_service
+    service = await asyncio.to_thread(get_document_service)
+    if not service.is_available:
+        raise RuntimeError("ChromaDB not available")
+
+
+async def _load_llm_provider() -> None:
+    """Import the provider SDK and create its client, so the first chat doesn't pay for it."""
+    from app.services.llm_service import get_llm_service
+    service = await asyncio.to_thread(get_llm_service)
+    if service.provider is not None:
+        await asyncio.to_thread(lambda: service.provider.client)
+
+
+async def _recover_ingestion() -> None:
+    """Re-queue documents an earlier process left "processing"."""
+    from app.services.ingestion_queue import recover_interrupted_jobs
+    await recover_interrupted_jobs()
+
+
+def build_app_warmup() -> Warmup:
+    """The warm-up pipeline run by the application lifespan."""
+    warmup = Warmup()
+    warmup.add("database", _init_database)
+    warmup.add("database_pool", _preconnect_pool)
+    warmup.add("knowledge_base", _build_knowledge_base)
+    warmup.add("vector_index", _index_vector_store, required=False)
+    warmup.add("document_store", _open_document_store, required=False)
+    warmup.add("llm_provider", _load_llm_provider, required=False)
+    warmup.add("ingestion_recovery", _recover_ingestion, required=False, after=("database",))
+    return warmup
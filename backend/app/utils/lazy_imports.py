@@ -0,0 +1,22 @@
+"""
+Lazy Imports - Optional heavy dependencies, imported on first use.
+
+ChromaDB alone takes ~300ms to import, and provider SDKs (groq, anthropic,
+fastapi_poe) and PyPDF2 only matter once a request needs them. Importing
+them at module level makes every cold start (notably the Vercel serverless
+entry point) pay for all of them before serving anything, so modules call
+optional_import() where the dependency is first used instead.
+"""
+import importlib
+from functools import lru_cache
+from types import ModuleType
+from typing import Optional
+
+
+@lru_cache(maxsize=None)
+def optional_import(name: str) -> Optional[ModuleType]:
+    """Import a module on first call; None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
@@ -0,0 +1,127 @@
+"""
+PDF Parser - Page-level text extraction, optionally sharded across processes.
+
+PyPDF2's extract_text() is pure Python and CPU-bound, so a large PDF keeps one
+core busy for seconds. Documents with at least PDF_PARALLEL_MIN_PAGES pages are
+split into contiguous page ranges that worker processes extract independently;
+smaller ones are parsed in-process, where pool overhead would dominate.
+
+Workers are spawned rather than forked (the app runs threads) and re-import
+this module on start-up, which is why it lives in app.utils: importing
+app.services would initialise ChromaDB in every worker.
+"""
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+PageText = Tuple[int, str]  # (1-based page number, stripped text)
+
+
+def _extract_pages(reader, start: int, stop: int) -> List[PageText]:
+    """Extract pages [start, stop) (0-based) from an open PdfReader."""
+    pages = []
+    for index in range(start, stop):
+        text = reader.pages[index].extract_text()
+        if text and text.strip():
+            pages.append((index + 1, text.strip()))
+    return pages
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[PageText]:
+    """Worker entry point: open the PDF in this process and extract [start, stop)."""
+    from PyPDF2 import PdfReader
+
+    return _extract_pages(PdfReader(path), start, stop)
+
+
+def page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Split page_count pages into contiguous [start, stop) shards, about two per
+    worker so one slow shard (image-heavy pages) doesn't leave the rest idle.
+    """
+    if page_count <= 0:
+        return []
+    shards = max(1, min(page_count, workers * 2))
+    size = math.ceil(page_count / shards)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+# ---------------------------------------------------------------------------
+# Process pool
+# ---------------------------------------------------------------------------
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _worker_count() -> int:
+    return settings.PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Get or create the process-wide PDF pool (spawned: the app runs threads)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=_worker_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the worker processes (called on application shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def parse_pdf(path: str, parallel: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Extract one chunk per non-empty page, in page order.
+
+    Args:
+        parallel: force (True) or disable (False) the process pool; by default
+            it is used when the PDF has at least PDF_PARALLEL_MIN_PAGES pages.
+
+    Returns:
+        list of {"text", "page"} dicts, page numbers 1-based
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    page_count = len(reader.pages)
+    workers = _worker_count()
+    if parallel is None:
+        parallel = workers > 1 and page_count >= settings.PDF_PARALLEL_MIN_PAGES
+
+    if parallel:
+        try:
+            pool = _get_pool()
+            futures = [
+                pool.submit(_extract_page_range, path, start, stop)
+                for start, stop in page_ranges(page_count, workers)
+            ]
+            pages = [page for future in futures for page in future.result()]
+        except (BrokenProcessPool, OSError) as e:
+            # e.g. a worker was OOM-killed, or the platform forbids subprocesses
+            logger.warning("pdf_pool_unavailable", error=str(e), path=path)
+            shutdown_pdf_pool()
+            pages = _extract_pages(reader, 0, page_count)
+    else:
+        pages = _extract_pages(reader, 0, page_count)
+
+    return [{"text": text, "page": page} for page, text in pages]
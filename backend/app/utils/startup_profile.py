@@ -0,0 +1,86 @@
+"""
+Startup Profiler - Where cold-start time goes: module imports and service init.
+
+Imports are profiled in a fresh interpreter with `-X importtime`, so nothing
+this process has already imported skews the numbers; the slowest modules
+(cumulative, including their own imports) and the total per top-level package
+are reported. Services are then built one by one through their `get_x()`
+accessors and timed by the service registry (times include services built
+on the way, e.g. the knowledge base builds the vector store).
+
+    cd backend && python -m app.utils.startup_profile [--module app.main] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+HEAVY_DEPENDENCIES = ("chromadb", "groq", "anthropic", "fastapi_poe", "PyPDF2")
+
+
+def profile_imports(module: str) -> Tuple[List[Tuple[str, int, int]], List[str]]:
+    """
+    (module, self µs, cumulative µs) for every module imported by `import module`,
+    and which of HEAVY_DEPENDENCIES that import loaded.
+    """
+    code = f"import {module}, sys; print(','.join(m for m in {HEAVY_DEPENDENCIES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    loaded = [m for m in result.stdout.strip().splitlines()[-1].split(",") if m] if result.stdout.strip() else []
+    return rows, loaded
+
+
+def profile_services() -> Dict[str, float]:
+    """Build each registered service and return its init time in seconds."""
+    from app.services.document_service import get_document_service
+    from app.services.knowledge_base import get_knowledge_base
+    from app.services.llm_service import get_llm_service
+    from app.services.recommendation_engine import get_recommendation_engine
+    from app.services.registry import registry
+    from app.services.vector_store import get_vector_store
+
+    for accessor in (get_vector_store, get_knowledge_base, get_document_service, get_llm_service,
+                     get_recommendation_engine):
+        accessor()
+    return dict(registry.init_times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profile import time and service initialization")
+    parser.add_argument("--module", default="app.main", help="Module whose import is profiled")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--imports-only", action="store_true", help="Skip building the services")
+    args = parser.parse_args()
+
+    rows, loaded = profile_imports(args.module)
+    total = next((cumulative for name, _, cumulative in rows if name == args.module), 0)
+    print(f"import {args.module}: {total / 1000:.0f}ms")
+    print(f"\n{'cumulative':>11} {'self':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>9.1f}ms {self_us / 1000:>7.1f}ms  {name}")
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    print(f"\n{'self total':>11}  package")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f}ms  {package}")
+    print(f"\nheavy dependencies imported eagerly: {', '.join(loaded) or 'none'}")
+
+    if not args.imports_only:
+        print(f"\n{'init':>11}  service")
+        for name, seconds in profile_services().items():
+            print(f"{seconds * 1000:>9.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
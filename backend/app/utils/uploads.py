@@ -0,0 +1,81 @@
+"""
+Upload storage - Stream an UploadFile to disk in fixed-size chunks.
+
+The file is copied to a hidden temp file next to its destination while its
+size and SHA-256 are tracked, then atomically renamed into place. Only one
+chunk is held in memory at a time, and an oversized upload is aborted as soon
+as it crosses the limit instead of after it has been read in full.
+"""
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from fastapi import UploadFile
+
+from app.core.config import settings
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the size limit; nothing is left on disk."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+
+
+@dataclass
+class StoredUpload:
+    """Where an upload was written, with its size and content hash."""
+    path: Path
+    size: int
+    sha256: str
+
+
+def user_upload_dir(user_id: str, *parts: str) -> Path:
+    """UPLOAD_DIR/<user_id>[/parts...], created if missing."""
+    path = Path(settings.UPLOAD_DIR, user_id, *parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+async def save_upload(
+    file: UploadFile,
+    dest: Path,
+    max_bytes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> StoredUpload:
+    """
+    Stream `file` to `dest`, hashing as it goes.
+
+    Raises:
+        UploadTooLarge: the upload is bigger than max_bytes (default MAX_UPLOAD_SIZE)
+    """
+    max_bytes = max_bytes if max_bytes is not None else settings.MAX_UPLOAD_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    # Reject early when the client declared the size
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    dest = Path(dest)
+    tmp_path = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await out.write(chunk)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return StoredUpload(path=dest, size=size, sha256=digest.hexdigest())
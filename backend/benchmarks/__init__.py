@@ -0,0 +1 @@
+"""Micro-benchmarks. Run from backend/ directory:  python -m benchmarks.<name>"""
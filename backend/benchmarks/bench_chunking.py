@@ -0,0 +1,110 @@
+"""
+Chunking benchmark: the old blank-line / 1000-char TXT splitter vs. the
+token-budgeted sentence chunker, on retrieval quality and throughput.
+
+A synthetic assessment report is built from filler sentences with "facts"
+(sentences carrying a unique pair of keywords) scattered through it. Each
+query asks for one fact. Retrieval mirrors chat RAG: hash-embed the chunks,
+take the top 3 by cosine, and count a hit only if the fact is inside the first
+500 characters of a retrieved chunk (the excerpt the prompt includes).
+
+Run from backend/ directory:  python -m benchmarks.bench_chunking [facts]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+import numpy as np
+
+from app.services.chunking import chunk_text
+from app.services.embeddings import HashEmbeddingFunction
+
+FILLER = [
+    "balance", "reaction", "session", "posture", "lumbar", "shoulder", "wrist", "hold", "repeat",
+    "stretch", "strength", "the", "player", "showed", "during", "practice", "and", "with", "daily",
+    "improved", "score", "seconds", "left", "right", "leg", "core", "mobility", "fatigue", "after",
+]
+PROMPT_EXCERPT = 500
+TOP_K = 3
+
+
+def legacy_chunks(content: str, chunk_size: int = 1000):
+    """The TXT splitter the chunker replaced (kept here for comparison only)."""
+    paragraphs = content.split("\n\n")
+    chunks = []
+    current = ""
+    for para in paragraphs:
+        if len(current) + len(para) > chunk_size and current:
+            chunks.append(current.strip())
+            current = para
+        else:
+            current += "\n\n" + para if current else para
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def make_report(facts: int, seed: int = 11):
+    """Return (text, [(query, fact_key)]) with facts spread through filler paragraphs."""
+    rng = random.Random(seed)
+    sentences, queries = [], []
+    for i in range(facts):
+        for _ in range(rng.randint(4, 9)):
+            sentences.append(" ".join(rng.choices(FILLER, k=rng.randint(8, 18))).capitalize() + ".")
+        a, b = f"marker{i}a", f"marker{i}b"
+        value = rng.randint(10, 99)
+        sentences.append(f"The {a} {b} result was {value} percent.")
+        queries.append((f"what was the {a} {b} result", f"{a} {b} result was {value}"))
+
+    paragraphs, i = [], 0
+    while i < len(sentences):
+        size = rng.randint(5, 12)
+        paragraphs.append(" ".join(sentences[i:i + size]))
+        i += size
+    return "\n\n".join(paragraphs), queries
+
+
+def evaluate(chunks, queries, embedder):
+    matrix = embedder.embed_matrix(chunks)
+    query_matrix = embedder.embed_matrix([q for q, _ in queries])
+    top = np.argsort(-(query_matrix @ matrix.T), axis=1)[:, :TOP_K]
+    hits, reciprocal = 0, 0.0
+    for (_, key), ranked in zip(queries, top):
+        for rank, idx in enumerate(ranked, start=1):
+            if key in chunks[idx][:PROMPT_EXCERPT]:
+                hits += 1
+                reciprocal += 1.0 / rank
+                break
+    return hits / len(queries), reciprocal / len(queries)
+
+
+def main():
+    # Keep facts * 2 well under the 512 hash buckets, or marker tokens collide
+    facts = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    text, queries = make_report(facts)
+    embedder = HashEmbeddingFunction()
+    megabytes = len(text.encode()) / (1024 * 1024)
+
+    splitters = [
+        ("legacy 1000-char", legacy_chunks),
+        ("sentence 120/24", lambda t: list(chunk_text(t, 120, 24))),
+        ("sentence 80/16", lambda t: list(chunk_text(t, 80, 16))),
+        ("sentence 48/8", lambda t: list(chunk_text(t, 48, 8))),  # default
+        ("sentence 32/6", lambda t: list(chunk_text(t, 32, 6))),
+    ]
+    print(f"report: {megabytes:.2f}MB, {facts} facts, top-{TOP_K}, {PROMPT_EXCERPT}-char excerpts")
+    print(f"{'splitter':18} {'chunks':>7} {'avg chars':>10} {'hit@3':>7} {'MRR':>6} {'MB/s':>8}")
+    for label, split in splitters:
+        start = time.perf_counter()
+        chunks = split(text)
+        elapsed = time.perf_counter() - start
+        hit_rate, mrr = evaluate(chunks, queries, embedder)
+        avg = sum(map(len, chunks)) / len(chunks)
+        print(f"{label:18} {len(chunks):>7} {avg:>10.0f} {hit_rate:>7.2%} {mrr:>6.3f} {megabytes / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
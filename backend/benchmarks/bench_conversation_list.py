@@ -0,0 +1,115 @@
+"""
+Benchmark: GET /chat/conversations against a seeded database.
+Compares the old N+1 listing (one query for the page, then last-message and
+COUNT queries per conversation, offset pagination) with the single-query
+listing, on the first page and on a deep page (offset vs keyset cursor).
+
+Run from backend/ directory:  python -m benchmarks.bench_conversation_list [conversations] [messages_each]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+_tmp = tempfile.mkdtemp(prefix="msk_convlist_")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp}/convlist.db")
+os.environ.setdefault("CHROMA_PERSIST_DIR", f"{_tmp}/chromadb")
+os.environ.setdefault("DEBUG", "false")
+
+from fastapi import Response
+from sqlalchemy import select, func, insert
+
+from app.db.init_db import init_db
+from app.db.session import async_session_maker
+from app.models.conversation import Conversation, Message
+from app.api.endpoints.chat import get_conversations, _encode_cursor
+
+USER_ID = "bench-user"
+PAGE = 10
+REPEAT = 20
+
+
+async def seed(n_conversations: int, messages_each: int):
+    base = datetime(2026, 1, 1)
+    conversations, messages = [], []
+    for i in range(n_conversations):
+        conv_id = str(uuid.uuid4())
+        ts = base + timedelta(minutes=i)
+        conversations.append({
+            "id": conv_id, "user_id": USER_ID, "title": f"Conversation {i}",
+            "created_at": ts, "updated_at": ts, "message_count": messages_each,
+        })
+        for seq in range(1, messages_each + 1):
+            messages.append({
+                "id": str(uuid.uuid4()), "conversation_id": conv_id, "created_at": ts,
+                "role": "user" if seq % 2 else "assistant",
+                "content": f"Message {seq} of conversation {i} about balance and flexibility",
+                "sequence": seq,
+            })
+    async with async_session_maker() as session:
+        await session.execute(insert(Conversation), conversations)
+        await session.execute(insert(Message), messages)
+        await session.commit()
+
+
+async def legacy_page(session, offset: int):
+    """The previous implementation: 1 + 2 * PAGE round trips."""
+    result = await session.execute(
+        select(Conversation).where(Conversation.user_id == USER_ID)
+        .order_by(Conversation.updated_at.desc()).offset(offset).limit(PAGE)
+    )
+    summaries = []
+    for conv in result.scalars().all():
+        last_msg = (await session.execute(
+            select(Message).where(Message.conversation_id == conv.id)
+            .order_by(Message.sequence.desc()).limit(1)
+        )).scalar_one_or_none()
+        count = (await session.execute(
+            select(func.count(Message.id)).where(Message.conversation_id == conv.id)
+        )).scalar() or 0
+        summaries.append((conv.id, count, last_msg.content[:50] if last_msg else None))
+    return summaries
+
+
+async def timed(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        async with async_session_maker() as session:
+            await fn(session)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    messages_each = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    await init_db()
+    await seed(n, messages_each)
+
+    deep_offset = n - PAGE
+    async with async_session_maker() as session:
+        anchor = (await session.execute(
+            select(Conversation.updated_at, Conversation.id).where(Conversation.user_id == USER_ID)
+            .order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+            .offset(deep_offset - 1).limit(1)
+        )).one()
+    deep_cursor = _encode_cursor(anchor.updated_at, anchor.id)
+
+    print(f"{n} conversations x {messages_each} messages, page size {PAGE}, mean of {REPEAT} runs")
+    cases = [
+        ("first page, N+1 queries", lambda s: legacy_page(s, 0)),
+        ("first page, single query", lambda s: get_conversations(Response(), user_id=USER_ID, limit=PAGE, db=s)),
+        (f"offset {deep_offset}, N+1 queries", lambda s: legacy_page(s, deep_offset)),
+        (f"offset {deep_offset}, single query", lambda s: get_conversations(Response(), user_id=USER_ID, limit=PAGE, offset=deep_offset, db=s)),
+        ("deep page, keyset cursor", lambda s: get_conversations(Response(), user_id=USER_ID, limit=PAGE, cursor=deep_cursor, db=s)),
+    ]
+    for label, fn in cases:
+        print(f"  {label:32} {await timed(fn):8.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
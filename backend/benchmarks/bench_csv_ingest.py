@@ -0,0 +1,71 @@
+"""
+CSV ingestion memory benchmark: the old one-chunk-per-row list vs. the streamed,
+batched pipeline. Measures the Python heap peak (tracemalloc) of parsing and
+batching only, so Chroma's own memory is left out.
+
+Run from backend/ directory:  python -m benchmarks.bench_csv_ingest
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.core.config import settings
+from app.services.document_service import DocumentService, _batched
+
+COLUMNS = ["session", "game", "reaction_ms", "accuracy", "apm", "posture_score", "wrist_angle", "blink_rate"]
+
+
+def legacy_parse_csv(path):
+    """The implementation the streamed parser replaced (kept here for comparison only)."""
+    chunks = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        reader = csv.DictReader(f)
+        for row_num, row in enumerate(reader, start=1):
+            text = ", ".join(f"{k}: {v}" for k, v in row.items() if v)
+            if text:
+                chunks.append({"text": text, "page": (row_num - 1) // 20 + 1})
+    return chunks
+
+
+def write_export(path: str, rows: int) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            writer.writerow([i, "valorant", 180 + i % 90, 0.4 + (i % 50) / 100, 200 + i % 120, i % 10, 15 + i % 20, i % 25])
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    service = DocumentService.__new__(DocumentService)  # Parsers only; no Chroma client
+    batch_size = settings.DOCUMENT_INDEX_BATCH_SIZE
+    tmp = tempfile.mkdtemp(prefix="msk_csvbench_")
+
+    print(f"{'rows':>8} {'legacy peak':>12} {'legacy chunks':>14} {'stream peak':>12} {'stream chunks':>14} {'time':>8}")
+    for rows in (10_000, 100_000, 300_000):
+        path = os.path.join(tmp, f"export_{rows}.csv")
+        write_export(path, rows)
+
+        legacy_count, _, legacy_peak = measure(lambda: len(legacy_parse_csv(path)))
+        stream_count, elapsed, stream_peak = measure(
+            lambda: sum(len(batch) for batch in _batched(service._parse_csv(path), batch_size))
+        )
+        print(f"{rows:>8} {legacy_peak:>10.1f}MB {legacy_count:>14} {stream_peak:>10.1f}MB {stream_count:>14} {elapsed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
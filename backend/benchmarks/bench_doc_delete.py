@@ -0,0 +1,68 @@
+"""
+Document delete benchmark: finding a document's chunks with a metadata scan
+(collection.get(where={"doc_id": ...})) vs. deriving their ids from the chunk
+count. Each run indexes `docs` documents of 20 chunks into a fresh collection,
+then counts and deletes a sample of them both ways.
+
+Run from backend/ directory:  python -m benchmarks.bench_doc_delete
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.core.config import settings
+
+CHUNKS_PER_DOC = 20
+SAMPLE = 20
+USER_ID = "u1"  # One user in one partition, so the scan covers the whole collection
+
+
+def build_service(docs: int):
+    from app.services.document_service import DocumentService
+
+    settings.CHROMA_PERSIST_DIR = tempfile.mkdtemp(prefix="msk_deletebench_")
+    settings.DOCUMENT_COLLECTION_PARTITIONS = 1
+    service = DocumentService()
+    chunks = [{"text": f"Balance drill {i}, hold for {i % 40} seconds.", "page": i + 1} for i in range(CHUNKS_PER_DOC)]
+    for d in range(docs):
+        service._index_chunks(chunks, doc_id=f"d{d}", user_id=USER_ID, filename="r.txt")
+    return service
+
+
+def scan_delete(service, doc_id: str) -> None:
+    collection = service.collection_for(USER_ID)
+    ids = collection.get(where={"doc_id": doc_id}, include=[])["ids"]
+    collection.delete(ids=ids)
+
+
+def timed(fn, doc_ids):
+    start = time.perf_counter()
+    for doc_id in doc_ids:
+        fn(doc_id)
+    return (time.perf_counter() - start) / len(doc_ids) * 1000
+
+
+def main():
+    print(f"{'docs':>6} {'chunks':>8} {'scan count':>11} {'id count':>9} {'scan delete':>12} {'id delete':>10}")
+    for docs in (100, 500, 2000):
+        service = build_service(docs)
+        sample = [f"d{d}" for d in range(SAMPLE)]
+        rest = [f"d{d}" for d in range(SAMPLE, 2 * SAMPLE)]
+
+        scan_count = timed(
+            lambda doc_id: len(service.collection_for(USER_ID).get(where={"doc_id": doc_id}, include=[])["ids"]),
+            sample,
+        )
+        id_count = timed(lambda doc_id: service.get_document_chunks(doc_id, USER_ID, CHUNKS_PER_DOC), sample)
+        scan = timed(lambda doc_id: scan_delete(service, doc_id), sample)
+        derived = timed(lambda doc_id: service.delete_document(doc_id, USER_ID, CHUNKS_PER_DOC), rest)
+
+        print(f"{docs:>6} {docs * CHUNKS_PER_DOC:>8} {scan_count:>9.2f}ms {id_count:>7.2f}ms "
+              f"{scan:>10.2f}ms {derived:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
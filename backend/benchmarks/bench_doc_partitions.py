@@ -0,0 +1,96 @@
+"""
+Document partitioning benchmark: search_user_documents latency with every
+user in one collection (DOCUMENT_COLLECTION_PARTITIONS=1, the old layout)
+vs. user-hashed partitions, at 1k and 10k users.
+
+Each user gets CHUNKS_PER_USER chunks; after every partition has been queried
+once, a sample of users is timed. Chunks are written straight into the
+partitions (pre-embedded, in large batches) to keep setup time down.
+
+Run from backend/ directory:  python -m benchmarks.bench_doc_partitions
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.core.config import settings
+
+CHUNKS_PER_USER = 3
+QUERIES = 200
+WORDS = [
+    "balance", "reaction", "posture", "lumbar", "shoulder", "wrist", "stretch", "strength", "mobility",
+    "fatigue", "neck", "grip", "hamstring", "core", "breathing", "sleep", "hydration", "eyes", "elbow",
+]
+
+
+def build_service(users: int, partitions: int):
+    from app.services.document_service import DocumentService, chunk_hash, chunk_id, partition_name
+
+    settings.CHROMA_PERSIST_DIR = tempfile.mkdtemp(prefix="msk_partbench_")
+    settings.DOCUMENT_COLLECTION_PARTITIONS = partitions
+    service = DocumentService()
+    rng = random.Random(7)
+
+    rows = defaultdict(list)  # partition -> (user_id, id, text, metadata)
+    for u in range(users):
+        user_id = f"user-{u}"
+        for i in range(CHUNKS_PER_USER):
+            text = " ".join(rng.choices(WORDS, k=40))
+            metadata = {"doc_id": f"doc-{u}", "user_id": user_id, "filename": "r.txt", "page": i + 1,
+                        "chunk_index": i, "chunk_hash": chunk_hash(text)}
+            rows[partition_name(user_id, partitions)].append((user_id, chunk_id(f"doc-{u}", i), text, metadata))
+
+    batch = service._batch_size()
+    for name, items in rows.items():
+        collection = service.collection_for(items[0][0])
+        embedder = service._embedder(collection)
+        for start in range(0, len(items), batch):
+            part = items[start:start + batch]
+            texts = [t for _, _, t, _ in part]
+            collection.upsert(ids=[i for _, i, _, _ in part], documents=texts,
+                              metadatas=[m for _, _, _, m in part], embeddings=embedder(texts))
+    return service
+
+
+def measure(service, users: int):
+    rng = random.Random(3)
+    # Steady state: open and load every partition first (a long-running API
+    # pays this once per partition)
+    warmed = set()
+    for u in range(users):
+        name = service.collection_for(f"user-{u}").name
+        if name not in warmed:
+            warmed.add(name)
+            service.search_user_documents("balance", f"user-{u}")
+
+    latencies = []
+    for _ in range(QUERIES):
+        user_id = f"user-{rng.randrange(users)}"
+        query = " ".join(rng.choices(WORDS, k=6))
+        start = time.perf_counter()
+        hits = service.search_user_documents(query, user_id, n_results=3)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert hits and all(h["metadata"]["user_id"] == user_id for h in hits)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    print(f"{'users':>6} {'chunks':>7} {'partitions':>10} {'mean':>9} {'p95':>9} {'setup':>8}")
+    for users in (1_000, 10_000):
+        for partitions in (1, 16, 64):
+            start = time.perf_counter()
+            service = build_service(users, partitions)
+            setup = time.perf_counter() - start
+            mean, p95 = measure(service, users)
+            print(f"{users:>6} {users * CHUNKS_PER_USER:>7} {partitions:>10} {mean:>7.2f}ms {p95:>7.2f}ms {setup:>7.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Hash embedding micro-benchmark: legacy per-word md5 loop vs. the batched engine.
+Run from backend/ directory:  python -m benchmarks.bench_embeddings
+"""
+import hashlib
+import math
+import random
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.services.embeddings import HashEmbeddingFunction, LEGACY_VERSION, CURRENT_VERSION
+
+VOCAB = [
+    "balance", "reaction", "time", "score", "left", "right", "leg", "stand", "seconds",
+    "lumbar", "rom", "flexibility", "strength", "session", "accuracy", "ms", "percent",
+    "hold", "repeat", "wall", "chair", "squat", "stretch", "pain", "posture", "daily",
+] + [f"metric_{i}" for i in range(2000)] + [str(i) for i in range(1000)]
+
+
+def legacy_embed(texts, dim=512):
+    """The implementation this module replaced (kept here for comparison only)."""
+    result = []
+    for text in texts:
+        vec = [0.0] * dim
+        for word in text.lower().split():
+            h = int(hashlib.md5(word.encode()).hexdigest(), 16)
+            vec[h % dim] += 1.0
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        result.append([x / norm for x in vec])
+    return result
+
+
+def make_corpus(n_texts: int, words_per_text: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(VOCAB, k=words_per_text)) for _ in range(n_texts)]
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    cases = [
+        ("pdf pages (200 x 400 words)", make_corpus(200, 400)),
+        ("csv rows (50k x 12 words)", make_corpus(50_000, 12)),
+    ]
+    print(f"{'workload':32} {'legacy':>10} {'md5-v1':>10} {'crc32-v2':>10} {'speedup':>8}")
+    for label, texts in cases:
+        legacy = timed(legacy_embed, texts, repeat=1)
+        v1 = timed(HashEmbeddingFunction(version=LEGACY_VERSION), texts)
+        v2 = timed(HashEmbeddingFunction(version=CURRENT_VERSION), texts)
+        print(f"{label:32} {legacy:>9.3f}s {v1:>9.3f}s {v2:>9.3f}s {legacy / v2:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
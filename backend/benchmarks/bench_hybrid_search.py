@@ -0,0 +1,66 @@
+"""
+Hybrid search benchmark: search_user_documents with vector ranking only vs.
+vector + BM25 fused by reciprocal rank, on retrieval quality and latency.
+
+Uses the synthetic report from bench_chunking (filler sentences with unique
+"facts"), chunked and indexed for one user. Queries are phrased like chat
+messages ("what was the ... result"), so common words compete with the two
+rare keywords that identify each fact. A hit is the fact appearing in one of
+the top 3 chunks.
+
+Run from backend/ directory:  python -m benchmarks.bench_hybrid_search [facts]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.core.config import settings
+from benchmarks.bench_chunking import make_report
+
+USER_ID = "bench-user"
+TOP_K = 3
+
+
+def postings_bytes(index) -> int:
+    return sum(s.itemsize * len(s) + f.itemsize * len(f) for s, f in index._postings.values())
+
+
+def main():
+    from app.services.chunking import chunk_text
+    from app.services.document_service import DocumentService
+
+    facts = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    settings.CHROMA_PERSIST_DIR = tempfile.mkdtemp(prefix="msk_hybridbench_")
+    service = DocumentService()
+
+    text, queries = make_report(facts)
+    chunks = [{"text": t, "page": i + 1} for i, t in enumerate(chunk_text(text))]
+    service._index_chunks(chunks, doc_id="report", user_id=USER_ID, filename="report.txt")
+    print(f"{len(chunks)} chunks, {facts} facts, top-{TOP_K}")
+
+    print(f"{'ranking':12} {'hit@3':>7} {'MRR':>6} {'mean':>9}")
+    for label, hybrid in (("vector", False), ("hybrid", True)):
+        settings.HYBRID_SEARCH_ENABLED = hybrid
+        service.search_user_documents("warm up", USER_ID)  # Builds the keyword index
+        hits, reciprocal, elapsed = 0, 0.0, 0.0
+        for query, key in queries:
+            start = time.perf_counter()
+            results = service.search_user_documents(query, USER_ID, n_results=TOP_K)
+            elapsed += time.perf_counter() - start
+            for rank, result in enumerate(results, start=1):
+                if key in result["text"]:
+                    hits += 1
+                    reciprocal += 1.0 / rank
+                    break
+        n = len(queries)
+        print(f"{label:12} {hits / n:>7.2%} {reciprocal / n:>6.3f} {elapsed / n * 1000:>7.2f}ms")
+
+    index = service.keyword_index._indexes[USER_ID]
+    print(f"keyword index: {len(index._postings)} terms, {postings_bytes(index) / 1024:.0f}KB of postings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Knowledge base index artifact benchmark: building the MatrixIndex by embedding
+every document vs. memory-mapping a prebuilt artifact, for the real catalogue
+and for synthetic catalogues of growing size.
+
+"embed" is MatrixIndex.from_documents; "fingerprint" + "mmap" (the catalogue
+hash, then MatrixIndex.load) is what KnowledgeBaseService does at startup
+when the artifact is current. The first search after loading is timed
+separately (it pages the matrix in).
+
+Run from backend/ directory:  python -m benchmarks.bench_kb_artifact
+"""
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+WORDS = [
+    "balance", "reaction", "posture", "lumbar", "shoulder", "wrist", "stretch", "strength", "mobility",
+    "fatigue", "neck", "grip", "hamstring", "core", "breathing", "sleep", "hydration", "eyes", "elbow",
+]
+
+
+def synthetic_catalogue(n: int):
+    rng = random.Random(5)
+    return {
+        doc_type: [{"id": f"{doc_type}_{i}", "text": " ".join(rng.choices(WORDS, k=60)), "metadata": {}}
+                   for i in range(n // 3)]
+        for doc_type in ("exercise", "care_program", "product")
+    }
+
+
+def ms(fn, rounds: int = 5):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+
+def main():
+    from app.services.knowledge_base import KnowledgeBaseService, catalogue_fingerprint
+    from app.services.matrix_index import MatrixIndex
+
+    catalogues = [("catalogue", KnowledgeBaseService()._build_documents())]
+    catalogues += [("synthetic", synthetic_catalogue(n)) for n in (3_000, 30_000)]
+
+    print(f"{'corpus':10} {'docs':>7} {'embed':>10} {'fingerprint':>12} {'mmap':>9} {'1st search':>11} {'artifact':>9}")
+    for label, documents in catalogues:
+        path = os.path.join(tempfile.mkdtemp(prefix="msk_kbart_"), "kb_index")
+        embed_ms, index = ms(lambda: MatrixIndex.from_documents(documents))
+        fingerprint_ms, fingerprint = ms(lambda: catalogue_fingerprint(documents))
+        index.save(path, fingerprint)
+        load_ms, loaded = ms(lambda: MatrixIndex.load(path, fingerprint))
+        first_ms, _ = ms(lambda: loaded.search("lumbar stretch posture", doc_type="exercise"), rounds=1)
+        size = sum(os.path.getsize(f) for f in glob.glob(f"{path}.*"))
+        print(f"{label:10} {len(index):>7} {embed_ms:>8.1f}ms {fingerprint_ms:>10.1f}ms {load_ms:>7.1f}ms "
+              f"{first_ms:>9.2f}ms {size / 1024:>7.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Knowledge base keyword-fallback benchmark: the former linear list filters vs.
+the CatalogueIndex id / facet / token indexes, on the real catalogue and on
+one scaled to 10k records per collection.
+
+Scaled records are copies of the real ones with fresh ids and their tags
+(category, target parameters, use cases, focus areas) suffixed with one of
+100 variants, so both broad ("balance") and selective ("rom_lumbar_v7")
+filters are exercised. Semantic search is switched off so every search takes
+the keyword path. "same" checks both implementations return the same ids.
+
+Run from backend/ directory:  python -m benchmarks.bench_kb_filters [rounds]
+"""
+import copy
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.schemas.recommendation import CareProgram, Difficulty, Exercise, Intensity, Product, ProductType
+
+SIZE = 10_000
+VARIANTS = 100
+
+EXERCISE_FILTERS = [("balance", None), ("rom_lumbar_v7", Difficulty.EASY), (None, Difficulty.MODERATE), ("missing", None)]
+PRODUCT_FILTERS = [("BACK", None), ("muscle_pain_v42", None), ("posture", ProductType.ERGONOMIC), ("missing", None)]
+PROGRAM_FILTERS = [(["balance"], None), (["rom_v3", "flexibility_v3"], Intensity.BEGINNER), (["missing"], None)]
+
+
+def scale(records, id_field, tag_fields):
+    scaled = []
+    for i in range(SIZE):
+        record = copy.deepcopy(records[i % len(records)])
+        if i >= len(records):
+            record[id_field] = f"{record[id_field]}_{i}"
+            suffix = f"_v{i % VARIANTS}"
+            for field in tag_fields:
+                value = record[field]
+                record[field] = [v + suffix for v in value] if isinstance(value, list) else value + suffix
+        scaled.append(record)
+    return scaled
+
+
+# Keyword fallback as KnowledgeBaseService ran it before the indexes
+
+def linear_exercises(kb, target_parameter, difficulty, limit=10):
+    results = kb.exercises.copy()
+    if target_parameter:
+        results = [
+            e for e in results
+            if target_parameter in e["category"] or
+               any(target_parameter in p for p in e["target_parameters"])
+        ]
+    if difficulty:
+        results = [e for e in results if e["difficulty"] == difficulty.value]
+    return [Exercise(**{**e, "difficulty": Difficulty(e["difficulty"])}).exercise_id for e in results[:limit]]
+
+
+def linear_products(kb, condition, product_type, limit=5):
+    results = kb.products.copy()
+    if condition:
+        condition_lower = condition.lower()
+        results = [
+            p for p in results
+            if any(condition_lower in uc.lower() for uc in p["use_cases"]) or
+               condition_lower in p["description"].lower() or
+               condition_lower in p["category"].lower()
+        ]
+    if product_type:
+        results = [p for p in results if p["type"] == product_type.value]
+    return [Product(**{**p, "type": ProductType(p["type"])}).product_id for p in results[:limit]]
+
+
+def linear_programs(kb, focus_areas, intensity, limit=5):
+    results = kb.care_programs.copy()
+    if focus_areas:
+        results = [p for p in results if any(area in p["focus_areas"] for area in focus_areas)]
+    if intensity:
+        results = [p for p in results if p["intensity"] == intensity.value]
+    return [CareProgram(**{**p, "intensity": Intensity(p["intensity"])}).program_id for p in results[:limit]]
+
+
+def linear_lookup(kb, exercise_id):
+    for exercise in kb.exercises:
+        if exercise.get("exercise_id") == exercise_id:
+            return exercise
+    return None
+
+
+def timed(fn, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def run(kb, label: str, rounds: int):
+    print(f"\n{label}: {len(kb.exercises)} exercises, {len(kb.products)} products, "
+          f"{len(kb.care_programs)} care programs")
+    build_ms = timed(kb._build_catalogue_indexes, 3)
+    print(f"index build {build_ms:.1f}ms")
+
+    cases = [("exercise", args, lambda a=args: linear_exercises(kb, *a),
+              lambda a=args: [e.exercise_id for e in kb.search_exercises(*a)]) for args in EXERCISE_FILTERS]
+    cases += [("product", args, lambda a=args: linear_products(kb, *a),
+               lambda a=args: [p.product_id for p in kb.search_products(*a)]) for args in PRODUCT_FILTERS]
+    cases += [("care_program", args, lambda a=args: linear_programs(kb, *a),
+               lambda a=args: [p.program_id for p in kb.search_care_programs(*a)]) for args in PROGRAM_FILTERS]
+    last_id = kb.exercises[-1]["exercise_id"]
+    cases.append(("lookup", (last_id,), lambda: linear_lookup(kb, last_id), lambda: kb.get_exercise(last_id)))
+
+    print(f"{'search':13} {'filter':38} {'linear':>9} {'indexed':>9} {'speedup':>8} {'same':>5}")
+    for kind, args, linear, indexed in cases:
+        same = linear() == indexed() if kind != "lookup" else linear() is indexed()
+        linear_ms, indexed_ms = timed(linear, rounds), timed(indexed, rounds)
+        shown = ", ".join(getattr(a, "value", str(a)) for a in args)
+        print(f"{kind:13} {shown[:38]:38} {linear_ms:>7.3f}ms {indexed_ms:>7.3f}ms "
+              f"{linear_ms / indexed_ms:>7.1f}x {'yes' if same else 'NO':>5}")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    from app.services.knowledge_base import KnowledgeBaseService
+
+    kb = KnowledgeBaseService()
+    kb.semantic_search = lambda *args, **kwargs: []
+    run(kb, "catalogue", rounds)
+
+    kb.exercises = scale(kb.exercises, "exercise_id", ("category", "target_parameters"))
+    kb.products = scale(kb.products, "product_id", ("category", "use_cases"))
+    kb.care_programs = scale(kb.care_programs, "program_id", ("focus_areas",))
+    run(kb, "scaled", rounds)
+
+
+if __name__ == "__main__":
+    main()
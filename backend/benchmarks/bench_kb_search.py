@@ -0,0 +1,70 @@
+"""
+Knowledge base search benchmark: Chroma query (VectorStore.search_documents)
+vs. the in-memory MatrixIndex, per doc_type, on latency and agreement.
+
+Both rank the same hash embeddings by the same distance, so the top ids should
+match; "agree" is the share of queries whose top-N lists are identical, ignoring
+entries at distance 2.0 (no word in common with the query), whose order among
+themselves is arbitrary in both.
+
+Run from backend/ directory:  python -m benchmarks.bench_kb_search [rounds]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.core.config import settings
+
+QUERIES = [
+    "lower back pain after long gaming sessions",
+    "wrist and forearm strain from mouse use",
+    "neck stiffness and posture",
+    "improve reaction time and focus",
+    "hamstring flexibility for runners",
+    "eye strain and screen fatigue",
+    "shoulder mobility warm up",
+    "core strength beginner",
+]
+TOP_N = 5
+
+
+def related(results):
+    return [doc_id for doc_id, distance in results if distance < 2.0 - 1e-4]
+
+
+def timed(search, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            search(query)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES)) * 1000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    settings.CHROMA_PERSIST_DIR = tempfile.mkdtemp(prefix="msk_kbbench_")
+    from app.services.knowledge_base import KnowledgeBaseService
+
+    kb = KnowledgeBaseService()
+    store = kb.index_vector_store()
+    print(f"{len(kb.matrix_index)} documents, top-{TOP_N}, {rounds * len(QUERIES)} queries per type")
+
+    print(f"{'doc_type':14} {'chroma':>9} {'matrix':>9} {'speedup':>8} {'agree':>6}")
+    for doc_type in ("exercise", "care_program", "product"):
+        def chroma(query):
+            return [(r["id"].replace(f"{doc_type}_", "", 1), r["distance"])
+                    for r in store.search_documents(query=query, doc_type=doc_type, n_results=TOP_N)]
+
+        def matrix(query):
+            return kb.matrix_index.search(query, doc_type=doc_type, n_results=TOP_N)
+
+        agree = sum(related(chroma(q)) == related(matrix(q)) for q in QUERIES) / len(QUERIES)
+        chroma_ms, matrix_ms = timed(chroma, rounds), timed(matrix, rounds)
+        print(f"{doc_type:14} {chroma_ms:>7.3f}ms {matrix_ms:>7.3f}ms {chroma_ms / matrix_ms:>7.0f}x {agree:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+PDF parsing benchmark: serial page loop vs. the process-pool shard mode.
+Generates text-only PDFs of 10, 100 and 500 pages and times both modes,
+checking they return identical chunks.
+
+Run from backend/ directory:  python -m benchmarks.bench_pdf_parse [words_per_page]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+from app.utils.pdf_parser import parse_pdf, shutdown_pdf_pool, _worker_count
+
+WORDS = [
+    "balance", "reaction", "time", "score", "left", "right", "leg", "stand", "seconds",
+    "lumbar", "rom", "flexibility", "strength", "session", "accuracy", "percent",
+]
+
+
+def write_text_pdf(path: str, pages: int, words_per_page: int = 300, seed: int = 7) -> None:
+    """Write a minimal PDF with one Helvetica text block per page (no dependencies)."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(1, pages + 1):
+        words = [f"Page {page}"] + rng.choices(WORDS, k=words_per_page)
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        ops = ["BT /F1 9 Tf 40 800 Td 11 TL"] + [f"({line}) Tj T*" for line in lines] + ["ET"]
+        stream = "\n".join(ops).encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def timed(fn, *args, repeat: int = 3, **kwargs):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    words_per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tmp = tempfile.mkdtemp(prefix="msk_pdfbench_")
+
+    # Spawn the pool before timing; start-up is paid once per process, not per upload
+    warm = os.path.join(tmp, "warm.pdf")
+    write_text_pdf(warm, 4, words_per_page)
+    parse_pdf(warm, parallel=True)
+
+    print(f"workers={_worker_count()}  words/page={words_per_page}")
+    print(f"{'pages':>6} {'serial':>10} {'parallel':>10} {'speedup':>8}")
+    try:
+        for pages in (10, 100, 500):
+            path = os.path.join(tmp, f"doc_{pages}.pdf")
+            write_text_pdf(path, pages, words_per_page)
+            serial, serial_chunks = timed(parse_pdf, path, parallel=False)
+            parallel, parallel_chunks = timed(parse_pdf, path, parallel=True)
+            assert serial_chunks == parallel_chunks, "parallel parse changed chunk order or text"
+            print(f"{pages:>6} {serial:>9.3f}s {parallel:>9.3f}s {serial / parallel:>7.1f}x")
+    finally:
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Startup benchmark: time to import the app, to go live (lifespan done,
+/health served) and to become ready (/ready returns 200 after the background
+warmup), how many KnowledgeBaseService instances were built (each one loads the
+catalogue, embeds it and syncs ChromaDB), and which heavy optional
+dependencies were imported by `import app.main` alone (they should load on
+first use; see app.utils.lazy_imports).
+
+Each measurement runs in a fresh interpreter against a fresh data directory,
+first with an empty ChromaDB (cold) and then reusing it (warm).
+
+Run from backend/ directory:  python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.abspath(os.path.dirname(__file__) + "/..")
+sys.path.insert(0, BACKEND)
+
+from app.utils.startup_profile import HEAVY_DEPENDENCIES
+
+CHILD = """
+import json, sys, threading, time
+builds = []
+if COUNT:
+    # Profiling slows imports down, so builds are counted in a separate run
+    def profile(frame, event, arg):
+        code = frame.f_code
+        if event == "call" and code.co_name == "__init__" and code.co_filename.endswith("knowledge_base.py"):
+            builds.append(1)
+    sys.setprofile(profile)
+    threading.setprofile(profile)  # TestClient runs startup in a portal thread
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+import_builds = len(builds)
+eager = [m for m in HEAVY if m in sys.modules]
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    live = time.perf_counter()
+    while client.get("/ready").status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+sys.setprofile(None)
+print(json.dumps({"import": imported - start, "live": live - start, "ready": ready - start,
+                  "import_builds": import_builds, "builds": len(builds), "eager": eager}))
+"""
+
+
+def run_child(data_dir: str, count: bool = False) -> dict:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{data_dir}/startup.db",
+        "CHROMA_PERSIST_DIR": f"{data_dir}/chromadb",
+        "UPLOAD_DIR": f"{data_dir}/uploads",
+        "DEBUG": "false",
+    }
+    preamble = f"COUNT = {count}\nHEAVY = {HEAVY_DEPENDENCIES!r}\n"
+    out = subprocess.run([sys.executable, "-c", preamble + CHILD], cwd=BACKEND, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"{'chroma':7} {'import':>9} {'live':>9} {'ready':>9} {'KB builds (import/total)':>25}")
+    samples = {"cold": [], "warm": []}
+    for _ in range(runs):
+        data_dir = tempfile.mkdtemp(prefix="msk_startup_")
+        samples["cold"].append(run_child(data_dir))
+        samples["warm"].append(run_child(data_dir))
+    counted = run_child(tempfile.mkdtemp(prefix="msk_startup_"), count=True)
+    builds = f"{counted['import_builds']}/{counted['builds']}"
+    for label, results in samples.items():
+        imported, live, ready = (statistics.median(r[key] for r in results) * 1000
+                                 for key in ("import", "live", "ready"))
+        print(f"{label:7} {imported:>7.0f}ms {live:>7.0f}ms {ready:>7.0f}ms {builds:>25}")
+    print(f"heavy dependencies imported by `import app.main`: {', '.join(counted['eager']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Load test: N concurrent POST /chat/send calls against a simulated LLM.
+With async providers a batch of up to LLM_MAX_CONCURRENCY calls should finish
+in roughly one LLM latency (larger batches queue behind the cap); the blocking
+variant (sync SDK call inside async def) takes roughly N.
+
+Run from backend/ directory:  python -m benchmarks.load_chat_send [N] [latency_s]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__) + "/.."))
+
+_tmp = tempfile.mkdtemp(prefix="msk_load_")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp}/load.db")
+os.environ.setdefault("CHROMA_PERSIST_DIR", f"{_tmp}/chromadb")
+os.environ.setdefault("DEBUG", "false")
+
+import httpx
+
+from app.main import app
+from app.core.config import settings
+from app.db.init_db import init_db
+from app.services.llm_service import get_llm_service
+from app.services.llm_providers import LLMProvider
+
+
+class SimulatedProvider(LLMProvider):
+    """Groq-shaped provider whose only cost is a fixed network latency."""
+
+    name = "groq"
+
+    def __init__(self, latency: float, blocking: bool = False):
+        super().__init__(timeout=latency * 100)
+        self.latency = latency
+        self.blocking = blocking
+
+    def _create_client(self):
+        return None
+
+    async def _complete(self, messages, **params) -> str:
+        if self.blocking:
+            time.sleep(self.latency)  # what the old sync SDK call did to the loop
+        else:
+            await asyncio.sleep(self.latency)
+        return "Simulated coaching reply."
+
+
+async def run(n: int, latency: float, blocking: bool):
+    get_llm_service().provider = SimulatedProvider(latency, blocking=blocking)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/v1/chat/send", json={"message": f"balance question {i}", "bypass_cache": True})
+            for i in range(n)
+        ])
+        elapsed = time.perf_counter() - start
+    # The blocking variant can also fail: a frozen loop stalls other sessions'
+    # open SQLite transactions past the busy timeout
+    failed = sum(1 for r in responses if r.status_code != 200)
+    return elapsed, failed
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else settings.LLM_MAX_CONCURRENCY
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    await init_db()
+
+    print(f"{n} concurrent /chat/send calls, simulated LLM latency {latency:.2f}s, "
+          f"concurrency cap {settings.LLM_MAX_CONCURRENCY}")
+    for label, blocking in (("async provider", False), ("blocking provider", True)):
+        elapsed, failed = await run(n, latency, blocking=blocking)
+        print(f"  {label:18} {elapsed:6.2f}s  ({elapsed / latency:4.1f} x latency, {failed} failed)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -33,7 +33,7 @@ async def test_startup():
     # Test 3: Services
     print("\n3️⃣ Testing services...")
     try:
-        from app.services.knowledge_base import knowledge_base, get_all_exercises
+        from app.services.knowledge_base import get_all_exercises
         exercises = get_all_exercises()
         print(f"   ✅ Knowledge base loaded: {len(exercises)} exercises")
     except Exception as e:
@@ -1,6 +1,8 @@
 """
 Pytest Configuration and Fixtures
 """
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -13,6 +15,16 @@ def client():
         yield test_client
 
 
+@pytest.fixture
+def warm_client(client):
+    """The test client once startup warmup has finished (schema created, pools and indexes warm)"""
+    deadline = time.monotonic() + 60
+    while client.get("/ready").status_code != 200:
+        assert time.monotonic() < deadline, client.get("/ready").json()
+        time.sleep(0.05)
+    return client
+
+
 @pytest.fixture
 def sample_user_report():
     """Sample user report data for testing"""
@@ -5,6 +5,7 @@ import pytest
 from datetime import datetime
 
 
+@pytest.mark.usefixtures("warm_client")
 class TestChatEndpoints:
     """Test suite for chat API endpoints"""
     
@@ -55,6 +56,133 @@ class TestChatEndpoints:
         # Should still work but get a prompt to ask something
         assert response.status_code == 200
     
+    def test_stream_message(self, client):
+        """Test streaming a reply as server-sent events and persisting it"""
+        import json
+        
+        response = client.post(
+            "/api/v1/chat/stream",
+            json={"message": "How can I improve my balance?"}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+            for block in response.text.strip().split("\n\n")
+        ]
+        names = [name for name, _ in events]
+        assert names[0] == "start" and names[-1] == "done"
+        assert "token" in names
+        
+        done = events[-1][1]
+        assert done["message"] == "".join(d["text"] for n, d in events if n == "token").strip()
+        assert done["suggested_questions"]
+        
+        history = client.get(f"/api/v1/chat/conversations/{done['conversation_id']}").json()
+        assert [m["role"] for m in history["messages"]] == ["user", "assistant"]
+    
+    def test_stream_cut_off_mid_reply_is_an_error(self, client, monkeypatch):
+        """Test a provider failing after the first delta ends in a truncated error and saves no reply"""
+        import json
+        from app.services.llm_providers import LLMProvider
+        from app.services.llm_service import get_llm_service
+        
+        class FailingProvider(LLMProvider):
+            name = "groq"
+            
+            def _create_client(self):
+                return None
+            
+            async def _complete(self, messages, **params):
+                return ""
+            
+            async def _stream(self, messages, **params):
+                yield "Start with "
+                raise RuntimeError("connection reset")
+        
+        monkeypatch.setattr(get_llm_service(), "provider", FailingProvider(timeout=5))
+        response = client.post("/api/v1/chat/stream", json={"message": "Knee rehab plan?", "bypass_cache": True})
+        
+        events = [
+            (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+            for block in response.text.strip().split("\n\n")
+        ]
+        assert [name for name, _ in events] == ["start", "token", "error"]
+        assert events[-1][1]["truncated"] is True
+        
+        history = client.get(f"/api/v1/chat/conversations/{events[0][1]['conversation_id']}").json()
+        assert [m["role"] for m in history["messages"]] == ["user"]
+    
+    def test_message_sequence_counter(self, client):
+        """Test each turn reserves consecutive sequences and the summary reads the counter"""
+        conv_id = client.post("/api/v1/chat/message", json={"message": "Hello"}).json()["conversation_id"]
+        client.post("/api/v1/chat/message", json={"message": "Tell me more", "conversation_id": conv_id})
+        
+        history = client.get(f"/api/v1/chat/conversations/{conv_id}").json()
+        assert [m["role"] for m in history["messages"]] == ["user", "assistant", "user", "assistant"]
+        
+        summaries = client.get("/api/v1/chat/conversations", params={"user_id": "demo-user", "limit": 50}).json()
+        summary = next(s for s in summaries if s["conversation_id"] == conv_id)
+        assert summary["message_count"] == 4
+    
+    def test_conversations_keyset_pagination(self, client):
+        """Test cursor pagination walks every conversation once, newest first"""
+        import uuid
+        
+        user_id = f"pager-{uuid.uuid4()}"
+        created = [
+            client.post("/api/v1/chat/message", json={"message": f"Page test {i}", "user_id": user_id}).json()["conversation_id"]
+            for i in range(3)
+        ]
+        
+        first = client.get("/api/v1/chat/conversations", params={"user_id": user_id, "limit": 2})
+        assert [c["conversation_id"] for c in first.json()] == created[::-1][:2]
+        assert first.json()[0]["message_count"] == 2
+        assert first.json()[0]["last_message_preview"]
+        
+        second = client.get(
+            "/api/v1/chat/conversations",
+            params={"user_id": user_id, "limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+        )
+        assert [c["conversation_id"] for c in second.json()] == [created[0]]
+        assert "X-Next-Cursor" not in second.headers
+    
+    def test_conversations_limit_bounds(self, client):
+        """Test out-of-range limits and offsets are rejected and an empty page has no cursor"""
+        import uuid
+        
+        for params in ({"limit": 0}, {"limit": -1}, {"limit": 101}, {"offset": -1}):
+            assert client.get("/api/v1/chat/conversations", params=params).status_code == 422
+        
+        empty = client.get("/api/v1/chat/conversations", params={"user_id": f"nobody-{uuid.uuid4()}", "limit": 1})
+        assert empty.status_code == 200
+        assert empty.json() == []
+        assert "X-Next-Cursor" not in empty.headers
+    
+    def test_rag_search_runs_off_event_loop(self, client, monkeypatch):
+        """Test the synchronous document search runs in a worker thread and feeds rag_sources"""
+        import asyncio
+        from app.api.endpoints import chat
+        
+        seen = {}
+        
+        def fake_search(message, user_id):
+            try:
+                asyncio.get_running_loop()
+                seen["on_loop"] = True
+            except RuntimeError:
+                seen["on_loop"] = False
+            return [{"chunk_id": "doc_x_chunk_0", "text": "Balance notes",
+                     "metadata": {"filename": "notes.txt", "page": 2, "doc_id": "x"}}]
+        
+        monkeypatch.setattr(chat, "_search_documents", fake_search)
+        response = client.post("/api/v1/chat/send", json={"message": "Hello", "user_id": "rag-user"})
+        
+        assert response.status_code == 200
+        assert response.json()["rag_sources"] == [{"filename": "notes.txt", "page": 2, "doc_id": "x"}]
+        assert seen["on_loop"] is False
+    
     def test_get_conversations(self, client):
         """Test retrieving conversations list"""
         response = client.get("/api/v1/chat/conversations")
@@ -131,6 +259,186 @@ class TestRecommendationEndpoints:
         assert isinstance(data, list)
 
 
+@pytest.mark.usefixtures("warm_client")
+class TestUploadEndpoints:
+    """Test suite for upload API endpoints"""
+    
+    @staticmethod
+    def _wait_for_ingestion(client, doc_id, timeout=10.0):
+        import time
+        
+        deadline = time.monotonic() + timeout
+        while True:
+            status = client.get(f"/api/v1/upload/document/{doc_id}/status").json()
+            if status["status"] != "processing" or time.monotonic() > deadline:
+                return status
+            time.sleep(0.05)
+    
+    def test_document_upload_is_indexed_in_background(self, client):
+        """Test upload returns processing at once and the status endpoint reports the result"""
+        user_id = client.post("/api/v1/profile", json={"name": "Uploader"}).json()["id"]
+        
+        response = client.post(
+            f"/api/v1/upload/document/{user_id}",
+            files={"file": ("notes.txt", b"Balance notes.\n\nSingle-leg stand for 30 seconds.", "text/plain")},
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["status"] == "processing"
+        status = self._wait_for_ingestion(client, response.json()["doc_id"])
+        assert status["status"] == "indexed"
+        assert status["chunk_count"] == 1
+        assert status["job"] is None
+    
+    def test_identical_reupload_reuses_chunks(self, client):
+        """Test a byte-identical re-upload skips ingestion and deleting one copy keeps the shared chunks"""
+        from app.services.document_service import get_document_service
+        
+        user_id = client.post("/api/v1/profile", json={"name": "Re-uploader"}).json()["id"]
+        upload = {"file": ("report.txt", b"Lumbar flexion 40 degrees.\n\nHamstring stretch daily.", "text/plain")}
+        
+        first = client.post(f"/api/v1/upload/document/{user_id}", files=upload).json()
+        assert self._wait_for_ingestion(client, first["doc_id"])["status"] == "indexed"
+        second = client.post(f"/api/v1/upload/document/{user_id}", files=upload).json()
+        
+        assert second["deduplicated"] is True
+        assert second["status"] == "indexed"
+        assert second["chunk_count"] == 1
+        collection = get_document_service().collection_for(user_id)
+        assert len(collection.get(where={"user_id": user_id})["ids"]) == 1
+        
+        client.delete(f"/api/v1/upload/document/{first['doc_id']}")
+        assert len(collection.get(where={"user_id": user_id})["ids"]) == 1
+        client.delete(f"/api/v1/upload/document/{second['doc_id']}")
+        assert collection.get(where={"user_id": user_id})["ids"] == []
+    
+    def test_deleting_a_processing_document_leaves_no_chunks(self, client, monkeypatch):
+        """Test chunks indexed after their document was deleted mid-ingestion are removed"""
+        import threading
+        from app.services.document_service import get_document_service
+        from app.services.ingestion_queue import IngestionQueue, get_ingestion_queue
+        
+        release = threading.Event()
+        ingest = IngestionQueue._ingest
+        
+        def blocked_ingest(queue, job):
+            release.wait(10)
+            return ingest(queue, job)
+        monkeypatch.setattr(IngestionQueue, "_ingest", blocked_ingest)
+        
+        user_id = client.post("/api/v1/profile", json={"name": "Quick Deleter"}).json()["id"]
+        upload = {"file": ("notes.txt", b"Ankle mobility drills twice a day.", "text/plain")}
+        doc_id = client.post(f"/api/v1/upload/document/{user_id}", files=upload).json()["doc_id"]
+        
+        assert client.delete(f"/api/v1/upload/document/{doc_id}").status_code == 200
+        release.set()
+        client.portal.call(get_ingestion_queue().join)
+        
+        collection = get_document_service().collection_for(user_id)
+        assert collection.get(where={"user_id": user_id})["ids"] == []
+    
+    def test_interrupted_ingestion_is_recovered_on_startup(self, client):
+        """Test documents an earlier process left "processing" are re-queued, or failed once their file is gone"""
+        import uuid
+        from app.db.session import async_session_maker
+        from app.models.document import Document
+        from app.services.ingestion_queue import recover_interrupted_jobs
+        from app.utils.uploads import user_upload_dir
+        
+        user_id = client.post("/api/v1/profile", json={"name": "Restarted"}).json()["id"]
+        kept, lost = str(uuid.uuid4()), str(uuid.uuid4())
+        (user_upload_dir(user_id, "documents") / f"{kept}.txt").write_text("Hamstring notes from before the restart.")
+        
+        async def leave_processing():
+            async with async_session_maker() as session:
+                session.add_all([
+                    Document(id=doc_id, user_id=user_id, filename="notes.txt", file_type="txt",
+                             status="processing", created_at=datetime(2026, 1, 1))
+                    for doc_id in (kept, lost)
+                ])
+                await session.commit()
+        
+        client.portal.call(leave_processing)
+        assert client.portal.call(recover_interrupted_jobs) == {"requeued": 1, "failed": 1}
+        
+        assert self._wait_for_ingestion(client, kept)["status"] == "indexed"
+        assert client.get(f"/api/v1/upload/document/{lost}/status").json()["status"] == "failed"
+        assert client.portal.call(recover_interrupted_jobs) == {"requeued": 0, "failed": 0}
+    
+    def test_oversized_upload_is_rejected_without_leftovers(self, client, monkeypatch):
+        """Test an upload over MAX_UPLOAD_SIZE gets 413 and leaves no file behind"""
+        from pathlib import Path
+        from app.core.config import settings
+        
+        user_id = client.post("/api/v1/profile", json={"name": "Big Uploader"}).json()["id"]
+        monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 256)
+        
+        response = client.post(
+            f"/api/v1/upload/document/{user_id}",
+            files={"file": ("big.txt", b"x" * 5000, "text/plain")},
+        )
+        
+        assert response.status_code == 413
+        assert list((Path(settings.UPLOAD_DIR) / user_id).rglob("*.*")) == []
+
+    
+    def test_batch_upload_reports_status_per_file(self, client):
+        """Test a batch upload queues new files, dedups repeats and rejects bad types per file"""
+        user_id = client.post("/api/v1/profile", json={"name": "Team Coach"}).json()["id"]
+        existing = {"file": ("old.txt", b"Wrist extension 60 degrees.", "text/plain")}
+        old = client.post(f"/api/v1/upload/document/{user_id}", files=existing).json()
+        assert self._wait_for_ingestion(client, old["doc_id"])["status"] == "indexed"
+        
+        response = client.post(
+            f"/api/v1/upload/documents/{user_id}/batch",
+            files=[
+                ("files", ("a.txt", b"Neck rotation drills twice daily.", "text/plain")),
+                ("files", ("b.csv", b"session,reaction_ms\n1,210\n2,205\n", "text/csv")),
+                ("files", ("a-copy.txt", b"Neck rotation drills twice daily.", "text/plain")),
+                ("files", ("old-again.txt", b"Wrist extension 60 degrees.", "text/plain")),
+                ("files", ("run.exe", b"MZ", "application/octet-stream")),
+            ],
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 5 and data["queued"] == 2
+        statuses = [r["status"] for r in data["results"]]
+        assert statuses == ["processing", "processing", "duplicate", "indexed", "rejected"]
+        assert data["results"][2]["doc_id"] == data["results"][0]["doc_id"]
+        for entry in data["results"][:2]:
+            status = self._wait_for_ingestion(client, entry["doc_id"])
+            assert status["status"] == "indexed" and status["chunk_count"] == 1
+        assert len(client.get(f"/api/v1/upload/documents/{user_id}").json()) == 4
+    
+    def test_batch_upload_unknown_user(self, client):
+        """Test a batch upload for a missing user is rejected once"""
+        response = client.post(
+            "/api/v1/upload/documents/nope/batch",
+            files=[("files", ("a.txt", b"text", "text/plain"))],
+        )
+        
+        assert response.status_code == 404
+
+    
+    def test_delete_all_user_documents(self, client):
+        """Test deleting a user's documents removes every row and chunk, including shared chunk sets"""
+        from app.services.document_service import get_document_service
+        
+        user_id = client.post("/api/v1/profile", json={"name": "Leaver"}).json()["id"]
+        upload = {"file": ("a.txt", b"Shoulder mobility drills.", "text/plain")}
+        first = client.post(f"/api/v1/upload/document/{user_id}", files=upload).json()
+        assert self._wait_for_ingestion(client, first["doc_id"])["status"] == "indexed"
+        client.post(f"/api/v1/upload/document/{user_id}", files=upload)
+        
+        response = client.delete(f"/api/v1/upload/documents/{user_id}")
+        
+        assert response.json()["deleted"] == 2
+        assert client.get(f"/api/v1/upload/documents/{user_id}").json() == []
+        assert get_document_service().collection_for(user_id).get(where={"user_id": user_id})["ids"] == []
+
+
 class TestHealthCheck:
     """Test health check endpoint"""
     
@@ -141,3 +449,13 @@ class TestHealthCheck:
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
+    
+    def test_ready_reports_each_warmup_component(self, warm_client):
+        """Test /ready lists every warmup step once startup has finished"""
+        response = warm_client.get("/ready")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ready"] is True
+        assert {"database", "database_pool", "knowledge_base", "vector_index"} <= set(data["components"])
+        assert data["components"]["database"]["status"] == "ready"
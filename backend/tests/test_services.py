@@ -1,6 +1,7 @@
 """
 Tests for LLM Service
 """
+import os
 import pytest
 from app.services.llm_service import LLMService
 
@@ -60,6 +61,1088 @@ class TestLLMService:
             {}
         )
         assert len(response) > 0
+    
+    def test_concurrent_chats_overlap(self):
+        """Test concurrent chats share the event loop instead of running one at a time"""
+        import asyncio
+        import time
+        from app.services.llm_providers import LLMProvider
+        
+        class SlowProvider(LLMProvider):
+            name = "groq"
+            
+            def _create_client(self):
+                return None
+            
+            async def _complete(self, messages, **params):
+                await asyncio.sleep(0.2)
+                return "ok"
+        
+        service = LLMService()
+        service.provider = SlowProvider(timeout=5)
+        
+        async def run_batch():
+            start = time.perf_counter()
+            results = await asyncio.gather(*[
+                service.chat(f"question {i}", user_context={}) for i in range(8)
+            ])
+            return results, time.perf_counter() - start
+        
+        results, elapsed = asyncio.run(run_batch())
+        assert all(r["message"] == "ok" for r in results)
+        assert elapsed < 0.8
+    
+    def test_incomplete_provider_fails_at_construction(self):
+        """Test a provider missing _complete or _create_client can't be built"""
+        import pytest
+        from app.services.llm_providers import LLMProvider
+        
+        class NoClient(LLMProvider):
+            async def _complete(self, messages, **params):
+                return "ok"
+        
+        class NoComplete(LLMProvider):
+            def _create_client(self):
+                return None
+        
+        for provider in (NoClient, NoComplete):
+            with pytest.raises(TypeError):
+                provider(timeout=5)
+    
+    def test_provider_timeout_falls_back_to_mock(self):
+        """Test a provider exceeding its timeout yields the mock response"""
+        import asyncio
+        from app.services.llm_providers import LLMProvider
+        
+        class HangingProvider(LLMProvider):
+            name = "groq"
+            
+            def _create_client(self):
+                return None
+            
+            async def _complete(self, messages, **params):
+                await asyncio.sleep(10)
+        
+        service = LLMService()
+        service.provider = HangingProvider(timeout=0.05)
+        
+        response = asyncio.run(service.chat("Show me balance exercises", user_context={}))
+        assert response["message"]
+    
+    def test_chat_stream_yields_provider_deltas(self):
+        """Test chat_stream forwards each provider delta and ends with a done event"""
+        import asyncio
+        from app.services.llm_providers import LLMProvider
+        
+        class StreamingProvider(LLMProvider):
+            name = "groq"
+            
+            def _create_client(self):
+                return None
+            
+            async def _complete(self, messages, **params):
+                return "".join([part async for part in self._stream(messages, **params)])
+            
+            async def _stream(self, messages, **params):
+                for part in ["Try ", "single-leg ", "stands."]:
+                    yield part
+        
+        service = LLMService()
+        service.provider = StreamingProvider(timeout=5)
+        
+        async def collect():
+            return [e async for e in service.chat_stream("balance tips", user_context={})]
+        
+        events = asyncio.run(collect())
+        assert [e["text"] for e in events if e["event"] == "token"] == ["Try ", "single-leg ", "stands."]
+        assert events[-1]["event"] == "done"
+        assert events[-1]["message"] == "Try single-leg stands."
+    
+    def test_response_cache_skips_repeat_provider_calls(self):
+        """Test a repeated question is served from the cache unless bypassed"""
+        import asyncio
+        from app.services.llm_providers import LLMProvider
+        from app.services.response_cache import ResponseCache
+        
+        class CountingProvider(LLMProvider):
+            name = "groq"
+            calls = 0
+            
+            def _create_client(self):
+                return None
+            
+            async def _complete(self, messages, **params):
+                CountingProvider.calls += 1
+                return "cached answer"
+        
+        service = LLMService()
+        service.provider = CountingProvider(timeout=5)
+        service.response_cache = ResponseCache()
+        context = {"user_id": "u1", "name": "Sam", "performance_data": {"balance": 40}}
+        
+        async def ask(message, **kwargs):
+            return await service.chat(message, user_context=context, rag_chunk_ids=["doc_1_chunk_0"], **kwargs)
+        
+        asyncio.run(ask("How do I improve my balance?"))
+        response = asyncio.run(ask("how do i improve my balance"))
+        assert response["message"] == "cached answer"
+        assert CountingProvider.calls == 1
+        
+        asyncio.run(ask("How do I improve my balance?", use_cache=False))
+        assert CountingProvider.calls == 2
+        
+        # Different RAG chunks change the prompt, so they must miss
+        asyncio.run(service.chat("How do I improve my balance?", user_context=context, rag_chunk_ids=["doc_2_chunk_0"]))
+        assert CountingProvider.calls == 3
+
+
+class TestResponseCache:
+    """Test suite for the LLM response cache"""
+    
+    def test_near_duplicate_hits_within_scope(self):
+        """Test reworded questions hit, but only under the same context"""
+        from app.services.response_cache import ResponseCache
+        
+        cache = ResponseCache(similarity_threshold=0.8)
+        key = cache.make_key("Show me balance exercises", {"name": "Sam"})
+        cache.put(key, {"message": "answer"})
+        
+        assert cache.get(cache.make_key("show me some balance exercises!", {"name": "Sam"})) == {"message": "answer"}
+        assert cache.get(cache.make_key("show me some balance exercises!", {"name": "Alex"})) is None
+        assert cache.stats()["near_hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_one_word_changes_miss_by_default(self):
+        """Test a side swap or a negation never reuses another question's answer"""
+        from app.services.response_cache import ResponseCache
+        
+        cache = ResponseCache()
+        for cached, asked in (
+            ("What exercises should I do to strengthen my left knee after surgery",
+             "What exercises should I do to strengthen my right knee after surgery"),
+            ("Should I stretch my lower back when it hurts",
+             "Should I not stretch my lower back when it hurts"),
+        ):
+            cache.put(cache.make_key(cached), {"message": cached})
+            assert cache.get(cache.make_key(asked)) is None
+            assert cache.get(cache.make_key(cached.upper() + "?")) == {"message": cached}
+        assert cache.stats()["near_hits"] == 0
+    
+    def test_entries_expire_after_ttl(self):
+        """Test entries are dropped once their TTL has passed"""
+        from app.services.response_cache import ResponseCache
+        
+        now = [0.0]
+        cache = ResponseCache(ttl_seconds=10, clock=lambda: now[0])
+        key = cache.make_key("What does my report say?")
+        cache.put(key, {"message": "answer"})
+        
+        now[0] = 9.0
+        assert cache.get(key) is not None
+        now[0] = 11.0
+        assert cache.get(key) is None
+        assert cache.stats()["entries"] == 0
+    
+    def test_byte_budget_evicts_least_recently_used(self):
+        """Test the byte budget evicts the least recently used entry first"""
+        from app.services.response_cache import ResponseCache
+        
+        cache = ResponseCache(max_bytes=250, similarity_threshold=0)
+        keys = [cache.make_key(f"question {word}") for word in ("alpha", "beta", "gamma")]
+        cache.put(keys[0], {"message": "a" * 60})
+        cache.put(keys[1], {"message": "b" * 60})
+        cache.get(keys[0])  # alpha is now more recent than beta
+        cache.put(keys[2], {"message": "c" * 60})
+        
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[2]) is not None
+        assert cache.current_bytes <= 250
+        assert cache.stats()["evictions"] == 1
+
+
+class TestIngestionQueue:
+    """Test suite for the background document ingestion queue"""
+    
+    def _run(self, queue, jobs):
+        import asyncio
+        
+        async def run():
+            for job in jobs:
+                await queue.enqueue(job)
+            await queue.join()
+            await queue.stop()
+        
+        asyncio.run(run())
+    
+    def test_retries_transient_failures_then_records(self):
+        """Test a retryable failure is retried and only the final result is recorded"""
+        from app.services.ingestion_queue import IngestionJob, IngestionQueue
+        
+        outcomes = [
+            {"page_count": 0, "chunk_count": 0, "status": "failed", "error": "busy", "retryable": True},
+            {"page_count": 3, "chunk_count": 5, "status": "indexed"},
+        ]
+        recorded = {}
+        queue = IngestionQueue(workers=1, max_retries=2, retry_backoff=0)
+        queue._ingest = lambda job: outcomes.pop(0)
+        
+        async def record(doc_id, result):
+            recorded[doc_id] = result
+            return True
+        queue._record_result = record
+        
+        job = IngestionJob(doc_id="d1", user_id="u1", file_path="x.pdf", filename="x.pdf")
+        self._run(queue, [job])
+        
+        assert job.attempts == 2
+        assert recorded["d1"]["status"] == "indexed"
+        assert queue.job_state("d1") is None
+    
+    def test_concurrency_is_bounded_and_permanent_failures_not_retried(self):
+        """Test no more than `workers` jobs ingest at once and deterministic failures run once"""
+        import threading
+        import time
+        from app.services.ingestion_queue import IngestionJob, IngestionQueue
+        
+        lock = threading.Lock()
+        active = [0, 0]  # current, peak
+        
+        def ingest(job):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {"page_count": 0, "chunk_count": 0, "status": "failed", "error": "No content extracted"}
+        
+        recorded = {}
+        queue = IngestionQueue(workers=2, max_retries=3, retry_backoff=0)
+        queue._ingest = ingest
+        
+        async def record(doc_id, result):
+            recorded[doc_id] = result
+            return True
+        queue._record_result = record
+        
+        jobs = [IngestionJob(doc_id=f"d{i}", user_id="u1", file_path="x.txt", filename="x.txt") for i in range(6)]
+        self._run(queue, jobs)
+        
+        assert active[1] == 2
+        assert all(job.attempts == 1 for job in jobs)
+        assert {r["status"] for r in recorded.values()} == {"failed"}
+
+    
+    def test_batch_records_finished_files_and_retries_the_rest(self):
+        """Test a batch is one queue item, failed files are retried together and results bulk-recorded"""
+        import asyncio
+        from app.services.ingestion_queue import IngestionJob, IngestionQueue
+        
+        calls = []
+        
+        def ingest_batch(jobs):
+            calls.append([job.doc_id for job in jobs])
+            return {
+                job.doc_id: (
+                    {"page_count": 0, "chunk_count": 0, "status": "failed", "error": "busy", "retryable": True}
+                    if job.doc_id == "d1" and len(calls) == 1
+                    else {"page_count": 1, "chunk_count": 2, "status": "indexed"}
+                )
+                for job in jobs
+            }
+        
+        recorded = []
+        queue = IngestionQueue(workers=2, max_retries=2, retry_backoff=0)
+        queue._ingest_batch = ingest_batch
+        
+        async def record(results):
+            recorded.append(dict(results))
+            return set()
+        queue._record_results = record
+        
+        jobs = [IngestionJob(doc_id=f"d{i}", user_id="u1", file_path="x.txt", filename="x.txt") for i in range(3)]
+        
+        async def run():
+            await queue.enqueue_batch(jobs)
+            await queue.join()
+            await queue.stop()
+        
+        asyncio.run(run())
+        
+        assert calls == [["d0", "d1", "d2"], ["d1"]]
+        assert [sorted(r) for r in recorded] == [["d0", "d2"], ["d1"]]
+        assert recorded[1]["d1"]["status"] == "indexed"
+        assert [job.attempts for job in jobs] == [1, 2, 1]
+
+
+class TestPdfParser:
+    """Test suite for serial and process-pool PDF parsing"""
+    
+    def test_page_ranges_cover_every_page_in_order(self):
+        """Test shards are contiguous, ordered and cover each page once"""
+        from app.utils.pdf_parser import page_ranges
+        
+        for pages, workers in [(1, 4), (10, 4), (101, 3), (500, 8)]:
+            ranges = page_ranges(pages, workers)
+            assert [i for start, stop in ranges for i in range(start, stop)] == list(range(pages))
+            assert len(ranges) <= workers * 2
+        assert page_ranges(0, 4) == []
+    
+    def test_parallel_parse_matches_serial(self, tmp_path, monkeypatch):
+        """Test the process pool returns the same chunks and page numbers as the serial loop"""
+        pytest.importorskip("PyPDF2")
+        from app.core.config import settings
+        from app.utils.pdf_parser import parse_pdf, shutdown_pdf_pool
+        from benchmarks.bench_pdf_parse import write_text_pdf
+        
+        path = str(tmp_path / "assessment.pdf")
+        write_text_pdf(path, pages=12, words_per_page=20)
+        monkeypatch.setattr(settings, "PDF_PARSE_WORKERS", 3)
+        try:
+            parallel = parse_pdf(path, parallel=True)
+        finally:
+            shutdown_pdf_pool()
+        
+        assert parallel == parse_pdf(path, parallel=False)
+        assert [c["page"] for c in parallel] == list(range(1, 13))
+        assert parallel[4]["text"].startswith("Page 5")
+
+
+class TestDocumentService:
+    """Test suite for document parsing and indexing"""
+    
+    def test_edited_document_embeds_only_changed_chunks(self, tmp_path, monkeypatch):
+        """Test unchanged chunks reuse the stored embedding and only edited text is embedded"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        service = DocumentService()
+        embedded = []
+        embedder_for = service._embedder
+        service._embedder = lambda collection: lambda texts: embedded.extend(texts) or embedder_for(collection)(texts)
+        
+        rows = [f"{i},balance drill,{30 + i % 7}" for i in range(60)]
+        v1, v2 = tmp_path / "v1.csv", tmp_path / "v2.csv"
+        v1.write_text("session,exercise,seconds\n" + "\n".join(rows))
+        rows[45] = "45,lumbar stretch,40"
+        v2.write_text("session,exercise,seconds\n" + "\n".join(rows))
+        
+        assert service.ingest_file(str(v1), "report.csv", "u1", "d1")["chunk_count"] == 3
+        assert len(embedded) == 3
+        embedded.clear()
+        
+        assert service.ingest_file(str(v2), "report.csv", "u1", "d2")["status"] == "indexed"
+        assert len(embedded) == 1
+        assert "exercise: lumbar stretch" in embedded[0]
+        
+        # Another user's identical text is never reused
+        embedded.clear()
+        service.ingest_file(str(v1), "report.csv", "u2", "d3")
+        assert len(embedded) == 3
+        hits = service.search_user_documents("balance drill", "u1", n_results=1)
+        assert hits[0]["metadata"]["user_id"] == "u1"
+    
+    def test_csv_streams_in_bounded_batches(self, tmp_path, monkeypatch):
+        """Test CSV rows are packed 20 per chunk and upserted in batches with progress reports"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        monkeypatch.setattr(settings, "DOCUMENT_INDEX_BATCH_SIZE", 7)
+        service = DocumentService()
+        upserts = []
+        collection = service.collection_for("u1")
+        upsert = collection.upsert
+        collection.upsert = lambda **kw: upserts.append(len(kw["ids"])) or upsert(**kw)
+        
+        export = tmp_path / "telemetry.csv"
+        export.write_text("session,reaction_ms\n" + "".join(f"{i},{200 + i % 50}\n" for i in range(1005)))
+        progress = []
+        
+        result = service.ingest_file(str(export), "telemetry.csv", "u1", "d1", on_progress=progress.append)
+        
+        assert result == {"page_count": 51, "chunk_count": 51, "status": "indexed"}
+        assert max(upserts) == 7 and sum(upserts) == 51
+        assert progress[-1] == 51 and progress == sorted(progress)
+        last = collection.get(ids=["doc_d1_chunk_50"])
+        assert last["metadatas"][0]["page"] == 51
+        assert last["documents"][0].splitlines()[0] == "session: 1000, reaction_ms: 200"
+
+    
+    def test_batch_ingest_pools_upserts_and_reports_per_file(self, tmp_path, monkeypatch):
+        """Test a batch shares upserts across files and one bad file does not fail the rest"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        service = DocumentService()
+        upserts = []
+        collection = service.collection_for("u1")
+        upsert = collection.upsert
+        collection.upsert = lambda **kw: upserts.append(len(kw["ids"])) or upsert(**kw)
+        
+        files = []
+        for i in range(5):
+            path = tmp_path / f"r{i}.csv"
+            path.write_text("session,reaction_ms\n" + "".join(f"{j},{200 + i}\n" for j in range(30)))
+            files.append({"doc_id": f"d{i}", "file_path": str(path), "filename": f"r{i}.csv"})
+        (tmp_path / "empty.txt").write_text("  ")
+        files.append({"doc_id": "empty", "file_path": str(tmp_path / "empty.txt"), "filename": "empty.txt"})
+        files.append({"doc_id": "gone", "file_path": str(tmp_path / "gone.txt"), "filename": "gone.txt"})
+        progress = {}
+        
+        results = service.ingest_files(files, "u1", max_workers=3, on_progress=progress.__setitem__)
+        
+        assert all(results[f"d{i}"] == {"page_count": 2, "chunk_count": 2, "status": "indexed"} for i in range(5))
+        assert upserts == [10]
+        assert progress == {f"d{i}": 2 for i in range(5)}
+        assert results["empty"]["error"] == "No content extracted" and "retryable" not in results["empty"]
+        assert results["gone"]["status"] == "failed" and results["gone"]["retryable"]
+        assert service.get_document_chunks("d3", "u1") == 2
+
+    
+    def test_deletes_and_counts_by_derived_chunk_ids(self, tmp_path, monkeypatch):
+        """Test known chunk counts delete and count by id without a metadata scan"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        service = DocumentService()
+        for doc_id in ("d1", "d2", "d3"):
+            path = tmp_path / f"{doc_id}.csv"
+            path.write_text("session,reaction_ms\n" + "".join(f"{i},{200 + i}\n" for i in range(45)))
+            assert service.ingest_file(str(path), "r.csv", "u1", doc_id)["chunk_count"] == 3
+        scans = []
+        collection = service.collection_for("u1")
+        get = collection.get
+        
+        def tracking_get(**kw):
+            if "where" in kw:
+                scans.append(kw["where"])
+            return get(**kw)
+        collection.get = tracking_get
+        
+        assert service.get_document_chunks("d1", "u1") == 3
+        assert service.delete_document("d1", "u1")
+        assert service.get_document_chunks("d1", "u1", chunk_count=3) == 0
+        assert scans == []
+        
+        # A fresh process has no registry: row counts are used, unknown docs fall back to one scan
+        service._chunk_counts.clear()
+        assert service.delete_documents("u1", {"d2": 3, "d3": None})
+        assert scans == [{"doc_id": {"$in": ["d3"]}}]
+        assert collection.count() == 0
+
+    
+    def test_users_are_routed_to_partitions(self, tmp_path, monkeypatch):
+        """Test users land in hashed partitions and searches never see other users' chunks"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService, partition_name
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        monkeypatch.setattr(settings, "DOCUMENT_COLLECTION_PARTITIONS", 4)
+        service = DocumentService()
+        users = [f"user-{i}" for i in range(12)]
+        for user_id in users:
+            path = tmp_path / f"{user_id}.txt"
+            path.write_text(f"Wrist mobility plan for {user_id}.")
+            assert service.ingest_file(str(path), "plan.txt", user_id, f"doc-{user_id}")["status"] == "indexed"
+        
+        names = {partition_name(u, 4) for u in users}
+        assert 1 < len(names) <= 4
+        assert service.collection_for("user-3").name == partition_name("user-3", 4)
+        assert sum(service._partition(name).count() for name in names) == 12
+        hits = service.search_user_documents("wrist mobility plan", "user-3", n_results=5)
+        assert [h["metadata"]["user_id"] for h in hits] == ["user-3"]
+    
+    def test_migrates_shared_collection_into_partitions(self, tmp_path, monkeypatch):
+        """Test chunks in the old shared collection stay searchable, then move and the source is dropped"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService
+        from app.services.embeddings import get_or_create_hash_collection
+        from app.services.document_service import chunk_hash
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        monkeypatch.setattr(settings, "DOCUMENT_COLLECTION_PARTITIONS", 4)
+        service = DocumentService()
+        shared = get_or_create_hash_collection(service.client, "user_documents")
+        texts = [f"Legacy note {i} about lumbar posture." for i in range(30)]
+        shared.add(
+            ids=[f"doc_old{i % 6}_chunk_{i // 6}" for i in range(30)],
+            documents=texts,
+            metadatas=[
+                {"doc_id": f"old{i % 6}", "user_id": f"u{i % 3}", "filename": "n.txt", "page": 1,
+                 "chunk_index": i // 6, "chunk_hash": chunk_hash(texts[i])}
+                for i in range(30)
+            ],
+        )
+        
+        service = DocumentService()
+        assert service.search_user_documents("lumbar posture", "u1", n_results=3)
+        assert service.get_document_chunks("old1", "u1", chunk_count=5) == 5
+        
+        assert service.migrate_legacy_collections(batch_size=7) == {"user_documents": 30}
+        
+        assert "user_documents" not in [getattr(c, "name", c) for c in service.client.list_collections()]
+        assert service.get_document_chunks("old1", "u1", chunk_count=5) == 5
+        hits = service.search_user_documents("lumbar posture", "u1", n_results=3)
+        assert len(hits) == 3 and {h["metadata"]["user_id"] for h in hits} == {"u1"}
+        assert DocumentService()._legacy_collections == []
+    
+    def test_live_service_survives_migration_by_another_process(self, tmp_path, monkeypatch):
+        """Test a running service keeps serving after another process migrates and drops its legacy collection"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService, chunk_hash
+        from app.services.embeddings import get_or_create_hash_collection
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        monkeypatch.setattr(settings, "DOCUMENT_COLLECTION_PARTITIONS", 4)
+        shared = get_or_create_hash_collection(DocumentService().client, "user_documents")
+        texts = [f"Legacy note {i} about lumbar posture." for i in range(12)]
+        shared.add(
+            ids=[f"doc_old{i % 4}_chunk_{i // 4}" for i in range(12)],
+            documents=texts,
+            metadatas=[
+                {"doc_id": f"old{i % 4}", "user_id": f"u{i % 2}", "filename": "n.txt", "page": 1,
+                 "chunk_index": i // 4, "chunk_hash": chunk_hash(texts[i])}
+                for i in range(12)
+            ],
+        )
+        
+        live = DocumentService()
+        assert len(live._legacy_collections) == 1
+        assert len(live.search_user_documents("lumbar posture", "u0", n_results=3)) == 3
+        
+        assert DocumentService().migrate_legacy_collections() == {"user_documents": 12}
+        
+        hits = live.search_user_documents("lumbar posture", "u1", n_results=3)
+        assert len(hits) == 3 and {h["metadata"]["user_id"] for h in hits} == {"u1"}
+        assert live._legacy_collections == []
+        assert live.get_document_chunks("old0", "u0") == 3
+        assert live.delete_documents("u0", {"old0": None})
+        assert live.get_document_chunks("old0", "u0") == 0
+        assert live.migrate_legacy_collections() == {}
+
+    
+    def test_hybrid_search_ranks_rare_keywords_and_tracks_deletes(self, tmp_path, monkeypatch):
+        """Test BM25 fusion surfaces the chunk with the rare query term and forgets deleted chunks"""
+        from app.core.config import settings
+        from app.services.document_service import DocumentService
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        service = DocumentService()
+        filler = "the player did the session and the drill in the session with the team"
+        chunks = [{"text": f"{filler} {i}.", "page": i + 1} for i in range(30)]
+        chunks.append({"text": "Tendinopathy flagged in the left wrist.", "page": 31})
+        service._index_chunks(chunks, doc_id="d1", user_id="u1", filename="notes.txt")
+        
+        query = "what did the session say about tendinopathy"
+        monkeypatch.setattr(settings, "HYBRID_SEARCH_ENABLED", False)
+        vector_hits = service.search_user_documents(query, "u1", n_results=3)
+        monkeypatch.setattr(settings, "HYBRID_SEARCH_ENABLED", True)
+        hits = service.search_user_documents(query, "u1", n_results=3)
+        
+        assert "doc_d1_chunk_30" not in [h["chunk_id"] for h in vector_hits]
+        assert "doc_d1_chunk_30" in [h["chunk_id"] for h in hits]
+        assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+        service.delete_document("d1", "u1", chunk_count=31)
+        assert service.keyword_index.search("u1", "tendinopathy", 3) == []
+        assert service.search_user_documents("tendinopathy", "u1") == []
+
+
+class TestBM25Index:
+    """Test suite for the in-process BM25 keyword index"""
+    
+    def test_rare_terms_outrank_common_ones(self):
+        """Test IDF weighting and that replacing an id re-indexes its text"""
+        from app.services.bm25 import BM25Index
+        
+        index = BM25Index()
+        index.add([f"c{i}" for i in range(10)], ["the session was good"] * 9 + ["the hamstring was tight"])
+        
+        assert index.search("the hamstring session", 1)[0][0] == "c9"
+        index.add(["c9"], ["nothing relevant here"])
+        assert index.search("hamstring", 5) == []
+        assert len(index) == 10
+    
+    def test_removal_compacts_postings(self):
+        """Test removed entries never match and the arrays shrink after compaction"""
+        from app.services.bm25 import BM25Index, reciprocal_rank_fusion
+        
+        index = BM25Index()
+        index.add([f"c{i}" for i in range(200)], [f"drill {i} balance" for i in range(200)])
+        index.remove([f"c{i}" for i in range(150)])
+        
+        assert len(index._ids) == 50
+        assert len(index._postings["balance"][0]) == 50
+        assert "2" not in index._postings
+        assert {entry_id for entry_id, _ in index.search("balance", 100)} == {f"c{i}" for i in range(150, 200)}
+        fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]])
+        assert [entry_id for entry_id, _ in fused] == ["b", "a", "c"]
+    
+    def test_failed_user_load_is_not_cached(self):
+        """Test a loader error leaves no empty index behind, so the next search loads again"""
+        import pytest
+        from app.services.bm25 import UserKeywordIndex
+        
+        calls = []
+        
+        def loader(user_id):
+            calls.append(user_id)
+            if len(calls) == 1:
+                raise RuntimeError("chroma unavailable")
+            return ["c1", "c2"], ["hamstring strain notes", "wrist session"]
+        
+        index = UserKeywordIndex(loader)
+        with pytest.raises(RuntimeError):
+            index.search("u1", "hamstring", 5)
+        assert index.search("u1", "hamstring", 5)[0][0] == "c1"
+        assert calls == ["u1", "u1"]
+    
+    def test_concurrent_first_searches_share_one_load(self):
+        """Test concurrent first searches wait for a single load and see chunks added meanwhile"""
+        import threading
+        from app.services.bm25 import UserKeywordIndex
+        
+        started, release, calls = threading.Event(), threading.Event(), []
+        
+        def loader(user_id):
+            calls.append(user_id)
+            started.set()
+            release.wait(5)
+            return ["c1"], ["hamstring strain notes"]
+        
+        index = UserKeywordIndex(loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(index.search("u1", "tendinopathy hamstring", 5)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        index.add("u1", ["c2"], ["tendinopathy in the left wrist"])
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        assert calls == ["u1"]
+        assert len(results) == 3 and all({i for i, _ in r} == {"c1", "c2"} for r in results)
+
+
+class TestMatrixIndex:
+    """Test suite for the in-memory knowledge base search"""
+    
+    def test_matches_chroma_ranking_within_doc_type(self):
+        """Test results are nearest first, filtered by type and scored like Chroma's L2"""
+        from app.services.embeddings import HashEmbeddingFunction
+        from app.services.matrix_index import MatrixIndex
+        
+        index = MatrixIndex.from_documents({
+            "exercise": [{"id": "e1", "text": "hamstring stretch"}, {"id": "e2", "text": "wrist curls grip"}],
+            "product": [{"id": "p1", "text": "hamstring foam roller"}],
+        })
+        
+        assert [i for i, _ in index.search("hamstring stretch", n_results=3)] == ["e1", "p1", "e2"]
+        assert [i for i, _ in index.search("hamstring", doc_type="exercise", n_results=5)] == ["e1", "e2"]
+        assert index.search("hamstring", doc_type="care_program") == []
+        embed = HashEmbeddingFunction()
+        query, doc = embed.embed_matrix(["grip", "wrist curls grip"])
+        assert abs(index.search("grip", n_results=1)[0][1] - float(((query - doc) ** 2).sum())) < 1e-5
+    
+    def test_knowledge_base_maps_prebuilt_artifact_until_catalogue_changes(self, tmp_path, monkeypatch):
+        """Test a matching artifact is memory-mapped and searches like a fresh build; a stale one is ignored"""
+        import numpy as np
+        from app.core.config import settings
+        from app.services import knowledge_base as kb_module
+        from app.services.kb_index_build import build_index_artifact
+        
+        path = str(tmp_path / "kb_index")
+        monkeypatch.setattr(settings, "KB_INDEX_PATH", path)
+        fresh = kb_module.KnowledgeBaseService().matrix_index
+        assert not isinstance(fresh.matrix, np.memmap)
+        build_index_artifact(path)
+        
+        mapped = kb_module.KnowledgeBaseService().matrix_index
+        assert isinstance(mapped.matrix, np.memmap)
+        assert mapped.offsets == fresh.offsets
+        for query in ("lower back pain", "wrist strain from gaming"):
+            assert mapped.search(query, doc_type="product") == fresh.search(query, doc_type="product")
+        
+        load_exercises = kb_module.KnowledgeBaseService._load_exercises
+        monkeypatch.setattr(kb_module.KnowledgeBaseService, "_load_exercises", lambda self: load_exercises(self)[1:])
+        stale = kb_module.KnowledgeBaseService().matrix_index
+        assert not isinstance(stale.matrix, np.memmap)
+        assert len(stale) == len(fresh) - 1
+    
+    def test_broken_artifact_loads_as_none_and_is_rebuilt(self, tmp_path, monkeypatch, capsys):
+        """Test a partial or corrupt artifact falls back to embedding, and the build CLI replaces it quietly"""
+        import glob
+        import os
+        import numpy as np
+        from app.core.config import settings
+        from app.services.kb_index_build import build_index_artifact
+        from app.services.knowledge_base import KnowledgeBaseService
+        from app.services.matrix_index import MatrixIndex
+        
+        path = str(tmp_path / "kb_index")
+        monkeypatch.setattr(settings, "KB_INDEX_PATH", path)
+        build_index_artifact(path)
+        with open(f"{path}.json") as f:
+            meta = f.read()
+        
+        for npy in glob.glob(f"{path}.*.npy"):
+            os.remove(npy)  # json without its matrix
+        assert MatrixIndex.load(path) is None
+        kb = KnowledgeBaseService()
+        assert kb.matrix_index is not None and not isinstance(kb.matrix_index.matrix, np.memmap)
+        
+        with open(f"{path}.json", "w") as f:
+            f.write(meta[: len(meta) // 2])  # truncated json
+        assert MatrixIndex.load(path) is None
+        assert KnowledgeBaseService().matrix_index is not None
+        
+        capsys.readouterr()
+        build_index_artifact(path)
+        assert "⚠️" not in capsys.readouterr().out
+        build_index_artifact(path)
+        assert len(glob.glob(f"{path}.*.npy")) == 1
+        assert isinstance(KnowledgeBaseService().matrix_index.matrix, np.memmap)
+    
+    def test_knowledge_base_searches_without_chroma(self, monkeypatch):
+        """Test knowledge base searches are served from the matrix, not the vector store"""
+        from app.services.knowledge_base import get_knowledge_base
+        
+        knowledge_base = get_knowledge_base()
+        assert knowledge_base.matrix_index is not None
+        assert len(knowledge_base.matrix_index) == (
+            len(knowledge_base.exercises) + len(knowledge_base.care_programs) + len(knowledge_base.products)
+        )
+        monkeypatch.setattr(knowledge_base, "vector_store", None)
+        
+        ids = knowledge_base.semantic_search("lower back pain relief", "care_program", 2)
+        assert len(ids) == 2 and all(i.startswith("cp_") for i in ids)
+        exercises = knowledge_base.search_exercises(query="neck stretch", limit=3)
+        assert len(exercises) == 3
+
+
+class TestCatalogueIndex:
+    """Test suite for the knowledge base id and facet indexes"""
+    
+    def test_substring_filter_matches_linear_scan(self):
+        """Test containing() finds every value holding the needle, across tokens and case"""
+        from app.services.catalogue_index import CatalogueIndex
+        
+        records = [
+            {"id": "a", "tags": ["lower_back", "neck"], "text": "Relieves Lower back pain"},
+            {"id": "b", "tags": ["wrist"], "text": "wrist and forearm support"},
+            {"id": "c", "tags": [], "text": "back pain at the desk"},
+        ]
+        index = CatalogueIndex(records, "id", facets=("tags",), text_fields=("tags", "text"))
+        
+        assert index.get("b") is records[1] and index.get("z") is None
+        assert index.matching("tags", ["neck", "wrist"]) == {0, 1}
+        for needle in ("back", "er back p", "Lower", "ack pain", "  ", "forearm", "nothing"):
+            for case_sensitive in (True, False):
+                expected = {
+                    row for row, r in enumerate(records)
+                    if any((needle if case_sensitive else needle.lower()) in (v if case_sensitive else v.lower())
+                           for v in r["tags"] + [r["text"]])
+                }
+                assert index.containing(("tags", "text"), needle, case_sensitive) == expected, needle
+        assert [r["id"] for r in index.select({2, 0}, None, {0, 1, 2}, limit=5)] == ["a", "c"]
+    
+    def test_keyword_fallback_matches_legacy_filters(self, monkeypatch):
+        """Test the indexed keyword fallback returns what the linear filters returned, in order"""
+        from app.schemas.recommendation import Difficulty, Intensity, ProductType
+        from app.services.knowledge_base import KnowledgeBaseService
+        
+        kb = KnowledgeBaseService()
+        monkeypatch.setattr(kb, "semantic_search", lambda *args, **kwargs: [])
+        
+        for target in (None, "balance", "rom_", "strength_upper_body", "missing"):
+            for difficulty in (None, Difficulty.EASY):
+                expected = [
+                    e["exercise_id"] for e in kb.exercises
+                    if (not target or target in e["category"] or any(target in p for p in e["target_parameters"]))
+                    and (not difficulty or e["difficulty"] == difficulty.value)
+                ][:10]
+                assert [e.exercise_id for e in kb.search_exercises(target, difficulty)] == expected
+        for condition in (None, "BACK", "wrist", "pain", "ergonomic"):
+            for product_type in (None, ProductType.ERGONOMIC):
+                expected = [
+                    p["product_id"] for p in kb.products
+                    if (not condition or any(condition.lower() in uc.lower() for uc in p["use_cases"])
+                        or condition.lower() in p["description"].lower() or condition.lower() in p["category"].lower())
+                    and (not product_type or p["type"] == product_type.value)
+                ][:5]
+                assert [p.product_id for p in kb.search_products(condition, product_type)] == expected
+        for areas in (None, ["balance"], ["flexibility", "posture"]):
+            for intensity in (None, Intensity.BEGINNER):
+                expected = [
+                    p["program_id"] for p in kb.care_programs
+                    if (not areas or any(a in p["focus_areas"] for a in areas))
+                    and (not intensity or p["intensity"] == intensity.value)
+                ][:5]
+                assert [p.program_id for p in kb.search_care_programs(areas, intensity)] == expected
+
+
+class TestKnowledgeBaseSync:
+    """Test suite for fingerprint-based knowledge base reindexing"""
+    
+    def test_startup_reindexes_only_changed_documents(self, tmp_path, monkeypatch):
+        """Test edited entries are re-embedded, removed ones deleted and the rest untouched"""
+        from app.core.config import settings
+        from app.services.knowledge_base import KnowledgeBaseService
+        from app.services.registry import registry
+        
+        monkeypatch.setattr(settings, "CHROMA_PERSIST_DIR", str(tmp_path / "chroma"))
+        monkeypatch.setattr(registry, "_instances", {})
+        kb = KnowledgeBaseService()
+        total = kb.index_vector_store().get_count()
+        assert kb._index_all_documents() == {"indexed": 0, "deleted": 0, "unchanged": total}
+        
+        kb.exercises[0]["instructions"] = ["Edited instructions for ankle mobility."]
+        removed = kb.products.pop()
+        assert kb._index_all_documents() == {"indexed": 1, "deleted": 1, "unchanged": total - 2}
+        
+        stored = kb.vector_store.collection.get(ids=[f"exercise_{kb.exercises[0]['exercise_id']}"])
+        assert "ankle mobility" in stored["documents"][0]
+        assert f"product_{removed['product_id']}" not in kb.vector_store.get_content_hashes()
+
+
+class TestServiceRegistry:
+    """Test suite for lazily built, process-wide services"""
+    
+    def test_concurrent_first_use_builds_once(self):
+        """Test racing callers share one instance and nested gets don't deadlock"""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from app.services.registry import ServiceRegistry
+        
+        registry = ServiceRegistry()
+        built = []
+        
+        def build_outer():
+            built.append("outer")
+            time.sleep(0.05)
+            return {"inner": registry.get("inner", build_inner)}
+        
+        def build_inner():
+            built.append("inner")
+            return object()
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            instances = list(pool.map(lambda _: registry.get("outer", build_outer), range(8)))
+        
+        assert built == ["outer", "inner"]
+        assert all(instance is instances[0] for instance in instances)
+        assert registry.peek("inner") is instances[0]["inner"]
+        registry.reset("outer")
+        assert registry.peek("outer") is None and registry.get("outer", build_outer) is not instances[0]
+    
+    def test_modules_share_one_knowledge_base(self):
+        """Test the LLM service, recommendation engine and accessor use the same instance"""
+        from app.services.knowledge_base import get_knowledge_base
+        from app.services.llm_service import LLMService
+        from app.services.recommendation_engine import get_recommendation_engine
+        
+        kb = get_knowledge_base()
+        assert LLMService().knowledge_base is kb
+        assert get_recommendation_engine().kb is kb
+    
+    def test_app_import_defers_heavy_dependencies(self):
+        """Test importing the app and building the LLM service load no heavy optional SDKs"""
+        import subprocess
+        import sys
+        from app.utils.startup_profile import HEAVY_DEPENDENCIES
+        
+        code = (
+            "import sys, app.main\n"
+            "from app.services.llm_providers import ClaudeProvider, GroqProvider, PoeProvider\n"
+            "for cls in (ClaudeProvider, GroqProvider, PoeProvider):\n"
+            "    try:\n"
+            "        cls('key')\n"
+            "    except ImportError:\n"
+            "        pass\n"
+            f"print([m for m in {HEAVY_DEPENDENCIES!r} if m in sys.modules])"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+class TestWarmup:
+    """Test suite for the background startup warmup"""
+    
+    def test_ready_waits_for_steps_and_ignores_optional_failures(self):
+        """Test steps run concurrently, required failures block readiness and optional ones don't"""
+        import asyncio
+        from app.services.warmup import Warmup
+        
+        async def scenario():
+            release = asyncio.Event()
+            
+            async def slow():
+                await release.wait()
+            
+            async def broken():
+                raise RuntimeError("unavailable")
+            
+            warmup = Warmup()
+            warmup.add("slow", slow)
+            warmup.add("optional", broken, required=False)
+            warmup.start()
+            await asyncio.sleep(0.01)
+            pending = warmup.report()
+            release.set()
+            await warmup.wait()
+            
+            return pending, warmup.report()
+        
+        pending, done = asyncio.run(scenario())
+        
+        assert pending["ready"] is False
+        assert pending["components"]["slow"]["status"] == "running"
+        assert pending["components"]["optional"]["status"] == "failed"
+        assert done["ready"] is True
+        assert done["components"]["optional"]["error"] == "unavailable"
+    
+    def test_required_step_is_retried_until_it_succeeds(self):
+        """Test a transient failure of a required step delays readiness (and its dependents) instead of blocking it forever"""
+        import asyncio
+        from app.services.warmup import Warmup
+        
+        async def scenario():
+            attempts = []
+            
+            async def flaky_database():
+                attempts.append(1)
+                if len(attempts) < 3:
+                    raise RuntimeError("connection refused")
+            
+            async def recovery():
+                seen.append(len(attempts))
+            
+            seen = []
+            warmup = Warmup(retry_backoff=0.01)
+            warmup.add("database", flaky_database)
+            warmup.add("recovery", recovery, required=False, after=("database",))
+            warmup.start()
+            await asyncio.sleep(0.005)
+            failing = warmup.report()
+            await asyncio.wait_for(warmup.wait(), timeout=5)
+            return failing, warmup.report(), seen
+        
+        failing, done, seen = asyncio.run(scenario())
+        
+        assert failing["ready"] is False
+        assert failing["components"]["database"]["error"] == "connection refused"
+        assert done["ready"] is True
+        assert done["components"]["database"]["attempts"] == 3
+        assert "error" not in done["components"]["database"]
+        assert failing["components"]["recovery"]["status"] == "pending"
+        assert seen == [3]
+
+
+class TestChunking:
+    """Test suite for the token-budgeted sentence chunker"""
+    
+    def test_chunks_respect_budget_and_sentence_boundaries(self):
+        """Test chunks stay within the token budget, end on sentences and overlap"""
+        from app.services.chunking import chunk_text, split_sentences
+        
+        sentences = [f"Drill {i} holds a single-leg stand for {20 + i} seconds." for i in range(40)]
+        chunks = list(chunk_text(" ".join(sentences), max_tokens=40, overlap_tokens=10))
+        
+        assert all(len(c.split()) <= 40 for c in chunks)
+        assert all(c.endswith("seconds.") for c in chunks)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert split_sentences(previous)[-1] == split_sentences(current)[0]
+        covered = {s for c in chunks for s in split_sentences(c)}
+        assert covered == set(sentences)
+    
+    def test_long_sentence_is_windowed(self):
+        """Test a sentence over the budget is cut into overlapping windows covering every token"""
+        from app.services.chunking import chunk_text
+        
+        words = [f"w{i}" for i in range(95)]
+        chunks = [c.split() for c in chunk_text("Intro line.\n" + " ".join(words), max_tokens=30, overlap_tokens=5)]
+        
+        assert chunks[0] == ["Intro", "line."]
+        assert all(len(c) <= 30 for c in chunks)
+        assert chunks[1][-5:] == chunks[2][:5]
+        assert chunks[-1][-1] == "w94"
+        assert {w for c in chunks[1:] for w in c} == set(words)
+    
+    def test_sentence_after_long_sentence_stays_in_budget(self):
+        """Test the overlap carried out of a windowed sentence is dropped when the next sentence needs the room"""
+        from app.services.chunking import chunk_text
+        
+        long_sentence = " ".join(f"a{i}" for i in range(100)) + "."
+        next_sentence = " ".join(f"b{i}" for i in range(45)) + "."
+        chunks = [c.split() for c in chunk_text(f"{long_sentence} {next_sentence}", max_tokens=48, overlap_tokens=8)]
+        
+        assert all(len(c) <= 48 for c in chunks)
+        assert chunks[-1] == next_sentence.split()
+    
+    def test_default_budget_overlaps_report_sentences(self):
+        """Test neighbouring chunks share tokens with the default budget and report-length sentences"""
+        from app.core.config import settings
+        from app.services.chunking import chunk_text
+        
+        sentences = [
+            f"Session {i} recorded a lumbar flexion range of {40 + i} degrees with mild discomfort at end range."
+            for i in range(12)
+        ]
+        chunks = [c.split() for c in chunk_text(" ".join(sentences))]
+        
+        assert len(chunks) > 1
+        assert all(len(c) <= settings.CHUNK_MAX_TOKENS for c in chunks)
+        for previous, current in zip(chunks, chunks[1:]):
+            assert current[:settings.CHUNK_OVERLAP_TOKENS] == previous[-settings.CHUNK_OVERLAP_TOKENS:]
+
+
+class TestUploadStorage:
+    """Test suite for streaming upload storage"""
+    
+    def test_save_upload_streams_and_hashes(self, tmp_path):
+        """Test the file is written whole with its SHA-256 and no temp file remains"""
+        import asyncio
+        import hashlib
+        import io
+        from fastapi import UploadFile
+        from app.utils.uploads import save_upload
+        
+        payload = b"balance,reaction_time\n" * 1000
+        upload = UploadFile(io.BytesIO(payload), filename="export.csv")
+        
+        stored = asyncio.run(save_upload(upload, tmp_path / "export.csv", max_bytes=len(payload), chunk_size=1000))
+        
+        assert stored.size == len(payload)
+        assert stored.sha256 == hashlib.sha256(payload).hexdigest()
+        assert (tmp_path / "export.csv").read_bytes() == payload
+        assert [p.name for p in tmp_path.iterdir()] == ["export.csv"]
+    
+    def test_save_upload_aborts_over_limit(self, tmp_path):
+        """Test an oversized stream stops at the limit and cleans up its temp file"""
+        import asyncio
+        import io
+        from fastapi import UploadFile
+        from app.utils.uploads import UploadTooLarge, save_upload
+        
+        reads = []
+        
+        class CountingStream(io.BytesIO):
+            def read(self, size=-1):
+                reads.append(size)
+                return super().read(size)
+        
+        upload = UploadFile(CountingStream(b"x" * 10_000), filename="big.txt")
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(save_upload(upload, tmp_path / "big.txt", max_bytes=2500, chunk_size=1000))
+        
+        assert len(reads) == 3
+        assert list(tmp_path.iterdir()) == []
 
 
 class TestContextManager:
@@ -162,3 +1245,117 @@ class TestPromptTemplates:
         # Unknown category should return general questions
         general = get_follow_up_questions("unknown_category")
         assert len(general) > 0
+
+
+class TestHashEmbeddings:
+    """Test suite for the shared hash embedding engine"""
+    
+    def test_legacy_version_is_bit_compatible(self):
+        """Test md5-v1 reproduces the original per-word md5 embedding exactly"""
+        import hashlib
+        import math
+        from app.services.embeddings import HashEmbeddingFunction, LEGACY_VERSION
+        
+        texts = ["Single-Leg Stand for balance", "", "balance balance Reaction time 340ms"]
+        expected = []
+        for text in texts:
+            vec = [0.0] * 512
+            for word in text.lower().split():
+                vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % 512] += 1.0
+            norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+            expected.append([x / norm for x in vec])
+        
+        matrix = HashEmbeddingFunction(version=LEGACY_VERSION).embed_matrix(texts)
+        assert matrix.tolist() == expected
+    
+    def test_batch_matches_single_texts(self):
+        """Test embedding a batch gives the same rows as embedding one at a time"""
+        import numpy as np
+        from app.services.embeddings import HashEmbeddingFunction
+        
+        fn = HashEmbeddingFunction()
+        texts = ["wall push-ups", "chair squats for strength", "cat-cow stretch daily"]
+        batch = fn.embed_matrix(texts)
+        for i, text in enumerate(texts):
+            assert np.array_equal(batch[i], fn.embed_matrix([text])[0])
+        assert np.allclose(np.linalg.norm(batch, axis=1), 1.0)
+    
+    def test_chroma_entry_points(self):
+        """Test the ChromaDB embedding protocol methods"""
+        from app.services.embeddings import HashEmbeddingFunction
+        
+        fn = HashEmbeddingFunction()
+        assert fn.name() == "hash_embedding_fn"
+        assert len(fn.embed_query(["balance"])[0]) == 512
+        assert len(fn.embed_documents(["a", "b"])) == 2
+
+
+class TestQueryIndexes:
+    """Test the planner uses the composite indexes on the hot query paths"""
+    
+    @staticmethod
+    def _hot_queries():
+        from datetime import datetime
+        from sqlalchemy import select
+        from app.models import Conversation, Message, Progress, Document, Report
+        
+        since = datetime(2026, 1, 1)
+        return [
+            ("ix_messages_conversation_id_sequence",
+             select(Message).where(Message.conversation_id == "c1").order_by(Message.sequence.desc()).limit(10)),
+            ("ix_conversations_user_id_updated_at",
+             select(Conversation).where(Conversation.user_id == "u1")
+             .order_by(Conversation.updated_at.desc(), Conversation.id.desc()).limit(10)),
+            ("ix_progress_user_id_metric_name_recorded_at",
+             select(Progress).where(Progress.user_id == "u1", Progress.metric_name == "balance",
+                                    Progress.recorded_at >= since).order_by(Progress.recorded_at)),
+            ("ix_progress_user_id_recorded_at",
+             select(Progress).where(Progress.user_id == "u1", Progress.recorded_at >= since)
+             .order_by(Progress.recorded_at.desc())),
+            ("ix_documents_user_id_created_at",
+             select(Document).where(Document.user_id == "u1").order_by(Document.created_at.desc())),
+            ("ix_reports_user_id_created_at",
+             select(Report).where(Report.user_id == "u1").order_by(Report.created_at.desc())),
+            ("ix_documents_user_id_content_hash",
+             select(Document).where(Document.user_id == "u1", Document.content_hash == "ab" * 32,
+                                    Document.status == "indexed").limit(1)),
+        ]
+    
+    def test_sqlite_plans_use_indexes(self):
+        """Test EXPLAIN QUERY PLAN on SQLite picks each index"""
+        from sqlalchemy import create_engine, text
+        from app.db.base import Base
+        
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        with engine.connect() as conn:
+            for index_name, query in self._hot_queries():
+                sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+                plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+                assert index_name in plan, f"{index_name} not used: {plan}"
+    
+    @pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+    def test_postgres_plans_use_indexes(self):
+        """Test EXPLAIN on Postgres picks each index (seq scans disabled, tables are tiny)"""
+        import asyncio
+        from sqlalchemy import text
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from app.db.base import Base
+        
+        async def plans():
+            engine = create_async_engine(os.environ["TEST_POSTGRES_URL"])
+            results = []
+            async with engine.connect() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(text("SET enable_seqscan = off"))
+                for index_name, query in self._hot_queries():
+                    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+                    rows = await conn.execute(text(f"EXPLAIN {sql}"))
+                    results.append((index_name, " ".join(row[0] for row in rows)))
+                await conn.rollback()
+            await engine.dispose()
+            return results
+        
+        for index_name, plan in asyncio.run(plans()):
+            assert index_name in plan, f"{index_name} not used: {plan}"